@@ -0,0 +1,75 @@
+"""
+Throughput and latency of the inference server under concurrent clients:
+
+    python -m models.inference_server --port 8765 &
+    python -m benchmarks.bench_inference_server --url http://127.0.0.1:8765 --clients 1 2 4 8 16
+
+Each client sends single frames back to back, like one app instance
+detecting one image at a time.
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from models.inference_server import RemoteBackend, server_info
+
+
+def bench(url: str, clients: int, requests: int, size: int) -> dict:
+    client = RemoteBackend(url)
+    frame = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    before = server_info(url, refresh=True)["stats"]
+    latencies, lock = [], threading.Lock()
+
+    def work():
+        mine = []
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            client.predict([frame])
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=work) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    after = server_info(url, refresh=True)["stats"]
+    batches = after["batches"] - before["batches"]
+    ms = np.array(latencies) * 1000
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "images_per_second": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "mean_batch": round((after["frames"] - before["frames"]) / batches, 2) if batches else None,
+        "rejected": after["rejected"] - before["rejected"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=20, help="frames per client")
+    parser.add_argument("--size", type=int, default=640, help="synthetic frame side in pixels")
+    args = parser.parse_args()
+
+    rows = []
+    for clients in args.clients:
+        row = bench(args.url, clients, args.requests, args.size)
+        rows.append(row)
+        print(f"{clients:>3} clients: {row['images_per_second']:>7} img/s  "
+              f"p95 {row['p95_ms']} ms  mean batch {row['mean_batch']}")
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Throughput of the multi-process inference pool from 1 to N workers,
+on synthetic frames (no input files needed):
+
+    python -m benchmarks.bench_process_pool --max-workers 8 --images 64
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from models.process_pool import ProcessInferencePool
+
+
+def synthetic_frames(count: int, size: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def bench(workers: int, threads: int, frames) -> dict:
+    with ProcessInferencePool(workers, threads) as pool:
+        t0 = time.perf_counter()
+        pool.warm_up()
+        startup = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        pool.infer(frames)
+        elapsed = time.perf_counter() - t0
+    return {
+        "workers": workers,
+        "threads_per_worker": threads,
+        "startup_seconds": round(startup, 3),
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(frames) / elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=1, help="torch threads per worker")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--size", type=int, default=1024, help="synthetic frame side in pixels")
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.images, args.size)
+    # 1, 2, 4, … plus the requested maximum
+    counts = sorted({2 ** i for i in range(args.max_workers.bit_length())} | {args.max_workers})
+    rows, base = [], None
+    for workers in counts:
+        row = bench(workers, args.threads, frames)
+        base = base or row["images_per_second"]
+        row["speedup"] = round(row["images_per_second"] / base, 2)
+        rows.append(row)
+        print(f"{workers:>3} workers: {row['images_per_second']:>7} img/s  (x{row['speedup']})")
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
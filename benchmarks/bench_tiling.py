@@ -0,0 +1,81 @@
+"""
+Latency vs. recall of sliced inference against whole-image inference:
+
+    python -m benchmarks.bench_tiling dataset/images --tiles 0 640 1024 --overlap 0.2
+
+Ground truth is read from YOLO label files (dataset/labels/<stem>.txt,
+"cls cx cy w h" normalised), the usual layout next to an images folder.
+Without labels only latency and box counts are reported.
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from models.backends import box_iou
+from models.evaluation import load_yolo_labels
+from models.model_manager import model_manager
+from models.tiling import TileConfig, predict_frames
+from utils.image_utils import collect_image_paths
+
+
+def matched(gt_xyxy, gt_cls, dets, iou: float = 0.5) -> int:
+    """Ground-truth boxes hit by a same-class detection with IoU >= `iou`."""
+    if not len(gt_cls) or not len(dets):
+        return 0
+    ious = box_iou(gt_xyxy, dets.xyxy, gt_cls, dets.cls)
+    return int((ious.max(axis=1) >= iou).sum())
+
+
+def bench(model, images, tiling) -> dict:
+    seconds, boxes, hits, total = [], 0, 0, 0
+    for bgr, labels in images:
+        t0 = time.perf_counter()
+        dets = predict_frames(model.predict, [bgr], tiling)[0]
+        seconds.append(time.perf_counter() - t0)
+        boxes += len(dets)
+        if labels is not None:
+            hits += matched(*labels, dets)
+            total += len(labels[1])
+    return {
+        "tile": tiling.size if tiling else 0,
+        "overlap": tiling.overlap if tiling else None,
+        "mean_ms": round(1000 * float(np.mean(seconds)), 1),
+        "p95_ms": round(1000 * float(np.percentile(seconds, 95)), 1),
+        "boxes": boxes,
+        "recall": round(hits / total, 4) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="+", help="image files or folders")
+    parser.add_argument("--tiles", type=int, nargs="+", default=[0, 640, 1024],
+                        help="tile sizes to compare (0 = whole image)")
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--batch", type=int, default=8, help="tiles per forward pass")
+    parser.add_argument("--limit", type=int, default=50, help="images to use at most")
+    args = parser.parse_args()
+
+    model = model_manager.get()
+    images = []
+    for path in collect_image_paths(args.images)[:args.limit]:
+        bgr = cv2.imread(path)
+        if bgr is not None:
+            images.append((bgr, load_yolo_labels(path, bgr.shape)))
+    if not images:
+        parser.error("no readable images")
+
+    rows = []
+    for size in args.tiles:
+        tiling = TileConfig(size, args.overlap, batch=args.batch) if size > 0 else None
+        row = bench(model, images, tiling)
+        rows.append(row)
+        print(f"tile {row['tile']:>5}: {row['mean_ms']:>8} ms/img  recall {row['recall']}  boxes {row['boxes']}")
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
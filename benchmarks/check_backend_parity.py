@@ -0,0 +1,84 @@
+"""
+Accuracy / latency parity between the torch and ONNX Runtime backends:
+
+    python -m benchmarks.check_backend_parity path/to/images --repeat 3
+
+Every box from one backend must have a same-class partner from the other
+with IoU >= --min-iou and a confidence within --max-conf-diff. Exits
+non-zero if the backends disagree. Export best.onnx first with
+`python detect_cli.py --export-onnx`.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import cv2
+
+from models.backends import box_iou, load_backend
+from models.model_manager import weights_path
+from utils.image_utils import collect_image_paths
+
+
+def compare(ref, other, min_iou: float, max_conf_diff: float) -> list:
+    """Return a list of human-readable mismatches between two Detections."""
+    problems = []
+    if len(ref) != len(other):
+        problems.append(f"{len(ref)} vs {len(other)} boxes")
+    if not len(ref) or not len(other):
+        return problems
+    iou = box_iou(ref.xyxy, other.xyxy, ref.cls, other.cls)
+    for i, j in enumerate(iou.argmax(1)):
+        if iou[i, j] < min_iou:
+            problems.append(f"box {i} has no partner (best IoU {iou[i, j]:.3f})")
+        elif abs(ref.conf[i] - other.conf[j]) > max_conf_diff:
+            problems.append(f"box {i} conf {ref.conf[i]:.3f} vs {other.conf[j]:.3f}")
+    return problems
+
+
+def timed_predict(backend, frame, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        dets = backend.predict([frame])[0]
+        times.append(time.perf_counter() - t0)
+    return dets, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare torch and ONNX backends.")
+    parser.add_argument("inputs", nargs="+", help="image files or folders")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per image")
+    parser.add_argument("--min-iou", type=float, default=0.9)
+    parser.add_argument("--max-conf-diff", type=float, default=0.02)
+    args = parser.parse_args()
+
+    torch_be = load_backend("torch", weights_path("torch"))
+    onnx_be  = load_backend("onnx", weights_path("onnx"))
+    paths = collect_image_paths(args.inputs)
+
+    failures, t_torch, t_onnx = 0, [], []
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        ref, dt_t = timed_predict(torch_be, frame, args.repeat)
+        got, dt_o = timed_predict(onnx_be, frame, args.repeat)
+        t_torch.append(dt_t)
+        t_onnx.append(dt_o)
+        problems = compare(ref, got, args.min_iou, args.max_conf_diff)
+        if problems:
+            failures += 1
+            print(f"✗ {path}: " + "; ".join(problems))
+
+    if not t_torch:
+        print("No readable images given.", file=sys.stderr)
+        return 2
+    mt, mo = statistics.median(t_torch), statistics.median(t_onnx)
+    print(f"{len(t_torch)} images, {failures} mismatched")
+    print(f"median latency: torch {mt * 1000:.1f} ms, onnx {mo * 1000:.1f} ms (x{mt / mo:.2f})")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""
+Offline, CPU-only benchmark suite for the detection and archive paths:
+
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --fail-on-regression
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+
+Covers model load and per-stage inference latency (skipped without
+weights / runtime), overlay render, save throughput, thumbnails, and
+metadata load, table refresh and search over generated archives of
+1k/10k/100k entries. Everything is synthetic and seeded and written to a
+temporary directory, so runs are repeatable and never touch the real
+archive. Results are medians; compare them on the same machine only.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# the archive, thumbnail and detection caches must all point into the
+# scratch directory before anything that reads them is imported
+_SCRATCH = tempfile.mkdtemp(prefix="aht-bench-")
+os.environ["AHT_SAVE_DIR"]  = os.path.join(_SCRATCH, "saved_images")
+os.environ["AHT_THUMB_DIR"] = os.path.join(_SCRATCH, "thumbnails")
+os.environ["AHT_CACHE_DIR"] = os.path.join(_SCRATCH, "detections")
+os.environ["AHT_INDEX_DIR"] = os.path.join(_SCRATCH, "index")
+
+import cv2
+import numpy as np
+
+from models.backends import Detections
+from models.filtering import DetectionFilter, FilterableDetections
+from models.model_manager import DEFAULT_BACKEND, profile_weights
+from models.profiles import PROFILES, get_profile
+from models.object_detector import draw_detections
+from utils.image_io import fit_within
+from utils.metadata_store import MetadataStore, TS_FORMAT
+from utils.profiling import profiler
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+# a metric is flagged once it is this much worse than the baseline
+DEFAULT_TOLERANCE = 0.15
+# units where a bigger number is better; everything else is a duration
+HIGHER_IS_BETTER = {"img/s", "MB/s", "rows/s"}
+
+CLASS_NAMES = {0: "Cirrhosis", 1: "Cyst", 2: "Hemangioma", 3: "Hepatomegaly",
+               4: "Metastasis", 5: "Steatosis", 6: "Tumor"}
+NOTE_WORDS = ("follow", "up", "lesion", "segment", "contrast", "enhancing", "hypodense",
+              "benign", "suspected", "recommend", "biopsy", "stable", "since", "prior",
+              "hepatic", "portal", "vein", "margin", "ultrasound", "review")
+
+
+def median_ms(fn, repeat: int, warmup: int = 1) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return round(statistics.median(times) * 1000, 3)
+
+
+def synthetic_image(size: int, seed: int = 0):
+    """Smooth structure plus sensor-like noise, so encoders see realistic entropy."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (max(2, size // 32), max(2, size // 32), 3), dtype=np.uint8)
+    img = cv2.resize(coarse, (size, size), interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(-6, 7, img.shape, dtype=np.int16)
+    return np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_boxes(count: int, size: int, seed: int = 0) -> Detections:
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, size * 0.9, (count, 2))
+    wh = rng.uniform(size * 0.01, size * 0.1, (count, 2))
+    return Detections(np.hstack([xy, xy + wh]), rng.uniform(0.05, 1.0, count),
+                      rng.integers(0, len(CLASS_NAMES), count))
+
+
+# --- groups --------------------------------------------------------------------
+# each returns {metric: (value, unit)}; a group that can't run here raises
+# SkipGroup with the reason
+
+class SkipGroup(Exception):
+    pass
+
+
+def bench_model(args) -> dict:
+    from models.backends import load_backend
+    backend = args.backend or (DEFAULT_BACKEND if DEFAULT_BACKEND != "remote" else "torch")
+    prof = get_profile(args.profile)
+    backend, path = profile_weights(backend, prof)
+    if not os.path.isfile(path):
+        raise SkipGroup(f"no weights at {path}")
+    t0 = time.perf_counter()
+    try:
+        model = load_backend(backend, path, threads=args.threads or prof.threads, imgsz=prof.imgsz)
+    except ImportError as e:
+        raise SkipGroup(f"{backend} runtime not installed ({e})")
+    out = {"model.load_s": (round(time.perf_counter() - t0, 3), "s")}
+
+    frame = synthetic_image(args.frame_size, seed=1)
+    t0 = time.perf_counter()
+    model.predict([frame])
+    out["model.first_predict_ms"] = (round((time.perf_counter() - t0) * 1000, 3), "ms")
+
+    # the backends time their own stages (onnx_* / torch_*) through the profiler
+    profiler.reset()
+    out["inference.predict_ms"] = (median_ms(lambda: model.predict([frame]), args.repeat), "ms")
+    for stage, s in profiler.snapshot()["stages"].items():
+        out[f"inference.{stage}_ms"] = (s["p50_ms"], "ms")
+    batch = [frame] * 8
+    ms = median_ms(lambda: model.predict(batch), max(1, args.repeat // 4))
+    out["inference.batch8_img_per_s"] = (round(8000 / ms, 2), "img/s")
+    return out
+
+
+def bench_overlay(args) -> dict:
+    out = {}
+    for size in (2048, 4096):
+        frame = synthetic_image(size, seed=size)
+        boxes = synthetic_boxes(50, size, seed=size)
+        out[f"overlay.draw_{size}_ms"] = (
+            median_ms(lambda: draw_detections(frame, boxes, CLASS_NAMES), args.repeat), "ms")
+
+    # the viewer's path: re-filter stored boxes and redraw a display-sized copy
+    frame = synthetic_image(4096, seed=7)
+    view = FilterableDetections(synthetic_boxes(300, 4096, seed=7), CLASS_NAMES)
+    base = fit_within(frame, 1920)
+    scale = base.shape[1] / frame.shape[1]
+    flt = DetectionFilter(conf=0.3, iou=0.45)
+    out["overlay.filter_select_ms"] = (median_ms(lambda: view.select(flt), args.repeat * 4), "ms")
+
+    def redraw():
+        b = view.select(flt)
+        draw_detections(base, Detections(b.xyxy * scale, b.conf, b.cls), CLASS_NAMES)
+    out["overlay.display_redraw_ms"] = (median_ms(redraw, args.repeat), "ms")
+
+    try:
+        from ui.image_bridge import array_to_qimage
+    except ImportError:
+        pass   # PyQt6 missing: the Qt hand-off is simply not measured
+    else:
+        out["overlay.array_to_qimage_4096_ms"] = (
+            median_ms(lambda: array_to_qimage(frame), args.repeat * 4), "ms")
+    return out
+
+
+def bench_save(args) -> dict:
+    from utils.image_utils import ENCODERS, save_image
+    from utils.thumbnail_cache import load_thumbnail
+
+    out, saved = {}, []
+    frames = [synthetic_image(2048, seed=100 + i) for i in range(args.saves)]
+    boxes = synthetic_boxes(20, 2048)
+    start = datetime(2024, 1, 1)
+    for encoder in ENCODERS:
+        times = []
+        for i, frame in enumerate(frames):
+            t0 = time.perf_counter()
+            result = save_image(frame, f"bench-{encoder}", start + timedelta(seconds=i), "note",
+                                detections=boxes, class_names=CLASS_NAMES, encoder=encoder)
+            times.append(time.perf_counter() - t0)
+            saved.append(result.path)
+        out[f"save.{encoder}_ms"] = (round(statistics.median(times) * 1000, 3), "ms")
+        out[f"save.{encoder}_img_per_s"] = (round(len(times) / sum(times), 2), "img/s")
+        out[f"save.{encoder}_mb_per_s"] = (
+            round(sum(f.nbytes for f in frames) / sum(times) / 1e6, 2), "MB/s")
+
+    cold = []
+    for path in saved:
+        t0 = time.perf_counter()
+        load_thumbnail(path)
+        cold.append(time.perf_counter() - t0)
+    out["thumbnail.cold_ms"] = (round(statistics.median(cold) * 1000, 3), "ms")
+    warm = median_ms(lambda: [load_thumbnail(p) for p in saved], args.repeat)
+    out["thumbnail.warm_ms"] = (round(warm / len(saved), 3), "ms")
+    return out
+
+
+def generate_archive(folder: str, entries: int, seed: int = 0) -> float:
+    """
+    Fill a metadata store with `entries` synthetic rows in one
+    transaction (no image files; the table and search only read rows).
+    Returns the seconds it took.
+    """
+    rng = np.random.default_rng(seed)
+    store = MetadataStore(folder)
+    t0 = time.perf_counter()
+    start = datetime(2020, 1, 1)
+    images, classes = [], []
+    for i in range(entries):
+        name = f"patient{i % 5000:04d}"
+        ts = start + timedelta(minutes=int(i * 7))
+        note = " ".join(rng.choice(NOTE_WORDS, size=6))
+        found = rng.choice(len(CLASS_NAMES), size=int(rng.integers(0, 3)), replace=False)
+        counts = {CLASS_NAMES[int(c)]: int(rng.integers(1, 4)) for c in found}
+        fname = f"{name}_{ts:%Y%m%d_%H%M%S}-{i}.png"
+        images.append((i + 1, fname, name, note, ts.strftime(TS_FORMAT),
+                       ",".join(sorted(counts)), sum(counts.values())))
+        classes.extend((i + 1, c, n, round(float(rng.uniform(0.25, 1.0)), 3))
+                       for c, n in counts.items())
+    with store._lock:
+        conn = store._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO images (id, fname, name, note, timestamp, classes, box_count)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", images)
+            conn.executemany(
+                "INSERT INTO image_classes (image_id, class, count, max_conf) VALUES (?, ?, ?, ?)",
+                classes)
+    store.close()
+    return time.perf_counter() - t0
+
+
+def bench_archive(args, entries: int) -> dict:
+    folder = os.path.join(_SCRATCH, f"archive_{entries}")
+    generated = generate_archive(folder, entries)
+    print(f"  generated {entries} entries in {generated:.1f}s")
+    out = {}
+    repeat = max(3, args.repeat // (4 if entries >= 100_000 else 1))
+    prefix = f"archive_{entries}"
+
+    def cold_load():
+        store = MetadataStore(folder)
+        store.entries()
+        store.close()
+    out[f"{prefix}.metadata_load_ms"] = (median_ms(cold_load, repeat), "ms")
+
+    store = MetadataStore(folder)
+    out[f"{prefix}.search_text_ms"] = (median_ms(lambda: store.search(text="hypodense biop"), repeat), "ms")
+    out[f"{prefix}.search_name_ms"] = (median_ms(lambda: store.search(name="patient01"), repeat), "ms")
+    out[f"{prefix}.search_disease_ms"] = (
+        median_ms(lambda: store.search(disease="Cyst", min_conf=0.8), repeat), "ms")
+
+    try:
+        from ui.saved_images_model import SavedImagesModel
+        model = SavedImagesModel()
+    except ImportError:
+        model = None   # PyQt6 missing: only the query side of the refresh is timed
+
+    def refresh():
+        # what SavedImagesWindow.refresh_table does for an empty query
+        store.diseases()
+        rows = store.search(text="")
+        if model is not None:
+            model.set_entries(rows)
+    out[f"{prefix}.table_refresh_ms"] = (median_ms(refresh, repeat), "ms")
+
+    # folder sync: back every row with an (empty) file so nothing is dropped,
+    # and age the folder so its mtime signature is trusted
+    names = [r[0] for r in store._query("SELECT fname FROM images")]
+    for fname in names:
+        open(os.path.join(folder, fname), "ab").close()
+    settled = time.time() - 60
+    os.utime(folder, (settled, settled))
+    out[f"{prefix}.sync_full_ms"] = (median_ms(lambda: store.sync_with_disk(force=True), repeat), "ms")
+    out[f"{prefix}.sync_unchanged_ms"] = (median_ms(store.sync_with_disk, repeat), "ms")
+    delta = []
+    for r in range(repeat):
+        # another machine drops 100 new images into the shared folder
+        for k in range(100):
+            open(os.path.join(folder, f"remote{r:02d}_20250101_{k // 60:02d}{k % 60:02d}00.png"), "ab").close()
+        os.utime(folder, (settled + r + 1, settled + r + 1))
+        t0 = time.perf_counter()
+        added, _removed = store.sync_with_disk()
+        delta.append(time.perf_counter() - t0)
+        assert added == 100, added
+    out[f"{prefix}.sync_delta100_ms"] = (round(statistics.median(delta) * 1000, 3), "ms")
+    store.close()
+    return out
+
+
+# --- reporting -----------------------------------------------------------------
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """(metric, baseline, current, relative change, verdict) for every shared metric."""
+    rows = []
+    for metric, cur in sorted(results.items()):
+        base = baseline.get(metric)
+        if base is None or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        # positive `worse` means slower / lower throughput
+        worse = -change if cur["unit"] in HIGHER_IS_BETTER else change
+        verdict = "regression" if worse > tolerance else "improved" if worse < -tolerance else "ok"
+        rows.append((metric, base["value"], cur["value"], change, verdict))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="archive sizes to generate")
+    parser.add_argument("--groups", nargs="+", default=["model", "overlay", "save", "archive"],
+                        choices=["model", "overlay", "save", "archive"])
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per metric")
+    parser.add_argument("--saves", type=int, default=8, help="images saved per encoder")
+    parser.add_argument("--frame-size", type=int, default=1024, help="synthetic frame side for inference")
+    parser.add_argument("--backend", help="inference backend (default: AHT_BACKEND)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="inference profile (default: AHT_PROFILE)")
+    parser.add_argument("--threads", type=int, help="intra-op threads for the model")
+    parser.add_argument("--quick", action="store_true", help="1k archive only, fewer repeats")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit 1 if any metric regressed past the tolerance")
+    args = parser.parse_args()
+    if args.baseline and not os.path.isfile(args.baseline):
+        # timings are per machine, so no baseline ships with the repo
+        parser.error(f"no baseline at {args.baseline}; record one on this machine first with "
+                     f"--save-baseline {args.baseline}")
+    if args.quick:
+        args.sizes, args.repeat, args.saves = [min(args.sizes)], max(3, args.repeat // 4), 3
+
+    cv2.setRNGSeed(0)
+    results, skipped = {}, {}
+    groups = [(g, lambda g=g: globals()[f"bench_{g}"](args)) for g in args.groups if g != "archive"]
+    if "archive" in args.groups:
+        groups += [(f"archive_{n}", lambda n=n: bench_archive(args, n)) for n in args.sizes]
+    try:
+        for name, run in groups:
+            print(f"[{name}]")
+            try:
+                metrics = run()
+            except SkipGroup as e:
+                print(f"  skipped: {e}")
+                skipped[name] = str(e)
+                continue
+            for metric, (value, unit) in metrics.items():
+                results[metric] = {"value": value, "unit": unit}
+                print(f"  {metric:<45} {value:>12g} {unit}")
+    finally:
+        shutil.rmtree(_SCRATCH, ignore_errors=True)
+
+    report = {"environment": environment(), "settings": vars(args),
+              "results": results, "skipped": skipped}
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline["results"], args.tolerance)
+        print(f"\nAgainst {args.baseline} ({baseline['environment'].get('commit')}, "
+              f"tolerance {args.tolerance:.0%}):")
+        for metric, base, cur, change, verdict in rows:
+            flag = {"regression": "  ▲ SLOWER", "improved": "  ▼ faster"}.get(verdict, "")
+            print(f"  {metric:<45} {base:>10g} → {cur:<10g} {change:+7.1%}{flag}")
+        regressions = [r for r in rows if r[4] == "regression"]
+        print(f"{len(regressions)} regression(s), "
+              f"{sum(r[4] == 'improved' for r in rows)} improvement(s) of {len(rows)} metrics")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Headless detection, no display or Qt needed:
+
+    python detect_cli.py "studies/**/*.png" -o out/ --batch-size 8 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+from models.backends import BACKENDS, DEFAULT_CONF, export_onnx, quantize_onnx
+from models.headless import run_detection
+from models.model_manager import MODEL_PATH, weights_path
+from models.profiles import PROFILES
+from models.tiling import DEFAULT_TILE_SIZE, DEFAULT_OVERLAP
+from utils.profiling import profiler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run abdominal disease detection without the GUI.")
+    parser.add_argument("inputs", nargs="*", help="image files, folders or glob patterns")
+    parser.add_argument("-o", "--output", help="directory for overlays and detections.json")
+    parser.add_argument("-b", "--batch-size", type=int, default=8, help="images per forward pass")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="threads for decoding and writing images")
+    parser.add_argument("-p", "--processes", type=int, default=0,
+                        help="model replicas in separate processes (0 = in-process model)")
+    parser.add_argument("-t", "--threads-per-process", type=int, default=1,
+                        help="torch threads for each replica")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="inference backend (default: $AHT_BACKEND or torch)")
+    parser.add_argument("--tile", type=int, default=DEFAULT_TILE_SIZE,
+                        help="sliced inference with tiles of this many pixels (0 = whole image)")
+    parser.add_argument("--tile-overlap", type=float, default=DEFAULT_OVERLAP,
+                        help="overlap between neighbouring tiles, as a fraction of the tile")
+    parser.add_argument("--profile", choices=sorted(PROFILES),
+                        help="inference profile: accurate, balanced or fast (default: $AHT_PROFILE or accurate)")
+    parser.add_argument("--export-onnx", action="store_true", help="export best.pt to best.onnx and exit")
+    parser.add_argument("--quantize", action="store_true",
+                        help="write an int8 copy of best.onnx for the fast profile and exit")
+    parser.add_argument("--evaluate", metavar="VAL_DIR",
+                        help="compare profiles by mAP and latency on a labelled YOLO folder and exit")
+    parser.add_argument("--eval-profiles", nargs="+", choices=sorted(PROFILES),
+                        help="profiles to evaluate, the first being the reference (default: all)")
+    parser.add_argument("--eval-threads", type=int, nargs="+",
+                        help="thread counts to try for each profile (default: the profile's)")
+    parser.add_argument("--eval-limit", type=int, help="evaluate on at most this many images")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="also write per-stage timings here (.prom = Prometheus text, else JSON)")
+    parser.add_argument("--no-images", action="store_true", help="only write detections.json")
+    parser.add_argument("--archive-stats", type=float, nargs="?", const=DEFAULT_CONF, metavar="CONF",
+                        help="count stored boxes per class in the saved archive (at CONF) and exit")
+    parser.add_argument("--prune-originals", action="store_true",
+                        help="delete kept originals no saved image refers to any more and exit")
+    args = parser.parse_args(argv)
+
+    if args.export_onnx:
+        print(f"Exported {export_onnx(MODEL_PATH)}")
+        return 0
+    if args.quantize:
+        print(f"Quantized {quantize_onnx(weights_path('onnx'))}")
+        return 0
+    if args.evaluate:
+        return evaluate_profiles(args)
+    if args.archive_stats is not None:
+        return archive_stats(args.archive_stats)
+    if args.prune_originals:
+        from utils.image_utils import original_store, prune_originals
+
+        removed = prune_originals()
+        stats = original_store.stats()
+        print(f"Removed {removed} unused originals; {stats['originals']} kept "
+              f"({stats['bytes'] / 2**20:.1f} MB)")
+        return 0
+    if not args.inputs or not args.output:
+        parser.error("inputs and --output are required")
+
+    summary = run_detection(
+        args.inputs, args.output,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        write_images=not args.no_images,
+        processes=args.processes,
+        threads_per_process=args.threads_per_process,
+        backend=args.backend,
+        tile_size=args.tile,
+        tile_overlap=args.tile_overlap,
+        profile=args.profile,
+    )
+    if args.metrics:
+        profiler.export(args.metrics)
+    if not summary["images"]:
+        print("No images matched the given inputs.", file=sys.stderr)
+        return 1
+    slices = f" ({summary['frames']} frames)" if summary["frames"] != summary["images"] else ""
+    print(
+        f"{summary['images']} images{slices} in {summary['seconds']:.1f}s "
+        f"({summary['images_per_second']} img/s, model load {summary['model_load_seconds']:.1f}s)"
+    )
+    return 0
+
+
+def evaluate_profiles(args) -> int:
+    from models.evaluation import compare_profiles
+
+    rows = compare_profiles(args.evaluate, args.eval_profiles, args.backend,
+                            args.eval_threads, args.eval_limit)
+    print(f"{'profile':<10} {'threads':>7} {'ms/img':>8} {'p95':>8} {'mAP50':>7} {'mAP50-95':>9} "
+          f"{'Δ mAP':>8} {'speedup':>8}")
+    for r in rows:
+        print(f"{r['profile']:<10} {str(r['threads'] or '-'):>7} {r['mean_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['map50']:>7} {r['map50_95']:>9} {r['map50_95_delta']:>+8.4f} {r['speedup']:>7}x")
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        path = os.path.join(args.output, "profiles.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Written to {path}")
+    return 0
+
+
+def archive_stats(min_conf: float) -> int:
+    import numpy as np
+    from utils.image_utils import metadata_store, sync_archive
+
+    # straight from the stored raw boxes: no pixels, no model
+    sync_archive()
+    cols = metadata_store.detection_columns()
+    names = {}
+    for version_names in cols["class_names"].values():
+        names.update(version_names)
+    keep = cols["conf"] >= min_conf
+    cls, image_id = cols["cls"][keep], cols["image_id"][keep]
+    print(f"{'class':<24} {'boxes':>7} {'images':>7}   (confidence ≥ {min_conf:.2f})")
+    for c in np.unique(cls):
+        hit = cls == c
+        print(f"{str(names.get(int(c), c)):<24} {int(hit.sum()):>7} {len(np.unique(image_id[hit])):>7}")
+    print(f"{len(cls)} boxes in {len(np.unique(image_id))} of {metadata_store.count()} saved images")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,4 +1,10 @@
+import multiprocessing
 import sys
+import time
+
+# taken before the heavy imports so first-paint time covers all of startup
+_START_TIME = time.perf_counter()
+
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -8,26 +14,51 @@ from PyQt6.QtWidgets import (
     QLineEdit,
     QTextEdit,
     QDialogButtonBox,
-    QFormLayout
+    QFormLayout,
+    QComboBox,
+    QSpinBox,
+    QCheckBox
 )
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtGui import QKeySequence, QShortcut
 from datetime import datetime
-from utils.image_utils import save_image
+from models.model_manager import model_manager
+from utils.image_utils import ENCODERS, DEFAULT_ENCODER, DEFAULT_LEVEL
+from utils.original_store import KEEP_ORIGINALS
+from utils.series_io import is_multi_frame
+from ui.save_queue import SaveQueue
+from ui.diagnostics_window import DiagnosticsWindow
+from utils.profiling import profiler, METRICS_FILE
 from ui.login_window import LoginWindow
 from ui.main_menu import MainMenuWindow
 from ui.detection_window import DetectionWindow
+from ui.batch_window import BatchWindow
 from ui.saved_images_window import SavedImagesWindow
 
+class ModelStatus(QObject):
+    """Forwards model manager state changes from the loader thread to Qt."""
+    changed = pyqtSignal(str)
+
+
 class AppWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
 
+        # model readiness in the status bar
+        self.model_status = ModelStatus()
+        self.model_status.changed.connect(self.on_model_state)
+
         # instantiate pages
         self.login_page = LoginWindow(on_success=self.show_main)
         self.main_menu = MainMenuWindow(
             on_select_image=self.show_detection,
-            on_saved_images=self.show_saved
+            on_saved_images=self.show_saved,
+            on_select_batch=self.show_batch,
+            on_select_series=self.show_series,
+            on_select_profile=self.switch_profile,
+            profile=model_manager.profile.name,
         )
         self.detection_page = DetectionWindow(
             on_save=self.show_save_dialog,
@@ -35,26 +66,74 @@ class AppWindow(QMainWindow):
         )
         self.saved_page = SavedImagesWindow(on_back=lambda: self.stack.setCurrentWidget(self.main_menu))
 
+        # per-stage timings, F12 from anywhere
+        self.diagnostics = DiagnosticsWindow(self)
+        QShortcut(QKeySequence("F12"), self, activated=self.show_diagnostics)
+
+        # saves are encoded and written in the background
+        self.save_queue = SaveQueue(self)
+        self.save_queue.saved.connect(self.on_saved)
+        self.save_queue.failed.connect(
+            lambda name, err: self.statusBar().showMessage(f"Could not save {name}: {err}")
+        )
+        self.batch_page = BatchWindow(
+            on_open_result=self.show_batch_result,
+            on_back=lambda: self.stack.setCurrentWidget(self.main_menu)
+        )
+
         # add to stack
-        for w in (self.login_page, self.main_menu, self.detection_page, self.saved_page):
+        for w in (self.login_page, self.main_menu, self.detection_page, self.saved_page, self.batch_page):
             self.stack.addWidget(w)
 
         # start on login
         self.stack.setCurrentWidget(self.login_page)
+        # reports the current state right away, so the pages must exist
+        model_manager.add_listener(self.model_status.changed.emit)
         self.setWindowTitle("Omega Vizyon")
 
+    def on_model_state(self, state):
+        # a new profile can only be picked once the current load is done
+        self.main_menu.profile_box.setEnabled(state != model_manager.LOADING)
+        if state == model_manager.READY:
+            self.statusBar().showMessage(
+                f"Model ready ({model_manager.load_time:.1f}s, {model_manager.profile.name} profile)"
+            )
+        elif state == model_manager.FAILED:
+            self.statusBar().showMessage(f"Model failed to load: {model_manager.error}")
+        else:
+            self.statusBar().showMessage("Loading model…")
+
+    def switch_profile(self, name):
+        if name != model_manager.profile.name:
+            model_manager.switch_profile(name)
+
     def show_main(self):
         self.stack.setCurrentWidget(self.main_menu)
 
     def show_detection(self, image_path):
+        if is_multi_frame(image_path):
+            self.show_series(image_path)
+            return
         self.detection_page.load_image_and_detect(image_path)
         self.stack.setCurrentWidget(self.detection_page)
 
+    def show_series(self, source):
+        self.detection_page.load_series(source)
+        self.stack.setCurrentWidget(self.detection_page)
+
+    def show_batch(self, image_paths):
+        self.batch_page.start(image_paths)
+        self.stack.setCurrentWidget(self.batch_page)
+
+    def show_batch_result(self, frame, view, source_path=None):
+        self.detection_page.show_result(frame, view, source_path)
+        self.stack.setCurrentWidget(self.detection_page)
+
     def show_saved(self):
-        self.saved_page.refresh_table()
+        # the page (re)loads itself when shown
         self.stack.setCurrentWidget(self.saved_page)
 
-    def show_save_dialog(self, processed_image):
+    def show_save_dialog(self, processed_image, view=None, view_filter=None, source_path=None):
         # Create a modal dialog
         dlg = QDialog(self)
         dlg.setWindowTitle("Save Image and Note")
@@ -67,6 +146,24 @@ class AppWindow(QMainWindow):
         form.addRow("Name:", name_edit)
         form.addRow("Note:", note_edit)
 
+        # lossless format + effort (PNG compression level / JPEG XL effort)
+        format_box = QComboBox()
+        for enc in ENCODERS:
+            format_box.addItem(enc.upper(), enc)
+        format_box.setCurrentIndex(max(0, format_box.findData(DEFAULT_ENCODER)))
+        level_box = QSpinBox(minimum=0, maximum=9, value=DEFAULT_LEVEL)
+        level_box.setToolTip("Higher is smaller but slower to save")
+        form.addRow("Format:", format_box)
+        form.addRow("Compression:", level_box)
+
+        # archive the unannotated input too (stored once per distinct file);
+        # only offered when AHT_KEEP_ORIGINALS opts in
+        keep_original = QCheckBox("Keep original image")
+        keep_original.setChecked(source_path is not None)
+        keep_original.setEnabled(source_path is not None)
+        if KEEP_ORIGINALS:
+            form.addRow("", keep_original)
+
         # OK / Cancel buttons
         buttons = QDialogButtonBox(
             QDialogButtonBox.StandardButton.Ok |
@@ -82,12 +179,54 @@ class AppWindow(QMainWindow):
             name  = name_edit.text().strip()
             note  = note_edit.toPlainText().strip()
             timestamp = datetime.now()
-            # <-- pass note into save_image now
-            path = save_image(processed_image, name, timestamp, note)
-            self.saved_page.add_entry(name, note, timestamp, path)
+            # <-- pass note and what was detected into save_image
+            # every raw box is kept; the summary follows what was on screen.
+            # Names and version are those of the model that produced the
+            # boxes, not whatever is loaded now
+            detections = {}
+            if view is not None:
+                detections = dict(
+                    detections=view.raw, shown=view.select(view_filter),
+                    view_filter=view_filter.settings(), class_names=view.names,
+                    model_version=view.version,
+                )
+            self.save_queue.submit(
+                processed_image, name, timestamp, note, **detections,
+                encoder=format_box.currentData(), level=level_box.value(),
+                original_path=source_path if KEEP_ORIGINALS and keep_original.isChecked() else None,
+            )
+            self.statusBar().showMessage(f"Saving {name}…")
+
+    def on_saved(self, entry, result):
+        self.saved_page.add_entry(*entry)
+        self.statusBar().showMessage(
+            f"Saved {entry[0]}: {result.size_bytes / 1024:.0f} KB, "
+            f"encoded in {result.encode_seconds * 1000:.0f} ms"
+        )
+
+    def show_diagnostics(self):
+        self.diagnostics.show()
+        self.diagnostics.raise_()
+
+    def closeEvent(self, ev):
+        # don't lose studies that are still being written
+        self.save_queue.wait()
+        if METRICS_FILE:
+            print(f"Metrics written to {profiler.export(METRICS_FILE)}")
+        super().closeEvent(ev)
 
 if __name__ == "__main__":
+    # needed for process pools inside a frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    # load the model while the user is logging in
+    model_manager.start()
     window = AppWindow()
     window.show()
+
+    def report_first_paint():
+        print(f"First paint after {(time.perf_counter() - _START_TIME) * 1000:.0f} ms")
+    # fires once the event loop has processed the initial paint
+    QTimer.singleShot(0, report_first_paint)
+
     sys.exit(app.exec())
\ No newline at end of file
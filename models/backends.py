@@ -0,0 +1,255 @@
+# models/backends.py
+
+import ast
+import os
+
+import cv2
+import numpy as np
+
+from utils.profiling import profiler
+
+# ultralytics' default prediction settings, used by every backend
+DEFAULT_CONF = 0.25
+DEFAULT_IOU  = 0.7
+MAX_DET      = 300
+# pushes boxes of different classes apart so one NMS pass is class-aware
+CLASS_OFFSET = 7680
+
+
+class Detections:
+    """
+    Backend-neutral detections for one image: `xyxy` (N, 4) pixel boxes,
+    `conf` (N,) scores and `cls` (N,) integer class ids, all NumPy.
+    """
+    __slots__ = ("xyxy", "conf", "cls")
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls  = np.asarray(cls).astype(np.int64).reshape(-1)
+
+    @classmethod
+    def from_data(cls, data):
+        """Build from an (N, 6) x1, y1, x2, y2, conf, cls array."""
+        data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+        return cls(data[:, :4], data[:, 4], data[:, 5])
+
+    @property
+    def data(self):
+        return np.concatenate(
+            [self.xyxy, self.conf[:, None], self.cls[:, None].astype(np.float32)], axis=1
+        )
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class TorchBackend:
+    """The original path: ultralytics YOLO on PyTorch."""
+    name = "torch"
+
+    def __init__(self, weights: str, threads: int = None, imgsz: int = None):
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        from ultralytics import YOLO
+        self.model = YOLO(weights)
+        self.names = dict(self.model.names)
+        # None keeps the size the checkpoint was trained at
+        self.imgsz = imgsz
+
+    def predict(self, frames, conf: float = DEFAULT_CONF, iou: float = DEFAULT_IOU) -> list:
+        extra = {"imgsz": self.imgsz} if self.imgsz else {}
+        results = self.model(list(frames), verbose=False, conf=conf, iou=iou, max_det=MAX_DET, **extra)
+        # ultralytics times its own stages, in ms per image
+        for r in results:
+            for stage, ms in r.speed.items():
+                if ms is not None:
+                    profiler.record(f"torch_{stage}", ms / 1000)
+        return [Detections.from_data(r.boxes.data.cpu().numpy()) for r in results]
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime on CPU with NumPy pre/post-processing, so torch is not
+    needed at runtime. Mirrors ultralytics' letterbox and NMS so boxes
+    match TorchBackend.
+    """
+    name = "onnx"
+
+    def __init__(self, weights: str, threads: int = None, imgsz: int = None):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            weights, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        # ultralytics writes names/imgsz into the exported model's metadata
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"])
+        trained = ast.literal_eval(meta.get("imgsz", "[640, 640]"))
+        self.imgsz = tuple(trained) if isinstance(trained, (list, tuple)) else (trained, trained)
+        # a fixed batch dimension means frames have to go one at a time
+        self.dynamic_batch = not isinstance(inp.shape[0], int)
+        if imgsz:
+            # only a model exported with dynamic=True accepts another input size
+            if all(isinstance(d, int) for d in inp.shape[2:]):
+                print(f"⚠️  {weights} has a fixed {inp.shape[2]}x{inp.shape[3]} input; "
+                      f"ignoring imgsz={imgsz}")
+            else:
+                self.imgsz = (imgsz, imgsz)
+
+    def _letterbox(self, bgr):
+        h, w = bgr.shape[:2]
+        new_h, new_w = self.imgsz
+        gain = min(new_h / h, new_w / w)
+        unpad_w, unpad_h = int(round(w * gain)), int(round(h * gain))
+        dw, dh = (new_w - unpad_w) / 2, (new_h - unpad_h) / 2
+        if (w, h) != (unpad_w, unpad_h):
+            bgr = cv2.resize(bgr, (unpad_w, unpad_h), interpolation=cv2.INTER_LINEAR)
+        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+        padded = cv2.copyMakeBorder(bgr, top, bottom, left, right,
+                                    cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        return padded, gain, (left, top)
+
+    def _preprocess(self, frames):
+        blobs, metas = [], []
+        for bgr in frames:
+            padded, gain, pad = self._letterbox(bgr)
+            # BGR HWC uint8 -> RGB CHW float
+            blobs.append(padded[:, :, ::-1].transpose(2, 0, 1))
+            metas.append((gain, pad, bgr.shape[:2]))
+        batch = np.ascontiguousarray(np.stack(blobs), dtype=np.float32) / 255.0
+        return batch, metas
+
+    def _postprocess(self, pred, meta, conf, iou):
+        gain, (pad_x, pad_y), (h, w) = meta
+        # (4 + nc, anchors) -> (anchors, 4 + nc)
+        pred = pred.T
+        scores = pred[:, 4:]
+        cls = scores.argmax(1)
+        best = scores[np.arange(len(cls)), cls]
+        keep = best > conf
+        xywh, best, cls = pred[keep, :4], best[keep], cls[keep]
+
+        xyxy = np.empty_like(xywh)
+        xyxy[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        xyxy[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        idx = nms(xyxy + cls[:, None] * CLASS_OFFSET, best, iou)[:MAX_DET]
+        xyxy, best, cls = xyxy[idx], best[idx], cls[idx]
+
+        # undo the letterbox
+        xyxy -= np.array([pad_x, pad_y, pad_x, pad_y], dtype=xyxy.dtype)
+        xyxy /= gain
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+        return Detections(xyxy, best, cls)
+
+    def predict(self, frames, conf: float = DEFAULT_CONF, iou: float = DEFAULT_IOU) -> list:
+        frames = list(frames)
+        groups = [frames] if self.dynamic_batch else [[f] for f in frames]
+        out = []
+        for group in groups:
+            with profiler.stage("onnx_preprocess"):
+                batch, metas = self._preprocess(group)
+            with profiler.stage("onnx_forward"):
+                preds = self.session.run(None, {self.input_name: batch})[0]
+            with profiler.stage("onnx_postprocess"):
+                out.extend(self._postprocess(p, m, conf, iou) for p, m in zip(preds, metas))
+        return out
+
+
+def box_iou(a, b, a_cls=None, b_cls=None, metric: str = "iou"):
+    """
+    Pairwise overlap of (N, 4) and (M, 4) xyxy boxes as an (N, M) array.
+    With metric="ios" it is intersection over the smaller box instead of
+    IoU. Given both class arrays, pairs of different classes get 0.
+    """
+    w = (np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])).clip(0)
+    h = (np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])).clip(0)
+    inter = w * h
+    area_a = ((a[:, 2] - a[:, 0]).clip(0) * (a[:, 3] - a[:, 1]).clip(0))[:, None]
+    area_b = ((b[:, 2] - b[:, 0]).clip(0) * (b[:, 3] - b[:, 1]).clip(0))[None, :]
+    if metric == "ios":
+        overlap = inter / (np.minimum(area_a, area_b) + 1e-9)
+    else:
+        overlap = inter / (area_a + area_b - inter + 1e-9)
+    if a_cls is not None and b_cls is not None:
+        overlap[np.asarray(a_cls)[:, None] != np.asarray(b_cls)[None, :]] = 0
+    return overlap
+
+
+def nms(boxes, scores, iou_threshold: float, metric: str = "iou"):
+    """
+    Greedy non-maximum suppression; returns kept indices, best score first.
+    With metric="ios" overlap is intersection over the smaller box, which
+    also suppresses a box cut off at a tile edge by its complete twin.
+    """
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        overlap = box_iou(boxes[i:i + 1], boxes[rest], metric=metric)[0]
+        order = rest[overlap <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+# weights file each backend loads by default, next to best.pt
+WEIGHT_FILES = {
+    TorchBackend.name: "best.pt",
+    OnnxBackend.name: "best.onnx",
+}
+
+
+def load_backend(name: str, weights: str, threads: int = None, imgsz: int = None):
+    if name == "remote":
+        # `weights` is the inference server's URL; the server picks its own profile
+        from models.inference_server import RemoteBackend
+        return RemoteBackend(weights)
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return backend_cls(weights, threads=threads, imgsz=imgsz)
+
+
+def export_onnx(weights: str, imgsz: int = 640, dynamic: bool = True) -> str:
+    """
+    Export a .pt checkpoint to ONNX next to it and return the new path.
+    """
+    from ultralytics import YOLO
+    path = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True)
+    return os.fspath(path)
+
+
+def quantize_onnx(weights: str, out: str = None) -> str:
+    """
+    Dynamic int8 quantization of an exported ONNX model: weights are
+    stored as 8-bit integers and activations are quantized on the fly, so
+    no calibration images are needed. Returns the new path.
+    """
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from models.profiles import quantized_path
+
+    out = out or quantized_path(weights)
+    # unsigned weights: the CPU provider's ConvInteger only takes uint8
+    quantize_dynamic(weights, out, weight_type=QuantType.QUInt8)
+    # keep the names / imgsz metadata OnnxBackend reads
+    src, dst = onnx.load(weights), onnx.load(out)
+    props = {p.key: p.value for p in src.metadata_props}
+    props.update({p.key: p.value for p in dst.metadata_props})
+    onnx.helper.set_model_props(dst, props)
+    onnx.save(dst, out)
+    return out
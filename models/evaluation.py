@@ -0,0 +1,158 @@
+# models/evaluation.py
+
+import os
+import time
+
+import numpy as np
+
+from models.backends import box_iou, load_backend
+from models.model_manager import DEFAULT_BACKEND, model_version, profile_weights
+from models.profiles import PROFILES, get_profile
+from utils.image_io import read_image
+from utils.image_utils import collect_image_paths
+
+# ultralytics validates at this confidence so the whole PR curve is seen
+EVAL_CONF = 0.001
+# COCO-style IoU thresholds 0.50:0.05:0.95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def load_yolo_labels(image_path: str, shape):
+    """
+    Ground truth for an image from the usual YOLO layout
+    (<root>/images/x.png -> <root>/labels/x.txt, "cls cx cy w h"
+    normalised) as ((N, 4) xyxy pixels, (N,) classes), or None.
+    """
+    images_dir, fname = os.path.split(image_path)
+    label = os.path.join(os.path.dirname(images_dir), "labels", os.path.splitext(fname)[0] + ".txt")
+    if not os.path.isfile(label):
+        return None
+    rows = np.loadtxt(label, ndmin=2).reshape(-1, 5)
+    h, w = shape[:2]
+    cx, cy, bw, bh = rows[:, 1] * w, rows[:, 2] * h, rows[:, 3] * w, rows[:, 4] * h
+    xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+    return xyxy, rows[:, 0].astype(np.int64)
+
+
+def load_validation(folder: str, limit: int = None) -> list:
+    """(path, bgr, labels) for every image under `folder` that has a label file."""
+    samples = []
+    for path in collect_image_paths([folder]):
+        _data, bgr = read_image(path)
+        if bgr is None:
+            continue
+        labels = load_yolo_labels(path, bgr.shape)
+        if labels is not None:
+            samples.append((path, bgr, labels))
+            if limit and len(samples) >= limit:
+                break
+    return samples
+
+
+def match_detections(gt_xyxy, gt_cls, dets):
+    """
+    (N_det, T) true-positive flags, one column per IoU threshold: each
+    ground-truth box is claimed by at most one same-class detection,
+    highest confidence first.
+    """
+    tp = np.zeros((len(dets), len(IOU_THRESHOLDS)), dtype=bool)
+    if not len(dets) or not len(gt_cls):
+        return tp
+    order = np.argsort(-dets.conf, kind="stable")
+    ious = box_iou(gt_xyxy, dets.xyxy[order], gt_cls, dets.cls[order])
+    for t, thr in enumerate(IOU_THRESHOLDS):
+        taken = np.zeros(len(gt_cls), dtype=bool)
+        for j in range(len(order)):
+            cand = np.where(taken, 0, ious[:, j])
+            g = cand.argmax()
+            if cand[g] >= thr:
+                taken[g] = True
+                tp[order[j], t] = True
+    return tp
+
+
+def average_precision(tp, conf, n_gt: int):
+    """AP per IoU threshold for one class, 101-point interpolated (COCO)."""
+    if n_gt == 0:
+        return None
+    if not len(conf):
+        return np.zeros(tp.shape[1])
+    order = np.argsort(-conf, kind="stable")
+    tp = tp[order]
+    ctp = np.cumsum(tp, axis=0)
+    cfp = np.cumsum(~tp, axis=0)
+    recall = ctp / n_gt
+    precision = ctp / (ctp + cfp)
+    grid = np.linspace(0, 1, 101)
+    ap = []
+    for t in range(tp.shape[1]):
+        # precision envelope: best precision at any recall >= r
+        env = np.maximum.accumulate(precision[::-1, t])[::-1]
+        idx = np.searchsorted(recall[:, t], grid, side="left")
+        ap.append(np.where(idx < len(env), env[np.minimum(idx, len(env) - 1)], 0).mean())
+    return np.array(ap)
+
+
+def evaluate(model, samples, repeat: int = 1) -> dict:
+    """
+    Run `model` over `samples` one image at a time (as the viewer does)
+    and return latency plus mAP50 / mAP50-95 against their labels.
+    """
+    model.predict([samples[0][1]], conf=EVAL_CONF)   # warm-up
+    seconds, tps, confs, classes, n_gt = [], [], [], [], {}
+    for _path, bgr, (gt_xyxy, gt_cls) in samples:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            dets = model.predict([bgr], conf=EVAL_CONF)[0]
+            seconds.append(time.perf_counter() - t0)
+        tps.append(match_detections(gt_xyxy, gt_cls, dets))
+        confs.append(dets.conf)
+        classes.append(dets.cls)
+        for c in gt_cls.tolist():
+            n_gt[c] = n_gt.get(c, 0) + 1
+    tp, conf, cls = np.concatenate(tps), np.concatenate(confs), np.concatenate(classes)
+    aps = []
+    for c, count in n_gt.items():
+        mask = cls == c
+        aps.append(average_precision(tp[mask], conf[mask], count))
+    aps = np.array(aps) if aps else np.zeros((1, len(IOU_THRESHOLDS)))
+    ms = np.array(seconds) * 1000
+    return {
+        "images": len(samples),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "map50": round(float(aps[:, 0].mean()), 4),
+        "map50_95": round(float(aps.mean()), 4),
+    }
+
+
+def compare_profiles(folder: str, profiles=None, backend: str = None, threads=None,
+                     limit: int = None, repeat: int = 1) -> list:
+    """
+    Evaluate each profile (and each thread count in `threads`) on the
+    labelled images under `folder`. Rows report mAP and latency, plus the
+    change against the first row (normally "accurate").
+    """
+    samples = load_validation(folder, limit)
+    if not samples:
+        raise ValueError(f"No labelled images under {folder} (expected images/ next to labels/)")
+    backend = backend or (DEFAULT_BACKEND if DEFAULT_BACKEND != "remote" else "torch")
+    rows = []
+    for name in profiles or list(PROFILES):
+        prof = get_profile(name)
+        run_backend, weights = profile_weights(backend, prof)
+        for n in threads or [prof.threads]:
+            model = load_backend(run_backend, weights, threads=n, imgsz=prof.imgsz)
+            row = {
+                "profile": prof.name,
+                "model": model_version(run_backend, weights, prof.imgsz),
+                "threads": n,
+            }
+            row.update(evaluate(model, samples, repeat))
+            rows.append(row)
+            del model
+    ref = rows[0]
+    for row in rows:
+        row["map50_95_delta"] = round(row["map50_95"] - ref["map50_95"], 4)
+        row["speedup"] = round(ref["mean_ms"] / row["mean_ms"], 2) if row["mean_ms"] else None
+    return rows
@@ -0,0 +1,88 @@
+# models/filtering.py
+
+import os
+
+import numpy as np
+
+from models.backends import Detections, DEFAULT_CONF, DEFAULT_IOU, box_iou
+
+# The model keeps every box above this score; what is shown is filtered
+# from there without running it again
+RAW_CONF = float(os.environ.get("AHT_RAW_CONF", "0.05"))
+
+
+class DetectionFilter:
+    """
+    What the viewer shows: a minimum confidence, an NMS IoU threshold and
+    the class ids to hide. IoU can only be made stricter than DEFAULT_IOU,
+    which the raw boxes were already suppressed at.
+    """
+    __slots__ = ("conf", "iou", "hidden")
+
+    def __init__(self, conf: float = DEFAULT_CONF, iou: float = DEFAULT_IOU, hidden=()):
+        self.conf   = float(conf)
+        self.iou    = min(float(iou), DEFAULT_IOU)
+        self.hidden = frozenset(int(c) for c in hidden)
+
+    def settings(self) -> dict:
+        return {"conf": self.conf, "iou": self.iou, "hidden": sorted(self.hidden)}
+
+    def __eq__(self, other):
+        return isinstance(other, DetectionFilter) and self.settings() == other.settings()
+
+    def __repr__(self):
+        return f"DetectionFilter(conf={self.conf:g}, iou={self.iou:g}, hidden={sorted(self.hidden)})"
+
+
+class FilterableDetections:
+    """
+    The raw detections of one image (inferred once at RAW_CONF), its class
+    names and the version of the model that produced them, prepared for
+    re-filtering: boxes are sorted by score and the class-aware pairwise
+    IoU matrix is computed on first use, so a new threshold is a few NumPy
+    masks instead of another forward pass.
+    """
+    def __init__(self, raw: Detections, names: dict, version: str = None):
+        order = np.argsort(-raw.conf, kind="stable")
+        self.raw     = Detections(raw.xyxy[order], raw.conf[order], raw.cls[order])
+        self.names   = names
+        self.version = version
+        self._over = None   # (N, N) IoU of box i with every lower-scored box j
+
+    def __len__(self):
+        return len(self.raw)
+
+    def classes(self) -> list:
+        """Class ids with at least one raw box."""
+        return sorted(int(c) for c in np.unique(self.raw.cls))
+
+    def _iou_matrix(self):
+        if self._over is None:
+            b, cls = self.raw.xyxy, self.raw.cls
+            # boxes of different classes never suppress each other
+            iou = box_iou(b, b, cls, cls)
+            # boxes are score-sorted, so only j > i can be suppressed by i
+            self._over = np.triu(iou, 1)
+        return self._over
+
+    def keep_mask(self, flt: DetectionFilter):
+        """Boolean mask over the (score-sorted) raw boxes that pass `flt`."""
+        keep = self.raw.conf >= flt.conf
+        if flt.hidden:
+            keep &= ~np.isin(self.raw.cls, list(flt.hidden))
+        if flt.iou < DEFAULT_IOU and keep.any():
+            # greedy NMS over the survivors, one masked row per kept box
+            over = self._iou_matrix() > flt.iou
+            for i in np.flatnonzero(keep):
+                if keep[i]:
+                    keep &= ~over[i]
+        return keep
+
+    def select(self, flt: DetectionFilter) -> Detections:
+        keep = self.keep_mask(flt)
+        return Detections(self.raw.xyxy[keep], self.raw.conf[keep], self.raw.cls[keep])
+
+
+def apply_filter(boxes: Detections, flt: DetectionFilter = None) -> Detections:
+    """`boxes` as they'd be shown under `flt` (the default thresholds if None)."""
+    return FilterableDetections(boxes, {}).select(flt or DetectionFilter())
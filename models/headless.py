@@ -0,0 +1,136 @@
+# models/headless.py
+
+import glob
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from models.model_manager import model_manager
+from models.profiles import get_profile
+from models.object_detector import detect_inputs, boxes_to_dicts
+from models.process_pool import ProcessInferencePool
+from models.tiling import TileConfig, DEFAULT_OVERLAP
+from utils.detection_cache import detection_cache
+from utils.image_utils import collect_image_paths
+from utils.profiling import profiler
+
+
+def expand_inputs(patterns) -> list:
+    """
+    Turn a list of files, folders and glob patterns into image paths.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        paths.extend(matches if matches else [pattern])
+    # de-duplicate while keeping the sorted order from collect_image_paths
+    return list(dict.fromkeys(collect_image_paths(paths)))
+
+
+def _output_name(path: str, used: set, index: int = None) -> str:
+    # inputs from different folders may share a file name
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if index is not None:
+        stem = f"{stem}_{index + 1:04d}"
+    name, n = stem, 1
+    while name in used:
+        n += 1
+        name = f"{stem}_{n}"
+    used.add(name)
+    return name
+
+
+def run_detection(patterns, output_dir: str, batch_size: int = 8,
+                  workers: int = 4, write_images: bool = True,
+                  processes: int = 0, threads_per_process: int = 1,
+                  backend: str = None, tile_size: int = 0,
+                  tile_overlap: float = DEFAULT_OVERLAP, profile: str = None) -> dict:
+    """
+    Run detection over every image matched by `patterns` without any Qt.
+
+    Writes `<name>_det.png` overlays (unless `write_images` is False) and a
+    `detections.json` with the boxes of every input into `output_dir`.
+    Every slice of a multi-frame DICOM/TIFF is detected; its entry lists
+    them under "frames" and the overlays are named `<name>_<NNNN>_det.png`.
+    `workers` threads decode inputs and encode outputs around inference.
+    With `processes` > 0 inference is spread over that many model replicas
+    (see ProcessInferencePool), each using `threads_per_process` threads.
+    `backend` picks "torch" or "onnx" (default: the model manager's).
+    A `tile_size` > 0 runs sliced inference on images larger than one
+    tile, with tiles overlapping by `tile_overlap`. `profile` picks an
+    inference profile (models/profiles.py; default: the manager's).
+    Returns the same summary that is written to JSON.
+    """
+    paths = expand_inputs(patterns)
+    os.makedirs(output_dir, exist_ok=True)
+
+    backend = backend or model_manager.requested_backend
+    prof = get_profile(profile) if profile else model_manager.profile
+    tiling = TileConfig(tile_size, tile_overlap, batch=batch_size) if tile_size > 0 else None
+    t0 = time.perf_counter()
+    pool = None
+    if processes > 0:
+        pool = ProcessInferencePool(processes, threads_per_process, backend=backend,
+                                    profile=prof.name)
+        pool.warm_up()
+        class_map = pool.names
+    else:
+        if backend != model_manager.requested_backend or prof.name != model_manager.profile.name:
+            model_manager.switch_backend(backend, profile=prof.name)
+        class_map = model_manager.get().names
+    load_time = time.perf_counter() - t0
+
+    used, images, pending = set(), {}, []
+    frames = 0
+    t_infer = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as io_pool:
+            for batch in detect_inputs(paths, batch_size, executor=io_pool, pool=pool,
+                                       tiling=tiling):
+                for label, processed, boxes in batch:
+                    # plain images are labelled by path, series slices by SliceRef
+                    path, index = (label, None) if isinstance(label, str) else label[:2]
+                    if processed is None:
+                        images[path] = {"error": "could not read image"}
+                        continue
+                    frames += 1
+                    entry = {"detections": boxes_to_dicts(boxes, class_map)}
+                    if write_images:
+                        out = os.path.join(output_dir, _output_name(path, used, index) + "_det.png")
+                        pending.append(io_pool.submit(cv2.imwrite, out, processed))
+                        entry["output"] = out
+                    if index is None:
+                        images[path] = entry
+                    else:
+                        images.setdefault(path, {"frames": []})["frames"].append({"index": index, **entry})
+            for f in pending:
+                f.result()
+    finally:
+        if pool is not None:
+            pool.close()
+    elapsed = time.perf_counter() - t_infer
+
+    summary = {
+        "model": model_manager.model_path if pool is None else pool.model_path,
+        "backend": model_manager.backend if pool is None else pool.backend,
+        "inference_profile": prof.settings(),
+        "model_load_seconds": round(load_time, 3),
+        "images": len(paths),
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(paths) / elapsed, 2) if elapsed > 0 else None,
+        "batch_size": batch_size,
+        "workers": workers,
+        "processes": processes,
+        "threads_per_process": threads_per_process,
+        "tiling": tiling.settings() if tiling is not None else None,
+        "cache": detection_cache.stats(),
+        "profile": profiler.snapshot(),
+        "results": images,
+    }
+    with open(os.path.join(output_dir, "detections.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
@@ -0,0 +1,318 @@
+# models/inference_server.py
+"""
+Local inference service: one warm model shared by every app instance on
+the machine, with dynamic batching of concurrent requests.
+
+    python -m models.inference_server --port 8765 --backend onnx --max-batch 8 --max-wait-ms 5
+
+Point the app (or detect_cli.py) at it with
+AHT_INFERENCE_SERVER=http://127.0.0.1:8765; detection then goes through
+RemoteBackend instead of loading a model in-process.
+"""
+import argparse
+import io
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from models.backends import Detections, DEFAULT_CONF, DEFAULT_IOU, BACKENDS, load_backend
+from models.profiles import PROFILES
+from utils.profiling import profiler
+
+DEFAULT_PORT = 8765
+# longest a request may wait for the batch to fill up
+DEFAULT_MAX_WAIT_MS = 5
+DEFAULT_MAX_BATCH = 8
+# frames waiting beyond this are refused with 503 instead of queueing forever
+DEFAULT_MAX_QUEUE = 64
+# how long the client keeps retrying while the server is overloaded
+CLIENT_RETRY_SECONDS = 30
+
+
+class Overloaded(Exception):
+    """The request queue is full; the caller should back off and retry."""
+
+
+class _Pending:
+    __slots__ = ("frame", "settings", "done", "result", "error")
+
+    def __init__(self, frame, settings):
+        self.frame    = frame
+        self.settings = settings
+        self.done     = threading.Event()
+        self.result   = None
+        self.error    = None
+
+
+class DynamicBatcher:
+    """
+    Collects frames from concurrent requests into batches for one model.
+    A batch is run once `max_batch` frames are waiting or the oldest has
+    waited `max_wait` seconds, whichever comes first. The model is only
+    ever called from the batcher's own thread. When more than `max_queue`
+    frames are waiting, `submit` raises Overloaded (backpressure).
+    """
+    def __init__(self, predict, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait: float = DEFAULT_MAX_WAIT_MS / 1000, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.predict   = predict
+        self.max_batch = max_batch
+        self.max_wait  = max_wait
+        self.max_queue = max_queue
+        self._queue    = queue.Queue()
+        self._lock     = threading.Lock()
+        self.stats     = {"batches": 0, "frames": 0, "rejected": 0}
+        threading.Thread(target=self._run, name="batcher", daemon=True).start()
+
+    def submit(self, frames, conf: float = DEFAULT_CONF, iou: float = DEFAULT_IOU) -> list:
+        """Queue frames (all or none) and return their pending handles."""
+        with self._lock:
+            if self._queue.qsize() + len(frames) > self.max_queue:
+                self.stats["rejected"] += len(frames)
+                raise Overloaded(f"{self._queue.qsize()} frames already queued")
+            pending = [_Pending(f, (conf, iou)) for f in frames]
+            for p in pending:
+                self._queue.put(p)
+        return pending
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # frames asking for different thresholds can't share a forward pass
+            groups = {}
+            for p in batch:
+                groups.setdefault(p.settings, []).append(p)
+            for (conf, iou), group in groups.items():
+                try:
+                    with profiler.stage("server_batch"):
+                        results = self.predict([p.frame for p in group], conf=conf, iou=iou)
+                    for p, r in zip(group, results):
+                        p.result = r
+                except Exception as e:
+                    for p in group:
+                        p.error = e
+                for p in group:
+                    p.done.set()
+            profiler.count("server_batches")
+            profiler.count("server_frames", len(batch))
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["frames"] += len(batch)
+
+
+def encode_frames(frames) -> bytes:
+    buf = io.BytesIO()
+    np.savez(buf, *frames)
+    return buf.getvalue()
+
+
+def decode_frames(body: bytes) -> list:
+    with np.load(io.BytesIO(body), allow_pickle=False) as npz:
+        return [npz[f"arr_{i}"] for i in range(len(npz.files))]
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 resets connections under a burst of clients
+    request_queue_size = 256
+
+
+def make_handler(batcher: DynamicBatcher, info: dict):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass   # one line per frame would drown the console
+
+        def _reply(self, code: int, payload: dict, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/info":
+                stats = dict(batcher.stats, queued=batcher.queued())
+                stats["mean_batch"] = round(stats["frames"] / stats["batches"], 2) if stats["batches"] else None
+                self._reply(200, dict(info, stats=stats))
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path != "/predict":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                query = urllib.parse.parse_qs(url.query)
+                conf = float(query.get("conf", [DEFAULT_CONF])[0])
+                iou  = float(query.get("iou", [DEFAULT_IOU])[0])
+                frames = decode_frames(self.rfile.read(int(self.headers["Content-Length"])))
+                if len(frames) > batcher.max_queue:
+                    # could never fit, however long the client waits
+                    self._reply(413, {"error": f"{len(frames)} frames in one request, "
+                                               f"at most {batcher.max_queue}"})
+                    return
+                pending = batcher.submit(frames, conf, iou)
+            except Overloaded as e:
+                self._reply(503, {"error": str(e)}, {"Retry-After": "1"})
+                return
+            except Exception as e:
+                self._reply(400, {"error": f"bad request: {e}"})
+                return
+            for p in pending:
+                p.done.wait()
+            errors = [p.error for p in pending if p.error is not None]
+            if errors:
+                self._reply(500, {"error": str(errors[0])})
+                return
+            self._reply(200, {"detections": [p.result.data.tolist() for p in pending]})
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, backend: str = None,
+          model_path: str = None, threads: int = None, max_batch: int = DEFAULT_MAX_BATCH,
+          max_wait_ms: float = DEFAULT_MAX_WAIT_MS, max_queue: int = DEFAULT_MAX_QUEUE,
+          profile: str = None):
+    """Load the model once and serve it until interrupted."""
+    from models.model_manager import DEFAULT_BACKEND, model_version, profile_weights
+    from models.profiles import get_profile
+
+    # a server never forwards to another server
+    backend = backend or (DEFAULT_BACKEND if DEFAULT_BACKEND in BACKENDS else "torch")
+    prof = get_profile(profile)
+    if model_path is None:
+        backend, model_path = profile_weights(backend, prof)
+    t0 = time.perf_counter()
+    model = load_backend(backend, model_path, threads=threads or prof.threads, imgsz=prof.imgsz)
+    model.predict([np.zeros((640, 640, 3), dtype=np.uint8)])
+    info = {
+        "backend": backend,
+        "profile": prof.name,
+        # same form as ModelManager.version, so caches and saved results agree
+        "model_id": model_version(backend, model_path, prof.imgsz),
+        "names": {int(k): v for k, v in model.names.items()},
+        "max_batch": max_batch,
+        "max_wait_ms": max_wait_ms,
+        "max_queue": max_queue,
+    }
+    batcher = DynamicBatcher(model.predict, max_batch, max_wait_ms / 1000, max_queue)
+    server = InferenceHTTPServer((host, port), make_handler(batcher, info))
+    print(f"Serving {info['model_id']} on http://{host}:{port} "
+          f"(loaded in {time.perf_counter() - t0:.1f}s, batch ≤ {max_batch}, wait ≤ {max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+_server_info = {}
+
+def server_info(url: str, refresh: bool = False) -> dict:
+    """The server's /info (backend, model_id, names, stats), remembered per URL."""
+    # "http://host:8600/" and "http://host:8600" are the same server
+    url = url.rstrip("/")
+    if refresh or url not in _server_info:
+        with urllib.request.urlopen(url + "/info", timeout=10) as r:
+            info = json.load(r)
+        info["names"] = {int(k): v for k, v in info["names"].items()}
+        _server_info[url] = info
+    return _server_info[url]
+
+
+class RemoteBackend:
+    """
+    Client for the inference server with the same interface as the local
+    backends (`names`, `predict`), so the rest of the app can't tell the
+    difference. Retries with backoff while the server reports overload.
+    """
+    name = "remote"
+
+    def __init__(self, url: str, threads: int = None):
+        self.url   = url.rstrip("/")
+        info       = server_info(self.url)
+        self.names = info["names"]
+        self.model_id = info["model_id"]
+        # larger requests are refused (413), so they are split up front
+        self.max_request = info.get("max_queue", DEFAULT_MAX_QUEUE)
+
+    def predict(self, frames, conf: float = DEFAULT_CONF, iou: float = DEFAULT_IOU) -> list:
+        frames = list(frames)
+        out = []
+        for start in range(0, len(frames), self.max_request):
+            out.extend(self._predict(frames[start:start + self.max_request], conf, iou))
+        return out
+
+    def _predict(self, frames, conf, iou) -> list:
+        body = encode_frames(frames)
+        query = urllib.parse.urlencode({"conf": conf, "iou": iou})
+        deadline = time.monotonic() + CLIENT_RETRY_SECONDS
+        delay = 0.05
+        while True:
+            req = urllib.request.Request(
+                f"{self.url}/predict?{query}", data=body, method="POST",
+                headers={"Content-Type": "application/octet-stream"},
+            )
+            try:
+                with urllib.request.urlopen(req, timeout=CLIENT_RETRY_SECONDS + 30) as r:
+                    rows = json.load(r)["detections"]
+                return [Detections.from_data(d) for d in rows]
+            except urllib.error.HTTPError as e:
+                if e.code != 503 or time.monotonic() > deadline:
+                    raise RuntimeError(f"Inference server error {e.code}: {e.read()[:200]!r}")
+            except (ConnectionError, urllib.error.URLError) as e:
+                # refused / reset while the server is saturated or restarting
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Inference server unreachable: {e}")
+            profiler.count("server_backoff")
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (localhost by default)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--backend", choices=sorted(BACKENDS))
+    parser.add_argument("--model", help="weights file (default: the backend's file in models/)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="inference profile (default: $AHT_PROFILE)")
+    parser.add_argument("--threads", type=int, help="intra-op threads for the model")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.backend, args.model, args.threads,
+          args.max_batch, args.max_wait_ms, args.max_queue, args.profile)
+
+
+if __name__ == "__main__":
+    main()
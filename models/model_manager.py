@@ -0,0 +1,208 @@
+# models/model_manager.py
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from models.backends import load_backend, WEIGHT_FILES
+from models.profiles import DEFAULT_PROFILE, get_profile, quantized_path
+from utils.detection_cache import file_hash
+
+# figure out where to load best.pt from (dev vs. frozen)
+if getattr(sys, "frozen", False):
+    # PyInstaller has unpacked data here
+    base_dir = sys._MEIPASS
+else:
+    # running in your source tree
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODEL_DIR  = os.path.join(base_dir, "models")
+MODEL_PATH = os.path.join(MODEL_DIR, "best.pt")
+
+# A shared inference server (models/inference_server.py) to use instead of a local model
+INFERENCE_SERVER = os.environ.get("AHT_INFERENCE_SERVER", "")
+
+# "torch" (default) or "onnx"; see models/backends.py. "remote" with a server set.
+DEFAULT_BACKEND = "remote" if INFERENCE_SERVER else os.environ.get("AHT_BACKEND", "torch")
+
+
+def weights_path(backend: str) -> str:
+    if backend == "remote":
+        return INFERENCE_SERVER
+    # unknown names fall through to load_backend, which reports them
+    return os.path.join(MODEL_DIR, WEIGHT_FILES.get(backend, "best.pt"))
+
+
+def model_id(backend: str, model_path: str) -> str:
+    """
+    Backend plus a short hash of the weights. For the remote backend it
+    is the server's own id, so results match whichever model it serves.
+    """
+    if backend == "remote":
+        from models.inference_server import server_info
+        return server_info(model_path.rstrip("/"))["model_id"]
+    return f"{backend}:{file_hash(model_path)[:12]}"
+
+
+def model_version(backend: str, model_path: str, imgsz: int = None) -> str:
+    """model_id plus the input size when a profile changes it, e.g. onnx:1a2b3c4d5e6f@416."""
+    mid = model_id(backend, model_path)
+    return f"{mid}@{imgsz}" if imgsz and backend != "remote" else mid
+
+
+def profile_weights(backend: str, profile) -> tuple:
+    """
+    (backend, weights) to run `profile` with. A quantized profile needs
+    the int8 ONNX export; without it the full-precision model is used.
+    """
+    if profile.quantized and backend != "remote":
+        path = quantized_path(weights_path("onnx"))
+        if os.path.isfile(path):
+            return "onnx", path
+        print(f"⚠️  No int8 model at {path} (create it with `python detect_cli.py --quantize`); "
+              f"the {profile.name} profile runs full precision")
+    return backend, weights_path(backend)
+
+
+# size of the dummy frame used to warm the model up
+WARMUP_SIZE = 640
+
+
+class ModelManager:
+    """
+    Loads the inference backend on a background thread so the UI can come
+    up immediately, and hands it out once it is ready.
+    """
+    IDLE    = "idle"
+    LOADING = "loading"
+    READY   = "ready"
+    FAILED  = "failed"
+
+    def __init__(self, backend: str = DEFAULT_BACKEND, model_path: str = None,
+                 profile: str = DEFAULT_PROFILE):
+        self.profile    = get_profile(profile)
+        # what was asked for; a quantized profile may run on onnx instead
+        self.requested_backend = backend
+        if model_path is None:
+            backend, model_path = profile_weights(backend, self.profile)
+        self.backend    = backend
+        self.model_path = model_path
+        self.state      = self.IDLE
+        self.error      = None
+        self.load_time  = None   # seconds spent loading + warming up
+        self._model     = None
+        self._ready     = threading.Event()
+        self._lock      = threading.Lock()
+        self._thread    = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Register callback(state) for state changes. Called from the
+        loader thread, so Qt code should forward it through a signal.
+        """
+        self._listeners.append(callback)
+        callback(self.state)
+
+    def _set_state(self, state):
+        self.state = state
+        for cb in list(self._listeners):
+            try:
+                cb(state)
+            except Exception as e:
+                print(f"⚠️  Model listener failed: {e}")
+
+    def start(self):
+        """Kick off loading in the background (no-op if already started)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._load, name="model-loader", daemon=True
+            )
+            self._set_state(self.LOADING)
+            self._thread.start()
+
+    def _load(self):
+        t0 = time.perf_counter()
+        try:
+            # backends import torch / onnxruntime lazily: that is most of the startup cost
+            model = load_backend(self.backend, self.model_path,
+                                 threads=self.profile.threads, imgsz=self.profile.imgsz)
+            # one dummy pass so the first real image doesn't pay for lazy init
+            dummy = np.zeros((WARMUP_SIZE, WARMUP_SIZE, 3), dtype=np.uint8)
+            model.predict([dummy])
+        except Exception as e:
+            self.error = e
+            print(f"⚠️  Could not load model ({self.model_path}): {e}")
+            self._set_state(self.FAILED)
+        else:
+            self._model = model
+            self.load_time = time.perf_counter() - t0
+            print(f"Model ready in {self.load_time:.2f}s ({self.backend} backend, "
+                  f"{self.profile.name} profile)")
+            self._set_state(self.READY)
+        finally:
+            self._ready.set()
+
+    def switch_backend(self, backend: str, model_path: str = None, profile: str = None):
+        """
+        Reload with another backend and/or profile. Waits for any load in
+        progress, then starts loading the new one in the background.
+        """
+        if self._thread is not None:
+            self._ready.wait()
+        with self._lock:
+            if profile is not None:
+                self.profile = get_profile(profile)
+            self.requested_backend = backend
+            if model_path is None:
+                backend, model_path = profile_weights(backend, self.profile)
+            self.backend    = backend
+            self.model_path = model_path
+            self.error      = None
+            self.load_time  = None
+            self._model     = None
+            self._ready.clear()
+            self._thread    = None
+        self.start()
+
+    def switch_profile(self, profile: str):
+        """Reload with another inference profile, keeping the requested backend."""
+        self.switch_backend(self.requested_backend, profile=profile)
+
+    @property
+    def version(self) -> str:
+        """
+        Backend, a short hash of the weights and the profile's input size;
+        recorded with saved results and part of the detection cache key.
+        """
+        try:
+            return model_version(self.backend, self.model_path, self.profile.imgsz)
+        except OSError:
+            # server unreachable: its URL still tells models behind
+            # different servers apart
+            if self.backend == "remote":
+                return f"remote:{self.model_path.rstrip('/')}"
+            return self.backend
+
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    def get(self, timeout=None):
+        """
+        Return the loaded backend, starting the load if needed and blocking
+        until it finishes (or `timeout` seconds pass).
+        """
+        self.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError("Model is still loading")
+        if self._model is None:
+            raise RuntimeError(f"Model failed to load: {self.error}")
+        return self._model
+
+
+# shared instance used by the detector and the UI
+model_manager = ModelManager()
@@ -1,22 +1,21 @@
 # models/object_detector.py
 
-from ultralytics import YOLO
-import cv2
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageFont
+import functools
+import itertools
 import os
-import sys
-
-# figure out where to load best.pt from (dev vs. frozen)
-if getattr(sys, "frozen", False):
-    # PyInstaller has unpacked data here
-    base_dir = sys._MEIPASS
-else:
-    # running in your source tree
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-model_path = os.path.join(base_dir, "models", "best.pt")
-model      = YOLO(model_path)
-class_map = model.names
+
+# the model itself is loaded in the background by the manager
+from models.model_manager import model_manager
+from models.backends import Detections, DEFAULT_IOU
+from models.filtering import RAW_CONF, DetectionFilter, FilterableDetections, apply_filter
+from models.overlay import draw_rect, draw_text, text_size
+from models.tiling import predict_frames
+from utils.detection_cache import detection_cache, content_hash
+from utils.profiling import profiler
+from utils.image_utils import metadata_store, original_path_for
+from utils.image_io import read_image
+from utils.series_io import DEFAULT_WINDOW, SliceRef, is_multi_frame, iter_series
 
 class_colors = {
     0: (0, 255, 0),     # green
@@ -51,13 +50,290 @@ except Exception as e:
     FONT_SMALL = ImageFont.load_default()
 
 
-def detect_objects(image_path: str):
+class DetectionCancelled(Exception):
+    """Raised when a superseded detection is abandoned mid-way."""
+
+
+def _cache_key(data: bytes, version: str, tiling=None) -> str:
+    # anything that changes the raw boxes has to be part of the key; the
+    # model version covers backend, weights (fp32 or int8) and input size
+    settings = {"conf": RAW_CONF, "iou": DEFAULT_IOU}
+    if tiling is not None:
+        settings.update(tiling.settings())
+    return detection_cache.make_key(content_hash(data), version, settings)
+
+
+def _cached(key: str):
+    with profiler.stage("cache_lookup"):
+        hit = detection_cache.get(key)
+    profiler.count("cache_miss" if hit is None else "cache_hit")
+    if hit is None:
+        return None, None
+    rows, names = hit
+    return Detections.from_data(rows), names
+
+
+def detect_objects(image_path: str, progress=None, cancelled=None, tiling=None, raw=False):
+    """
+    Run the model on `image_path` and draw the results.
+
+    `progress(percent, message)` is called between stages and
+    `cancelled()` is polled at the same points; if it returns True the
+    call stops early with DetectionCancelled. Results for an image the
+    model has already seen come from the detection cache. With a `tiling`
+    (models.tiling.TileConfig) large images are detected tile by tile.
+
+    The model runs once at RAW_CONF. By default the boxes are filtered to
+    the standard thresholds and drawn; with `raw=True` the undrawn frame
+    and a FilterableDetections are returned so the viewer can re-filter.
+    """
+    def stage(percent, message):
+        if cancelled is not None and cancelled():
+            raise DetectionCancelled(image_path)
+        if progress is not None:
+            progress(percent, message)
+
     # … read & run inference …
-    bgr = cv2.imread(image_path)
-    results = model(bgr)[0]
+    stage(0, "Reading image…")
+    data, bgr = read_image(image_path)
+    if bgr is None:
+        raise ValueError(f"Could not read image: {image_path}")
+
+    version = model_manager.version
+    key = _cache_key(data, version, tiling)
+    boxes, names = _cached(key)
+    if boxes is None:
+        stage(10, "Waiting for model…")
+        # blocks until the background load has finished
+        model   = model_manager.get()
+        stage(20, "Running detection…")
+        with profiler.stage("inference"):
+            boxes = predict_frames(_raw_infer(model.predict), [bgr], tiling)[0]
+        names   = model.names
+        detection_cache.put(key, boxes.data.tolist(), names)
+        stage(70, "Drawing results…")
+    else:
+        stage(70, "Cached result, drawing…")
+    profiler.count("images_detected")
+    if raw:
+        stage(100, "Done")
+        return bgr, FilterableDetections(boxes, names, version)
+    boxes = apply_filter(boxes)
+    # bgr isn't used again, so the overlay goes straight onto it
+    out_bgr = draw_detections(bgr, boxes, names, inplace=True)
+    stage(100, "Done")
+    return out_bgr, boxes
+
+
+def _raw_infer(infer):
+    # every box the viewer might show, i.e. down to RAW_CONF
+    return functools.partial(infer, conf=RAW_CONF)
+
+
+def _batch_infer(pool=None):
+    # (class names, infer function, model version) for in-process or pooled inference
+    if pool is not None:
+        return pool.names, _raw_infer(pool.infer), pool.version
+    model = model_manager.get()
+    return model.names, _raw_infer(model.predict), model_manager.version
+
+
+def _detect_chunk(labels, decoded, infer, class_map, version, tiling, raw=False):
+    """
+    Detections for one batch of already-decoded (bytes, bgr) frames: cached
+    results are reused and every miss goes through one stacked forward
+    pass. Returns (label, processed_bgr, Detections) tuples in order, or
+    (label, bgr, FilterableDetections) with `raw`.
+    """
+    keys, found, misses = [], [], []
+    for data, bgr in decoded:
+        key = _cache_key(data, version, tiling) if bgr is not None else None
+        boxes = _cached(key)[0] if key is not None else None
+        keys.append(key)
+        found.append(boxes)
+        if bgr is not None and boxes is None:
+            misses.append(bgr)
+
+    results = iter(())
+    if misses:
+        with profiler.stage("inference"):
+            results = iter(predict_frames(infer, misses, tiling))
+    profiler.count("images_detected", sum(bgr is not None for _d, bgr in decoded))
+
+    batch = []
+    for label, (_data, bgr), key, boxes in zip(labels, decoded, keys, found):
+        if bgr is None:
+            batch.append((label, None, None))
+            continue
+        if boxes is None:
+            boxes = next(results)
+            detection_cache.put(key, boxes.data.tolist(), class_map)
+        if raw:
+            batch.append((label, bgr, FilterableDetections(boxes, class_map, version)))
+            continue
+        boxes = apply_filter(boxes)
+        batch.append((label, draw_detections(bgr, boxes, class_map, inplace=True), boxes))
+    return batch
+
+
+def detect_batch(image_paths, batch_size: int = 8, cancelled=None, executor=None,
+                 pool=None, tiling=None, raw=False):
+    """
+    Run the model over many images, `batch_size` frames per forward pass.
+
+    Yields one list per batch of (path, processed_bgr, Detections) tuples, in
+    input order. Files that cannot be read come back as (path, None, None).
+    If an `executor` is given, the frames of each batch are decoded on it;
+    if a `pool` (ProcessInferencePool) is given, inference runs there
+    instead of on the in-process model. Only cache misses are inferred;
+    with a `tiling`, misses larger than one tile are sliced. With `raw`,
+    tuples are (path, bgr, FilterableDetections) as in detect_frame.
+    """
+    class_map, infer, version = _batch_infer(pool)
+    image_paths = list(image_paths)
+    for start in range(0, len(image_paths), batch_size):
+        if cancelled is not None and cancelled():
+            raise DetectionCancelled(image_paths[start])
+        chunk  = image_paths[start:start + batch_size]
+        if executor is not None:
+            decoded = list(executor.map(read_image, chunk))
+        else:
+            decoded = [read_image(p) for p in chunk]
+        yield _detect_chunk(chunk, decoded, infer, class_map, version, tiling, raw)
 
+
+def detect_frame(bgr, tiling=None, raw=False):
+    """
+    Detect on one already-decoded frame (e.g. a series slice) through the
+    detection cache. Returns (processed_bgr, Detections); `bgr` is drawn on.
+    With `raw`, returns `bgr` untouched and a FilterableDetections.
+    """
+    class_map, infer, version = _batch_infer()
+    _label, processed, boxes = _detect_chunk(
+        [None], [(bgr.tobytes(), bgr)], infer, class_map, version, tiling, raw
+    )[0]
+    return processed, boxes
+
+
+def detect_series(source: str, batch_size: int = 8, cancelled=None, pool=None,
+                  tiling=None, window=DEFAULT_WINDOW, raw=False):
+    """
+    Run the model over every slice of a study (DICOM folder, multi-frame
+    DICOM/TIFF, or a single image), as it is decoded. Yields one list per
+    batch of (Frame, processed_bgr, Detections), or (Frame, bgr,
+    FilterableDetections) with `raw`; at most one batch of slices is held
+    in memory at a time.
+    """
+    class_map, infer, version = _batch_infer(pool)
+    frames = iter_series(source, window)
+    while True:
+        if cancelled is not None and cancelled():
+            raise DetectionCancelled(source)
+        chunk = list(itertools.islice(frames, batch_size))
+        if not chunk:
+            return
+        decoded = [(f.bgr.tobytes(), f.bgr) for f in chunk]
+        yield _detect_chunk(chunk, decoded, infer, class_map, version, tiling, raw)
+
+
+def detect_inputs(paths, batch_size: int = 8, cancelled=None, executor=None,
+                  pool=None, tiling=None, raw=False):
+    """
+    detect_batch over `paths`, except that multi-frame DICOM/TIFF files go
+    through detect_series, so every slice is detected and not only the
+    first one read_image gives. Batches come in input order; slices are
+    labelled with their SliceRef instead of the path.
+    """
+    plain = []
+    for path in paths:
+        if is_multi_frame(path):
+            if plain:
+                yield from detect_batch(plain, batch_size, cancelled, executor, pool, tiling, raw)
+                plain = []
+            for batch in detect_series(path, batch_size, cancelled, pool, tiling, raw=raw):
+                yield [(SliceRef(f.source, f.index, f.label), out, boxes) for f, out, boxes in batch]
+            continue
+        plain.append(path)
+        if len(plain) == batch_size:
+            yield from detect_batch(plain, batch_size, cancelled, executor, pool, tiling, raw)
+            plain = []
+    if plain:
+        yield from detect_batch(plain, batch_size, cancelled, executor, pool, tiling, raw)
+
+
+def load_saved_detections(image_path: str):
+    """
+    The raw detections stored with a saved image, as (FilterableDetections,
+    DetectionFilter it was saved with), or (None, None) if it was saved
+    without them. Studies saved before the filter was stored get the
+    default thresholds.
+    """
+    saved = metadata_store.detections_for(os.path.basename(image_path))
+    if saved is None:
+        return None, None
+    view = FilterableDetections(Detections(saved["xyxy"], saved["conf"], saved["cls"]),
+                                saved["class_names"], saved["model_version"])
+    flt = DetectionFilter(**saved["view_filter"]) if saved["view_filter"] else DetectionFilter()
+    return view, flt
+
+
+def redraw_saved(image_path: str, bgr, flt: DetectionFilter = None):
+    """
+    Regenerate the overlay of a saved study onto `bgr` (the source pixels)
+    from its stored boxes, at the thresholds it was saved with or at `flt`.
+    No model needed. Returns None if no boxes were stored.
+    """
+    view, saved_flt = load_saved_detections(image_path)
+    if view is None:
+        return None
+    return draw_detections(bgr, view.select(flt or saved_flt), view.names)
+
+
+def render_from_original(image_path: str, flt: DetectionFilter = None):
+    """
+    Re-derive the annotated view of a saved study from its kept original
+    and stored boxes. Returns None if the original or boxes weren't kept.
+    """
+    original = original_path_for(image_path)
+    if original is None:
+        return None
+    _data, bgr = read_image(original)
+    if bgr is None:
+        return None
+    return redraw_saved(image_path, bgr, flt)
+
+
+def boxes_to_dicts(boxes, class_map) -> list:
+    """
+    Plain, JSON-friendly form of a `Detections` object.
+    """
+    xyxy = boxes.xyxy.tolist()
+    conf = boxes.conf.tolist()
+    cls  = boxes.cls.tolist()
+    return [
+        {
+            "class_id": c,
+            "class_name": class_map[c],
+            "confidence": round(float(p), 4),
+            "box": [round(float(v), 1) for v in xy],
+        }
+        for xy, p, c in zip(xyxy, conf, cls)
+    ]
+
+
+def draw_detections(bgr, boxes, class_map, inplace: bool = False):
+    """
+    Draw the disease header, one rectangle per box and its class label
+    straight onto the BGR frame (a copy of it unless `inplace`). Nothing
+    is converted to RGB or PIL; the result can go to Qt as BGR888.
+    """
+    with profiler.stage("draw"):
+        return _draw(bgr if inplace else bgr.copy(), boxes, class_map)
+
+
+def _draw(out, boxes, class_map):
     # collect *indices*
-    detected_idxs = { int(b.cls[0].item()) for b in results.boxes }
+    detected_idxs = { int(c) for c in boxes.cls }
 
     # build header text
     header = ", ".join(class_map[i] for i in sorted(detected_idxs))
@@ -69,44 +345,24 @@ def detect_objects(image_path: str):
     else:
         color = (0,255,0)
 
-    # convert to PIL, draw header in that color
-    rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-    pil_img = Image.fromarray(rgb)
-    draw    = ImageDraw.Draw(pil_img)
-
+    # class_colors are RGB; the buffer is BGR
     if header:
-        draw.text(
-            (10, 10), 
-            header, 
-            font=FONT_LARGE, 
-            fill=(color[0], color[1], color[2], 255)
-        )
+        draw_text(out, (10, 10), header, FONT_LARGE, color[::-1])
 
     # now draw each box + per‐box label in *its* class color
-    for b in results.boxes:
-        idx       = int(b.cls[0].item())
+    for xyxy, c in zip(boxes.xyxy, boxes.cls):
+        idx       = int(c)
         label     = class_map[idx]
-        box_color = class_colors.get(idx, (0,255,0))
-        x1, y1, x2, y2 = map(int, b.xyxy[0].tolist())
-
-        # rectangle
-        draw.rectangle(
-            [(x1, y1), (x2, y2)],
-            outline=(box_color[0], box_color[1], box_color[2], 255),
-            width=2
-        )
-
-        # measure label size
-        bbox = draw.textbbox((0,0), label, font=FONT_SMALL)
-        w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-        ty   = y1 - h - 4
-        if ty < 0:
-            ty = y1 + 4
+        box_color = class_colors.get(idx, (0,255,0))[::-1]
+        x1, y1, x2, y2 = map(int, xyxy.tolist())
 
+        draw_rect(out, x1, y1, x2, y2, box_color, width=2)
 
-    # convert back to OpenCV and return…
+        # label above the box, or just inside it near the top edge
+        _w, h = text_size(FONT_SMALL, label)
+        ty    = y1 - h - 4
+        if ty < 0:
+            ty = y1 + 4
+        draw_text(out, (x1, ty), label, FONT_SMALL, box_color)
 
-    # 5) back to OpenCV
-    out_rgb = np.array(pil_img)
-    out_bgr = cv2.cvtColor(out_rgb, cv2.COLOR_RGB2BGR)
-    return out_bgr, results.boxes
\ No newline at end of file
+    return out
@@ -0,0 +1,71 @@
+# models/overlay.py
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+class GlyphCache:
+    """
+    Rasterizes a text string once per font into an alpha mask (float,
+    0..1, ready to broadcast over BGR) and keeps it, so drawing the same
+    class names again is just a blend.
+    """
+    def __init__(self):
+        self._masks = {}
+
+    def get(self, font, text: str):
+        """Return (mask, (dx, dy)) with the offset PIL would draw it at."""
+        key = (id(font), text)
+        if key not in self._masks:
+            left, top, right, bottom = font.getbbox(text)
+            w, h = max(1, right - left), max(1, bottom - top)
+            img = Image.new("L", (w, h), 0)
+            ImageDraw.Draw(img).text((-left, -top), text, font=font, fill=255)
+            alpha = np.asarray(img, dtype=np.float32)[:, :, None] / 255.0
+            self._masks[key] = (alpha, (left, top))
+        return self._masks[key]
+
+
+glyphs = GlyphCache()
+
+
+def text_size(font, text: str):
+    mask, _ = glyphs.get(font, text)
+    return mask.shape[1], mask.shape[0]
+
+
+def draw_text(buf, xy, text: str, font, color):
+    """
+    Alpha-blend `text` onto `buf` (H, W, 3 uint8) in place at `xy`, using
+    the same anchor as PIL's ImageDraw.text. `color` must already be in
+    the buffer's channel order.
+    """
+    mask, (dx, dy) = glyphs.get(font, text)
+    x0, y0 = int(xy[0]) + dx, int(xy[1]) + dy
+    H, W = buf.shape[:2]
+    h, w = mask.shape[:2]
+    # clip against the image
+    bx0, by0 = max(0, x0), max(0, y0)
+    bx1, by1 = min(W, x0 + w), min(H, y0 + h)
+    if bx0 >= bx1 or by0 >= by1:
+        return
+    alpha  = mask[by0 - y0:by1 - y0, bx0 - x0:bx1 - x0]
+    region = buf[by0:by1, bx0:bx1]
+    color  = np.asarray(color, dtype=np.float32)
+    region[...] = (region + (color - region) * alpha + 0.5).astype(np.uint8)
+
+
+def draw_rect(buf, x1, y1, x2, y2, color, width: int = 2):
+    """
+    Draw a rectangle outline in place, `width` pixels thick growing inwards
+    (like PIL's ImageDraw.rectangle). Edges are plain slice assignments.
+    """
+    H, W = buf.shape[:2]
+    x1, x2 = max(0, min(x1, x2)), min(W - 1, max(x1, x2))
+    y1, y2 = max(0, min(y1, y2)), min(H - 1, max(y1, y2))
+    if x1 > x2 or y1 > y2:
+        return
+    buf[y1:y1 + width, x1:x2 + 1] = color                           # top
+    buf[max(y1, y2 - width + 1):y2 + 1, x1:x2 + 1] = color          # bottom
+    buf[y1:y2 + 1, x1:x1 + width] = color                           # left
+    buf[y1:y2 + 1, max(x1, x2 - width + 1):x2 + 1] = color          # right
@@ -0,0 +1,122 @@
+# models/process_pool.py
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from models.backends import Detections, DEFAULT_CONF, load_backend
+from models.model_manager import DEFAULT_BACKEND, model_version, profile_weights
+from models.profiles import get_profile
+
+# --- worker side -----------------------------------------------------------
+# each worker process keeps its own model replica here
+_worker_model = None
+
+
+def _init_worker(backend: str, model_path: str, threads: int, imgsz: int):
+    # must happen before torch / onnxruntime are imported in this process
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+
+    global _worker_model
+    _worker_model = load_backend(backend, model_path, threads=threads, imgsz=imgsz)
+
+
+def _worker_names():
+    return dict(_worker_model.names)
+
+
+def _worker_infer(shm_name: str, shape, dtype: str, conf: float):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # the pixels never go through the pipe; one local copy is taken so
+        # the predictor (which keeps the last batch around) can't pin shm.buf
+        frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf).copy()
+        # (N, 6) array: x1, y1, x2, y2, conf, cls
+        return _worker_model.predict([frame], conf=conf)[0].data
+    finally:
+        shm.close()
+
+
+# --- parent side -----------------------------------------------------------
+class ProcessInferencePool:
+    """
+    Runs K model replicas in separate processes so large backlogs can use
+    every core. Each worker loads the weights once and is limited to
+    `threads_per_worker` torch threads; frames reach the workers through
+    shared memory and boxes come back in input order. Weights and input
+    size default to those of `profile` (default: AHT_PROFILE), as in
+    ModelManager.
+    """
+    def __init__(self, workers: int = None, threads_per_worker: int = 1,
+                 backend: str = DEFAULT_BACKEND, model_path: str = None, imgsz: int = None,
+                 profile: str = None):
+        cpus = os.cpu_count() or 1
+        self.workers = workers or max(1, cpus // max(1, threads_per_worker))
+        self.threads_per_worker = threads_per_worker
+        prof = get_profile(profile)
+        if model_path is None:
+            backend, model_path = profile_weights(backend, prof)
+        self.backend = backend
+        self.model_path = model_path
+        self.imgsz = imgsz or prof.imgsz
+        self._names = None
+        # spawn: forking a process that already holds torch/Qt is unsafe
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, self.model_path, threads_per_worker, self.imgsz),
+        )
+
+    @property
+    def names(self) -> dict:
+        if self._names is None:
+            self._names = self._executor.submit(_worker_names).result()
+        return self._names
+
+    @property
+    def version(self) -> str:
+        return model_version(self.backend, self.model_path, self.imgsz)
+
+    def warm_up(self):
+        """Make sure every worker has loaded its replica."""
+        dummy = np.zeros((64, 64, 3), dtype=np.uint8)
+        self.infer([dummy] * self.workers)
+
+    def infer(self, frames, conf: float = DEFAULT_CONF) -> list:
+        """
+        Run the model on a list of BGR frames; returns one `Detections`
+        per frame, in the same order.
+        """
+        blocks, futures = [], []
+        try:
+            for frame in frames:
+                frame = np.ascontiguousarray(frame)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, frame.nbytes))
+                blocks.append(shm)
+                np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[...] = frame
+                futures.append(self._executor.submit(
+                    _worker_infer, shm.name, frame.shape, frame.dtype.str, conf
+                ))
+            return [
+                Detections.from_data(f.result()) for f in futures
+            ]
+        finally:
+            for f in futures:
+                f.cancel()
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,57 @@
+# models/profiles.py
+
+import os
+
+# int8 weights sit next to the exported model: best.onnx -> best.int8.onnx
+QUANTIZED_SUFFIX = ".int8.onnx"
+
+
+class InferenceProfile:
+    """
+    How the model is run on CPU: the network input size (`imgsz`, None
+    for the size it was trained at), whether the int8-quantized export is
+    used, and intra-op threads (None leaves the runtime's default).
+    """
+    __slots__ = ("name", "imgsz", "quantized", "threads")
+
+    def __init__(self, name: str, imgsz: int = None, quantized: bool = False, threads: int = None):
+        self.name      = name
+        self.imgsz     = imgsz
+        self.quantized = quantized
+        self.threads   = threads
+
+    def settings(self) -> dict:
+        return {"profile": self.name, "imgsz": self.imgsz, "quantized": self.quantized,
+                "threads": self.threads}
+
+    def __repr__(self):
+        return f"InferenceProfile({self.settings()})"
+
+
+# imgsz must stay a multiple of the model stride (32)
+PROFILES = {
+    # full precision at the training resolution: what the model was validated at
+    "accurate": InferenceProfile("accurate"),
+    # ~36% fewer pixels per forward pass, same weights
+    "balanced": InferenceProfile("balanced", imgsz=512),
+    # int8 weights and ~58% fewer pixels; check the mAP cost with the evaluator first
+    "fast":     InferenceProfile("fast", imgsz=416, quantized=True),
+}
+
+DEFAULT_PROFILE = os.environ.get("AHT_PROFILE", "accurate")
+# overrides every profile's thread count (e.g. the best value the evaluator found)
+THREADS = int(os.environ.get("AHT_THREADS", "0")) or None
+
+
+def get_profile(name: str = None) -> InferenceProfile:
+    """The named profile (default: AHT_PROFILE), with AHT_THREADS applied."""
+    name = name or DEFAULT_PROFILE
+    try:
+        base = PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown inference profile {name!r}, expected one of {sorted(PROFILES)}")
+    return InferenceProfile(base.name, base.imgsz, base.quantized, THREADS or base.threads)
+
+
+def quantized_path(onnx_path: str) -> str:
+    return os.path.splitext(onnx_path)[0] + QUANTIZED_SUFFIX
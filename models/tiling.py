@@ -0,0 +1,134 @@
+# models/tiling.py
+
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from models.backends import Detections, MAX_DET, nms
+from utils.profiling import profiler
+
+# Sliced inference is off unless a tile size is given (here or per call)
+DEFAULT_TILE_SIZE = int(os.environ.get("AHT_TILE_SIZE", "0"))
+DEFAULT_OVERLAP   = float(os.environ.get("AHT_TILE_OVERLAP", "0.2"))
+
+
+class TileConfig(NamedTuple):
+    """
+    How to slice large frames: `size`-pixel square tiles overlapping by
+    `overlap` (a fraction of the tile), `batch` tiles per forward pass.
+    `full_frame` adds one pass over the whole (downscaled) frame so
+    objects larger than a tile are still found.
+    """
+    size: int
+    overlap: float = DEFAULT_OVERLAP
+    batch: int = 8
+    full_frame: bool = True
+    # intersection-over-smaller above which boxes from neighbouring tiles merge
+    merge_ios: float = 0.5
+
+    def settings(self) -> dict:
+        # part of the detection cache key
+        return {"tile": self.size, "overlap": self.overlap, "full_frame": self.full_frame}
+
+
+def default_tiling():
+    """The TileConfig from $AHT_TILE_SIZE / $AHT_TILE_OVERLAP, or None."""
+    if DEFAULT_TILE_SIZE <= 0:
+        return None
+    return TileConfig(DEFAULT_TILE_SIZE, DEFAULT_OVERLAP)
+
+
+def _starts(length: int, size: int, stride: int) -> list:
+    if length <= size:
+        return [0]
+    starts = list(range(0, length - size, stride))
+    # last tile is flush with the edge instead of hanging over it
+    starts.append(length - size)
+    return starts
+
+
+def tile_origins(height: int, width: int, size: int, overlap: float) -> np.ndarray:
+    """(N, 2) x, y top-left corners of the tiles covering the frame."""
+    stride = max(1, int(round(size * (1.0 - overlap))))
+    xs = _starts(width, size, stride)
+    ys = _starts(height, size, stride)
+    return np.array([(x, y) for y in ys for x in xs], dtype=np.int64)
+
+
+def iter_tiles(bgr, size: int, overlap: float):
+    """
+    Yield (x, y, tile) for every tile of the frame. Tiles are views into
+    `bgr`, so slicing allocates nothing; the backend copies each one only
+    while it is letterboxed into the input tensor.
+    """
+    h, w = bgr.shape[:2]
+    for x, y in tile_origins(h, w, size, overlap):
+        yield int(x), int(y), bgr[y:y + size, x:x + size]
+
+
+def merge_detections(parts, frame_shape, ios: float = 0.5) -> Detections:
+    """
+    Combine boxes from overlapping tiles (already in frame coordinates)
+    into one set: class-aware NMS over everything at once, measuring
+    overlap against the smaller box so edge-clipped duplicates go too.
+    """
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return Detections(np.empty((0, 4)), [], [])
+    xyxy = np.concatenate([p.xyxy for p in parts])
+    conf = np.concatenate([p.conf for p in parts])
+    cls  = np.concatenate([p.cls for p in parts])
+    # offset larger than the frame so classes never overlap each other
+    offset = float(max(frame_shape[:2]) + 1)
+    keep = nms(xyxy + cls[:, None].astype(np.float32) * offset, conf, ios, metric="ios")[:MAX_DET]
+    return Detections(xyxy[keep], conf[keep], cls[keep])
+
+
+def sliced_predict(infer, bgr, config: TileConfig) -> Detections:
+    """
+    Run `infer` (a list of frames -> list of Detections, e.g. a backend's
+    predict or a process pool's infer) over the tiles of one frame,
+    `config.batch` tiles at a time, and merge the results. Tiles are
+    streamed from the frame, so memory stays bounded by one batch.
+    """
+    h, w = bgr.shape[:2]
+    parts = []
+    if config.full_frame:
+        parts.extend(infer([bgr]))
+
+    def flush(batch):
+        for (x, y, _tile), dets in zip(batch, infer([tile for _x, _y, tile in batch])):
+            if len(dets):
+                shifted = dets.xyxy + np.array([x, y, x, y], dtype=np.float32)
+                parts.append(Detections(shifted, dets.conf, dets.cls))
+
+    batch = []
+    for tile in iter_tiles(bgr, config.size, config.overlap):
+        batch.append(tile)
+        if len(batch) == config.batch:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    with profiler.stage("tile_merge"):
+        return merge_detections(parts, (h, w), config.merge_ios)
+
+
+def predict_frames(infer, frames, config: TileConfig = None) -> list:
+    """
+    Detections for each frame. Without a config, or for frames that fit in
+    one tile, this is a plain stacked `infer(frames)`; larger frames are
+    sliced.
+    """
+    frames = list(frames)
+    if config is None:
+        return infer(frames)
+    out = [None] * len(frames)
+    small = [i for i, f in enumerate(frames) if max(f.shape[:2]) <= config.size]
+    for i, dets in zip(small, infer([frames[i] for i in small]) if small else ()):
+        out[i] = dets
+    for i, frame in enumerate(frames):
+        if out[i] is None:
+            out[i] = sliced_predict(infer, frame, config)
+    return out
@@ -0,0 +1,147 @@
+# ui/batch_window.py
+
+import os
+
+from PyQt6.QtWidgets import (
+    QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QListWidget,
+    QListWidgetItem, QProgressBar, QSpinBox
+)
+from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtGui import QIcon
+
+from utils.image_io import read_image
+from utils.series_io import read_slice
+from ui.image_bridge import array_to_pixmap, fit_array
+from ui.detection_worker import BatchDetectionJob, inference_pool
+
+THUMB_SIZE = 80
+
+
+class BatchWindow(QWidget):
+    """
+    Runs detection over many images / a whole study folder and lists the
+    results as each batch comes back.
+    """
+    def __init__(self, on_open_result, on_back):
+        super().__init__()
+        self.on_open_result = on_open_result
+        self.on_back = on_back
+        self._job = None
+        self._paths = []
+        self._done = set()   # input files with at least one result
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.lbl_status = QLabel("No batch running", alignment=Qt.AlignmentFlag.AlignCenter)
+        self.progress   = QProgressBar()
+
+        # how many images go through the model per forward pass
+        self.batch_size = QSpinBox()
+        self.batch_size.setRange(1, 64)
+        self.batch_size.setValue(8)
+        self.batch_size.setPrefix("Batch size: ")
+
+        self.results = QListWidget()
+        self.results.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        self.results.itemDoubleClicked.connect(self.open_item)
+
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.clicked.connect(self.cancel)
+        btn_back = QPushButton("Return to Main Menu")
+        btn_back.clicked.connect(self.go_back)
+
+        top = QHBoxLayout()
+        top.addWidget(self.lbl_status, stretch=1)
+        top.addWidget(self.batch_size)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(top)
+        layout.addWidget(self.progress)
+        layout.addWidget(self.results, stretch=1)
+        layout.addWidget(self.btn_cancel)
+        layout.addWidget(btn_back)
+
+    def start(self, paths):
+        self.cancel()
+        self._paths = list(paths)
+        self._done = set()
+        self.results.clear()
+        self.progress.setRange(0, len(self._paths))
+        self.progress.setValue(0)
+        self.lbl_status.setText(f"Detecting {len(self._paths)} images…")
+        self.btn_cancel.setEnabled(True)
+
+        job = BatchDetectionJob(self._paths, self.batch_size.value())
+        job.setAutoDelete(False)
+        job.signals.batch.connect(self.on_batch)
+        job.signals.finished.connect(self.on_finished)
+        job.signals.error.connect(self.on_error)
+        self._job = job
+        inference_pool().start(job)
+
+    def cancel(self):
+        if self._job is not None:
+            self._job.cancel()
+            inference_pool().tryTake(self._job)
+            self._job = None
+            self.lbl_status.setText("Batch cancelled")
+        self.btn_cancel.setEnabled(False)
+
+    def go_back(self):
+        self.cancel()
+        self.on_back()
+
+    def on_batch(self, batch, seconds):
+        if self.sender() is not (self._job and self._job.signals):
+            return
+        for label, processed, boxes, view in batch:
+            # slices of a multi-frame file come labelled with their SliceRef
+            name = os.path.basename(label) if isinstance(label, str) else label.label
+            self._done.add(label if isinstance(label, str) else label.source)
+            item = QListWidgetItem(name)
+            if processed is None:
+                item.setText(f"{name} — could not read")
+            else:
+                item.setText(f"{name} — {len(boxes)} finding(s)")
+                # only the thumbnail is kept; full overlays are redrawn on open
+                thumb = fit_array(processed, THUMB_SIZE, THUMB_SIZE)
+                item.setIcon(QIcon(array_to_pixmap(thumb)))
+                item.setData(Qt.ItemDataRole.UserRole, (label, view))
+            self.results.addItem(item)
+
+        self.progress.setValue(len(self._done))
+        rate = len(batch) / seconds if seconds > 0 else 0.0
+        self.lbl_status.setText(
+            f"{len(self._done)} / {len(self._paths)} files, {self.results.count()} images"
+            f" — {rate:.1f} img/s"
+        )
+
+    def on_finished(self, total, seconds):
+        if self.sender() is not (self._job and self._job.signals):
+            return
+        self._job = None
+        self.btn_cancel.setEnabled(False)
+        rate = total / seconds if seconds > 0 else 0.0
+        self.lbl_status.setText(f"Done: {total} images in {seconds:.1f}s ({rate:.1f} img/s)")
+
+    def on_error(self, message):
+        if self.sender() is not (self._job and self._job.signals):
+            return
+        self._job = None
+        self.btn_cancel.setEnabled(False)
+        self.lbl_status.setText(f"Batch failed: {message}")
+
+    def open_item(self, item):
+        data = item.data(Qt.ItemDataRole.UserRole)
+        if not data:
+            return
+        label, view = data
+        if isinstance(label, str):
+            path, (_data, bgr) = label, read_image(label)
+        else:
+            # only a first slice can be redrawn from a kept original
+            path, bgr = (label.source if label.index == 0 else None), read_slice(label)
+        if bgr is None:
+            return
+        # the viewer draws from the raw detections, so any threshold works
+        self.on_open_result(bgr, view, path)
@@ -1,63 +1,229 @@
 # ui/detection_window.py
 
-from PyQt6.QtWidgets import QWidget, QLabel, QPushButton, QVBoxLayout
+from PyQt6.QtWidgets import (
+    QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QProgressBar, QSizePolicy,
+    QSlider
+)
 from PyQt6.QtCore     import Qt
-from PyQt6.QtGui      import QPixmap, QImage
-import cv2
-
-from models.object_detector import detect_objects
-
-def array_to_qimage(img_array):
-    """
-    Convert a BGR OpenCV image (NumPy array) to a QImage (RGB888).
-    """
-    height, width, channel = img_array.shape
-    bytes_per_line = channel * width
-    # Convert from BGR (OpenCV) to RGB
-    rgb_img = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
-    return QImage(
-        rgb_img.data,
-        width,
-        height,
-        bytes_per_line,
-        QImage.Format.Format_RGB888
-    )
+
+from models.backends import Detections
+from models.object_detector import draw_detections
+from ui.detection_worker import DetectionPipeline
+from ui.filter_panel import FilterPanel
+from ui.image_bridge import array_to_pixmap, fit_array
+from ui.series_navigator import SeriesNavigator
+from utils.profiling import profiler
+
 
 class DetectionWindow(QWidget):
     def __init__(self, on_save, on_back):
         super().__init__()
         self.on_save = on_save
         self.on_back = on_back
+        self._frame = None         # undrawn full-resolution frame
+        self._view = None          # its FilterableDetections
+        self._display = None       # (frame, width, height, frame fitted to the label)
+        self._last_source = None   # file the result was detected from
         self.setup_ui()
+        self.filter = self.filter_panel.current()
+
+        # inference runs in the background; results come back as signals
+        self.pipeline = DetectionPipeline(self)
+        self.pipeline.progress.connect(self.on_progress)
+        self.pipeline.finished.connect(self.on_detected)
+        self.pipeline.failed.connect(self.on_failed)
+
+        # multi-slice studies: one slice at a time, neighbours prefetched
+        self.series = SeriesNavigator(self)
+        self.series.sliceReady.connect(self.on_slice_ready)
+        self.series.sliceFailed.connect(self.on_slice_failed)
 
     def setup_ui(self):
         # CENTER the label
         self.img_label = QLabel(alignment=Qt.AlignmentFlag.AlignCenter)
+        # the pixmap is sized to the label, so it must not grow the label
+        self.img_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
         self.btn_save  = QPushButton("Save Image")
         self.btn_back  = QPushButton("Return to Main Menu")
         self.btn_save.clicked.connect(self.save)
-        self.btn_back.clicked.connect(self.on_back)
+        self.btn_back.clicked.connect(self.go_back)
+
+        # busy indicator, hidden until a detection is running
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 100)
+        self.progress.hide()
+
+        # slice scroller, only shown for series
+        self.slice_slider = QSlider(Qt.Orientation.Horizontal)
+        self.slice_slider.valueChanged.connect(self.on_slice_changed)
+        self.slice_info = QLabel()
+        self.slice_bar = QWidget()
+        bar = QHBoxLayout(self.slice_bar)
+        bar.setContentsMargins(0, 0, 0, 0)
+        bar.addWidget(self.slice_slider, stretch=1)
+        bar.addWidget(self.slice_info)
+        self.slice_bar.hide()
+
+        # thresholds and classes, applied to the stored boxes without re-running the model
+        self.filter_panel = FilterPanel()
+        self.filter_panel.changed.connect(self.on_filter_changed)
+        self.filter_info = QLabel()
+        self.filter_bar = QWidget()
+        bar = QHBoxLayout(self.filter_bar)
+        bar.setContentsMargins(0, 0, 0, 0)
+        bar.addWidget(self.filter_panel, stretch=1)
+        bar.addWidget(self.filter_info)
 
         layout = QVBoxLayout(self)
         layout.addWidget(self.img_label, stretch=1)
+        layout.addWidget(self.slice_bar)
+        layout.addWidget(self.filter_bar)
+        layout.addWidget(self.progress)
         layout.addWidget(self.btn_save)
         layout.addWidget(self.btn_back)
 
     def load_image_and_detect(self, path):
-        # Run your AI model
-        processed_image, bboxes = detect_objects(path)
-
-        # Convert NumPy → QImage → QPixmap
-        qimg = array_to_qimage(processed_image)
-        pix  = QPixmap.fromImage(qimg)
-        # Scale to fit label while keeping aspect ratio
-        self.img_label.setPixmap(
-            pix.scaled(self.img_label.size(), Qt.AspectRatioMode.KeepAspectRatio)
+        # Hand the image to the worker; a newer image cancels the older one
+        self.close_series()
+        self.set_busy(True)
+        self.img_label.setText("Detecting…")
+        self.pipeline.submit(path)
+
+    def set_busy(self, busy):
+        self.progress.setValue(0)
+        self.progress.setVisible(busy)
+        self.btn_save.setEnabled(not busy)
+        self.setCursor(Qt.CursorShape.BusyCursor if busy else Qt.CursorShape.ArrowCursor)
+
+    def on_progress(self, _path, percent, message):
+        self.progress.setValue(percent)
+        self.progress.setFormat(message)
+
+    def on_failed(self, path, message):
+        self.set_busy(False)
+        self._frame = None
+        self.btn_save.setEnabled(False)
+        self.img_label.setText(f"Detection failed for {path}:\n{message}")
+
+    def on_detected(self, path, frame, view):
+        self.set_busy(False)
+        self.show_result(frame, view, path)
+
+    def show_result(self, frame, view, source_path=None):
+        """
+        Show `frame` (undrawn, full resolution) with the boxes of `view`
+        (FilterableDetections) that pass the current filter.
+        """
+        self._frame = frame
+        self._view = view
+        self._last_source = source_path
+        self.filter_panel.set_classes(view.names, view.classes())
+        self.update_pixmap()
+
+    def on_filter_changed(self, flt):
+        self.filter = flt
+        self.update_pixmap()
+
+    def update_pixmap(self):
+        if self._frame is None:
+            return
+        with profiler.stage("filter_render"):
+            dpr = self.devicePixelRatioF()
+            w = int(self.img_label.width() * dpr)
+            h = int(self.img_label.height() * dpr)
+            # the frame is fitted to the label once; a filter change only redraws boxes
+            if self._display is None or self._display[0] is not self._frame or self._display[1:3] != (w, h):
+                self._display = (self._frame, w, h, fit_array(self._frame, w, h))
+            base = self._display[3]
+            scale = base.shape[1] / self._frame.shape[1]
+            boxes = self._view.select(self.filter)
+            shown = Detections(boxes.xyxy * scale, boxes.conf, boxes.cls)
+            self.img_label.setPixmap(array_to_pixmap(
+                draw_detections(base, shown, self._view.names), None, dpr
+            ))
+        self.filter_info.setText(f"{len(boxes)} of {len(self._view)} boxes")
+
+    def resizeEvent(self, ev):
+        super().resizeEvent(ev)
+        self.update_pixmap()
+
+    # --- series ---------------------------------------------------------------
+    def load_series(self, source):
+        """Show a DICOM folder or multi-frame file slice by slice."""
+        self.pipeline.cancel()
+        try:
+            count = self.series.open(source)
+        except Exception as e:
+            self._frame = None
+            self.btn_save.setEnabled(False)
+            self.img_label.setText(f"Could not open series {source}:\n{e}")
+            return
+        if not count:
+            self.img_label.setText(f"No slices found in {source}")
+            return
+        self._frame = None
+        self.img_label.setText("Detecting…")
+        self.slice_slider.blockSignals(True)
+        self.slice_slider.setRange(0, count - 1)
+        self.slice_slider.setValue(0)
+        self.slice_slider.blockSignals(False)
+        self.slice_bar.setVisible(count > 1)
+        self.on_slice_changed(0)
+
+    def close_series(self):
+        # scroll latencies are already in the profiler (F12 / metrics export)
+        if self.series.slices:
+            self.series.close()
+        self.slice_bar.hide()
+
+    def on_slice_changed(self, index):
+        self.slice_info.setText(f"{index + 1} / {len(self.series.slices)}")
+        self.btn_save.setEnabled(False)
+        self.setCursor(Qt.CursorShape.BusyCursor)
+        self.series.show(index)
+
+    def on_slice_ready(self, index, frame, view):
+        if index != self.slice_slider.value():
+            return
+        self.setCursor(Qt.CursorShape.ArrowCursor)
+        self.btn_save.setEnabled(True)
+        ms, cached = self.series.latencies[-1]
+        p95 = self.series.latency_summary()["p95_ms"]
+        self.slice_info.setText(
+            f"{index + 1} / {len(self.series.slices)} · {self.series.ref(index).label}"
+            f" · {ms:.0f} ms{' (cached)' if cached else ''}, p95 {p95:.0f} ms"
         )
+        # a kept original only gives back its first slice, so later slices
+        # of a multi-frame file are saved without one
+        ref = self.series.ref(index)
+        self.show_result(frame, view, ref.source if ref.index == 0 else None)
+
+    def on_slice_failed(self, index, message):
+        self.setCursor(Qt.CursorShape.ArrowCursor)
+        self._frame = None
+        self.img_label.setText(f"Detection failed for slice {index + 1}:\n{message}")
+
+    def wheelEvent(self, ev):
+        # the mouse wheel scrolls through slices, as in a PACS viewer
+        if self.slice_bar.isVisible():
+            step = -1 if ev.angleDelta().y() > 0 else 1
+            self.slice_slider.setValue(self.slice_slider.value() + step)
+            ev.accept()
+        else:
+            super().wheelEvent(ev)
 
-        # Store for saving
-        self._last_image = processed_image
+    def go_back(self):
+        # nobody is waiting for the result any more
+        self.close_series()
+        self.pipeline.cancel()
+        self.set_busy(False)
+        self.on_back()
 
     def save(self):
-        # Call back into AppWindow.show_save_dialog
-        self.on_save(self._last_image)
\ No newline at end of file
+        if self._frame is None:
+            return
+        # what is on screen, drawn at full resolution
+        image = draw_detections(self._frame, self._view.select(self.filter), self._view.names)
+        # Call back into AppWindow.show_save_dialog with the whole view: every
+        # raw box is stored (with the filter) so the study can be re-thresholded
+        self.on_save(image, self._view, self.filter, self._last_source)
\ No newline at end of file
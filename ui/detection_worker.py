@@ -0,0 +1,177 @@
+# ui/detection_worker.py
+
+import threading
+import time
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from models.filtering import DetectionFilter
+from models.object_detector import detect_objects, detect_inputs, draw_detections, DetectionCancelled
+from models.tiling import default_tiling
+
+_pool = None
+
+def inference_pool() -> QThreadPool:
+    """
+    The one thread all inference runs on. The model is shared, so single
+    and batch jobs are queued here rather than run side by side.
+    """
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(1)
+    return _pool
+
+
+class DetectionSignals(QObject):
+    # job id, percent, message
+    progress = pyqtSignal(int, int, str)
+    # job id, undrawn BGR image, FilterableDetections
+    result   = pyqtSignal(int, object, object)
+    # job id, error message
+    error    = pyqtSignal(int, str)
+
+
+class DetectionJob(QRunnable):
+    """
+    Runs detect_objects() for one image off the GUI thread. Signals are
+    delivered to the GUI thread through Qt's queued connections.
+    """
+    def __init__(self, job_id: int, path: str):
+        super().__init__()
+        self.job_id  = job_id
+        self.path    = path
+        self.signals = DetectionSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            image, boxes = detect_objects(
+                self.path,
+                progress=lambda p, msg: self.signals.progress.emit(self.job_id, p, msg),
+                cancelled=self.is_cancelled,
+                tiling=default_tiling(),
+                raw=True,
+            )
+        except DetectionCancelled:
+            return
+        except Exception as e:
+            if not self.is_cancelled():
+                self.signals.error.emit(self.job_id, str(e))
+            return
+        if not self.is_cancelled():
+            self.signals.result.emit(self.job_id, image, boxes)
+
+
+class BatchSignals(QObject):
+    # list of (path or SliceRef, processed BGR image or None, boxes shown
+    # or None, FilterableDetections or None), seconds taken
+    batch    = pyqtSignal(object, float)
+    # total images, total seconds
+    finished = pyqtSignal(int, float)
+    error    = pyqtSignal(str)
+
+
+class BatchDetectionJob(QRunnable):
+    """
+    Runs detect_inputs() over many files (every slice of multi-frame
+    ones) and streams each finished batch back to the GUI thread.
+    Overlays use the default thresholds; the raw detections go along so
+    an opened result can still be re-filtered.
+    """
+    def __init__(self, paths, batch_size: int = 8):
+        super().__init__()
+        self.paths      = list(paths)
+        self.batch_size = batch_size
+        self.signals    = BatchSignals()
+        self._cancel    = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        t0 = time.perf_counter()
+        done = 0
+        try:
+            t_batch = time.perf_counter()
+            for batch in detect_inputs(self.paths, self.batch_size, cancelled=self._cancel.is_set,
+                                       tiling=default_tiling(), raw=True):
+                now = time.perf_counter()
+                done += len(batch)
+                self.signals.batch.emit([self._shown(*item) for item in batch], now - t_batch)
+                t_batch = now
+        except DetectionCancelled:
+            return
+        except Exception as e:
+            self.signals.error.emit(str(e))
+            return
+        self.signals.finished.emit(done, time.perf_counter() - t0)
+
+    @staticmethod
+    def _shown(label, bgr, view):
+        if bgr is None:
+            return label, None, None, None
+        boxes = view.select(DetectionFilter())
+        return label, draw_detections(bgr, boxes, view.names, inplace=True), boxes, view
+
+
+class DetectionPipeline(QObject):
+    """
+    Queues detection jobs on the shared inference thread (the model is
+    shared, so jobs run one at a time). Submitting a new image cancels
+    whatever was pending or running before it.
+    """
+    progress = pyqtSignal(str, int, str)
+    finished = pyqtSignal(str, object, object)
+    failed   = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = inference_pool()
+        self._next_id = 0
+        self._current = None
+
+    def submit(self, path: str):
+        self.cancel()
+        self._next_id += 1
+        job = DetectionJob(self._next_id, path)
+        job.setAutoDelete(False)
+        job.signals.progress.connect(self._on_progress)
+        job.signals.result.connect(self._on_result)
+        job.signals.error.connect(self._on_error)
+        self._current = job
+        self.pool.start(job)
+        return job.job_id
+
+    def cancel(self):
+        if self._current is not None:
+            self._current.cancel()
+            # drop it if it never got a thread
+            self.pool.tryTake(self._current)
+            self._current = None
+
+    def is_busy(self) -> bool:
+        return self._current is not None
+
+    def _is_current(self, job_id):
+        return self._current is not None and self._current.job_id == job_id
+
+    def _on_progress(self, job_id, percent, message):
+        if self._is_current(job_id):
+            self.progress.emit(self._current.path, percent, message)
+
+    def _on_result(self, job_id, image, boxes):
+        if self._is_current(job_id):
+            path, self._current = self._current.path, None
+            self.finished.emit(path, image, boxes)
+
+    def _on_error(self, job_id, message):
+        if self._is_current(job_id):
+            path, self._current = self._current.path, None
+            self.failed.emit(path, message)
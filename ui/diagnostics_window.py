@@ -0,0 +1,85 @@
+# ui/diagnostics_window.py
+
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton,
+    QLabel, QFileDialog, QHeaderView
+)
+from PyQt6.QtCore import Qt, QTimer
+
+from utils.profiling import profiler
+
+COLUMNS = ["Stage", "Count", "Mean ms", "p50 ms", "p95 ms", "p99 ms", "Total s"]
+KEYS    = ["count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "total_s"]
+
+
+class DiagnosticsWindow(QDialog):
+    """
+    Live view of the per-stage timers and counters (utils.profiling),
+    refreshed once a second while open, with JSON / Prometheus export.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.resize(720, 420)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.lbl_counters = QLabel()
+        self.lbl_counters.setWordWrap(True)
+
+        btn_json  = QPushButton("Export JSON…")
+        btn_json.clicked.connect(lambda: self.export("JSON (*.json)", "metrics.json"))
+        btn_prom  = QPushButton("Export Prometheus…")
+        btn_prom.clicked.connect(lambda: self.export("Prometheus text (*.prom)", "metrics.prom"))
+        btn_reset = QPushButton("Reset")
+        btn_reset.clicked.connect(self.reset)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(btn_json)
+        buttons.addWidget(btn_prom)
+        buttons.addStretch(1)
+        buttons.addWidget(btn_reset)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table, stretch=1)
+        layout.addWidget(self.lbl_counters)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self, interval=1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, ev):
+        super().showEvent(ev)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, ev):
+        self.timer.stop()
+        super().hideEvent(ev)
+
+    def refresh(self):
+        snap = profiler.snapshot()
+        stages = snap["stages"]
+        self.table.setRowCount(len(stages))
+        for row, (name, s) in enumerate(stages.items()):
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+            for col, key in enumerate(KEYS, start=1):
+                item = QTableWidgetItem(f"{s[key]:g}")
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, col, item)
+        counters = snap["counters"]
+        self.lbl_counters.setText(
+            "  ·  ".join(f"{k}: {v}" for k, v in sorted(counters.items())) or "No events yet"
+        )
+
+    def reset(self):
+        profiler.reset()
+        self.refresh()
+
+    def export(self, file_filter, default_name):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", default_name, file_filter)
+        if path:
+            profiler.export(path)
@@ -0,0 +1,97 @@
+# ui/filter_panel.py
+
+from PyQt6.QtWidgets import QWidget, QLabel, QSlider, QCheckBox, QPushButton, QHBoxLayout
+from PyQt6.QtCore import Qt, pyqtSignal
+
+from models.backends import DEFAULT_CONF, DEFAULT_IOU
+from models.filtering import RAW_CONF, DetectionFilter
+
+
+class FilterPanel(QWidget):
+    """
+    Confidence / IoU sliders and one checkbox per disease class. Emits
+    `changed(DetectionFilter)` on every move; re-filtering and redrawing
+    is cheap enough to follow the slider live.
+    """
+    changed = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # sliders work in hundredths
+        self.conf_slider = QSlider(Qt.Orientation.Horizontal)
+        self.conf_slider.setRange(int(round(RAW_CONF * 100)), 95)
+        self.conf_slider.setValue(int(round(DEFAULT_CONF * 100)))
+        self.conf_slider.setToolTip("Hide boxes the model is less sure about")
+        self.iou_slider = QSlider(Qt.Orientation.Horizontal)
+        self.iou_slider.setRange(10, int(round(DEFAULT_IOU * 100)))
+        self.iou_slider.setValue(int(round(DEFAULT_IOU * 100)))
+        self.iou_slider.setToolTip("Lower merges more overlapping boxes of the same class")
+        self.conf_label = QLabel()
+        self.iou_label  = QLabel()
+        for slider in (self.conf_slider, self.iou_slider):
+            slider.valueChanged.connect(self._emit)
+
+        btn_reset = QPushButton("Reset")
+        btn_reset.clicked.connect(self.reset)
+
+        self._class_boxes = {}   # class id -> QCheckBox
+        self._classes = QHBoxLayout()
+        self._classes.setContentsMargins(0, 0, 0, 0)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.conf_label)
+        layout.addWidget(self.conf_slider, stretch=1)
+        layout.addWidget(self.iou_label)
+        layout.addWidget(self.iou_slider, stretch=1)
+        layout.addLayout(self._classes)
+        layout.addWidget(btn_reset)
+        self._update_labels()
+
+    def set_classes(self, names: dict, present=()):
+        """One checkbox per class the model knows; classes not in `present` are greyed out."""
+        if set(self._class_boxes) != set(names):
+            hidden = self.current().hidden
+            for box in self._class_boxes.values():
+                self._classes.removeWidget(box)
+                box.deleteLater()
+            self._class_boxes = {}
+            for cid in sorted(names):
+                box = QCheckBox(str(names[cid]))
+                box.setChecked(cid not in hidden)
+                box.toggled.connect(self._emit)
+                self._classes.addWidget(box)
+                self._class_boxes[cid] = box
+        present = set(present)
+        for cid, box in self._class_boxes.items():
+            box.setEnabled(cid in present)
+
+    def current(self) -> DetectionFilter:
+        return DetectionFilter(
+            conf=self.conf_slider.value() / 100,
+            iou=self.iou_slider.value() / 100,
+            hidden=[cid for cid, box in self._class_boxes.items() if not box.isChecked()],
+        )
+
+    def set_filter(self, flt: DetectionFilter):
+        """Show `flt` (e.g. the one a study was saved with) and emit it once."""
+        for w in [self.conf_slider, self.iou_slider, *self._class_boxes.values()]:
+            w.blockSignals(True)
+        self.conf_slider.setValue(int(round(flt.conf * 100)))
+        self.iou_slider.setValue(int(round(flt.iou * 100)))
+        for cid, box in self._class_boxes.items():
+            box.setChecked(cid not in flt.hidden)
+        for w in [self.conf_slider, self.iou_slider, *self._class_boxes.values()]:
+            w.blockSignals(False)
+        self._emit()
+
+    def reset(self):
+        self.set_filter(DetectionFilter())
+
+    def _update_labels(self):
+        self.conf_label.setText(f"Confidence ≥ {self.conf_slider.value() / 100:.2f}")
+        self.iou_label.setText(f"IoU {self.iou_slider.value() / 100:.2f}")
+
+    def _emit(self, *_args):
+        self._update_labels()
+        self.changed.emit(self.current())
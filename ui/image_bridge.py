@@ -0,0 +1,60 @@
+# ui/image_bridge.py
+
+import cv2
+import numpy as np
+from PyQt6.QtGui import QImage, QPixmap
+
+from utils.profiling import profiler
+
+
+def array_to_qimage(img_array):
+    """
+    Wrap a BGR OpenCV image (NumPy array) in a QImage (BGR888) without
+    converting or copying it. The QImage holds a reference to the array,
+    so the pixels stay valid for as long as the QImage does.
+    """
+    # rows may be padded, but pixels inside a row must be packed
+    if img_array.strides[1:] != (3, 1):
+        img_array = np.ascontiguousarray(img_array)
+    height, width = img_array.shape[:2]
+    qimg = QImage(
+        img_array.data,
+        width,
+        height,
+        img_array.strides[0],
+        QImage.Format.Format_BGR888
+    )
+    qimg._buffer = img_array  # keep the backing memory alive
+    return qimg
+
+
+def fit_array(img_array, width: int, height: int):
+    """
+    Downscale a frame to fit inside width × height, keeping the aspect
+    ratio. Frames that already fit are returned as they are.
+    """
+    h, w = img_array.shape[:2]
+    scale = min(width / w, height / h)
+    if scale >= 1.0 or width <= 0 or height <= 0:
+        return img_array
+    size = (max(1, int(w * scale)), max(1, int(h * scale)))
+    return cv2.resize(img_array, size, interpolation=cv2.INTER_AREA)
+
+
+def array_to_pixmap(img_array, size=None, device_pixel_ratio: float = 1.0):
+    """
+    Turn a BGR frame into a QPixmap for display. With a `size` (QSize of
+    the target widget) the frame is downscaled once on the NumPy side, so
+    only display-sized pixels are uploaded and nothing is scaled again.
+    """
+    if size is not None:
+        with profiler.stage("display_resize"):
+            img_array = fit_array(
+                img_array,
+                int(size.width() * device_pixel_ratio),
+                int(size.height() * device_pixel_ratio),
+            )
+    with profiler.stage("qpixmap_upload"):
+        pix = QPixmap.fromImage(array_to_qimage(img_array))
+    pix.setDevicePixelRatio(device_pixel_ratio)
+    return pix
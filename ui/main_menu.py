@@ -1,12 +1,21 @@
 # ui/main_menu.py
-from PyQt6.QtWidgets import QWidget, QLabel, QPushButton, QVBoxLayout, QFileDialog
+import os
+from PyQt6.QtWidgets import QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QFileDialog, QComboBox
 from PyQt6.QtCore import Qt, pyqtSignal
 
+from models.profiles import PROFILES
+from utils.image_utils import collect_image_paths, IMAGE_EXTS
+
+# "Images (*.png *.jpg … *.dcm *.tif)" for the open dialog
+FILE_FILTER = "Images and series (" + " ".join("*" + e for e in IMAGE_EXTS) + ")"
+
 class ImageDropLabel(QLabel):
-    imageDropped = pyqtSignal(str)
+    imageDropped  = pyqtSignal(str)
+    # several files and/or folders at once
+    imagesDropped = pyqtSignal(list)
 
     def __init__(self):
-        super().__init__("Drag & Drop an image here")
+        super().__init__("Drag & Drop an image or a study folder here")
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setStyleSheet("border: 2px dashed #aaa;")
         self.setAcceptDrops(True)
@@ -16,36 +25,83 @@ class ImageDropLabel(QLabel):
             ev.acceptProposedAction()
 
     def dropEvent(self, ev):
-        path = ev.mimeData().urls()[0].toLocalFile()
-        self.imageDropped.emit(path)
+        paths = [u.toLocalFile() for u in ev.mimeData().urls() if u.isLocalFile()]
+        if len(paths) == 1 and not os.path.isdir(paths[0]):
+            self.imageDropped.emit(paths[0])
+        elif paths:
+            self.imagesDropped.emit(paths)
 
 class MainMenuWindow(QWidget):
-    def __init__(self, on_select_image, on_saved_images):
+    def __init__(self, on_select_image, on_saved_images, on_select_batch, on_select_series=None,
+                 on_select_profile=None, profile=None):
         super().__init__()
         self.on_select_image = on_select_image
+        self.on_select_batch = on_select_batch
+        self.on_select_series = on_select_series
         self.on_saved_images = on_saved_images
-        self.setup_ui()
+        self.on_select_profile = on_select_profile
+        self.setup_ui(profile)
 
-    def setup_ui(self):
+    def setup_ui(self, profile=None):
         self.lbl_doctor   = QLabel("Dr. Yusuf", alignment=Qt.AlignmentFlag.AlignCenter)
         self.drop_area    = ImageDropLabel()
         self.drop_area.imageDropped.connect(self.handle_image)
+        self.drop_area.imagesDropped.connect(self.handle_batch)
 
         btn_select = QPushButton("Select Image")
         btn_select.clicked.connect(self.open_file_dialog)
+        btn_folder = QPushButton("Select Study Folder")
+        btn_folder.clicked.connect(self.open_folder_dialog)
+        btn_series = QPushButton("Open DICOM Series")
+        btn_series.clicked.connect(self.open_series_dialog)
+        btn_series.setVisible(self.on_select_series is not None)
         btn_saved  = QPushButton("Saved Images")
         btn_saved.clicked.connect(self.on_saved_images)
 
+        # accurate / balanced / fast; switching reloads the model in the background
+        self.profile_box = QComboBox()
+        for name in PROFILES:
+            self.profile_box.addItem(name.capitalize(), name)
+        self.profile_box.setCurrentIndex(max(0, self.profile_box.findData(profile)))
+        self.profile_box.setToolTip("Trade a little accuracy for speed on CPU-only machines")
+        self.profile_box.currentIndexChanged.connect(
+            lambda _i: self.on_select_profile(self.profile_box.currentData())
+        )
+        profile_row = QHBoxLayout()
+        profile_row.addWidget(QLabel("Inference profile:"))
+        profile_row.addWidget(self.profile_box, stretch=1)
+
         layout = QVBoxLayout(self)
         layout.addWidget(self.lbl_doctor)
         layout.addWidget(self.drop_area, stretch=1)
         layout.addWidget(btn_select)
+        layout.addWidget(btn_folder)
+        layout.addWidget(btn_series)
         layout.addWidget(btn_saved)
+        if self.on_select_profile is not None:
+            layout.addLayout(profile_row)
 
     def open_file_dialog(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Choose Image", filter="Images (*.png *.jpg)")
-        if path:
-            self.handle_image(path)
+        paths, _ = QFileDialog.getOpenFileNames(self, "Choose Images", filter=FILE_FILTER)
+        if len(paths) == 1:
+            self.handle_image(paths[0])
+        elif paths:
+            self.handle_batch(paths)
+
+    def open_folder_dialog(self):
+        folder = QFileDialog.getExistingDirectory(self, "Choose Study Folder")
+        if folder:
+            self.handle_batch([folder])
+
+    def open_series_dialog(self):
+        folder = QFileDialog.getExistingDirectory(self, "Choose DICOM Series Folder")
+        if folder:
+            self.on_select_series(folder)
 
     def handle_image(self, path):
-        self.on_select_image(path)
\ No newline at end of file
+        self.on_select_image(path)
+
+    def handle_batch(self, paths):
+        images = collect_image_paths(paths)
+        if images:
+            self.on_select_batch(images)
\ No newline at end of file
@@ -0,0 +1,60 @@
+# ui/save_queue.py
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from utils.image_utils import save_image
+
+
+class _SaveSignals(QObject):
+    # entry (name, note, timestamp, path), SaveResult
+    saved  = pyqtSignal(object, object)
+    # name, error message
+    failed = pyqtSignal(str, str)
+
+
+class _SaveJob(QRunnable):
+    def __init__(self, signals, img_array, name, timestamp, note, kwargs):
+        super().__init__()
+        self.signals   = signals
+        self.img_array = img_array
+        self.name      = name
+        self.timestamp = timestamp
+        self.note      = note
+        self.kwargs    = kwargs
+
+    def run(self):
+        try:
+            result = save_image(self.img_array, self.name, self.timestamp, self.note, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.name, str(e))
+            return
+        self.signals.saved.emit((self.name, self.note, self.timestamp, result.path), result)
+
+
+class SaveQueue(QObject):
+    """
+    Encodes and writes saved studies on a background thread, one at a
+    time and in the order they were submitted, so the dialog closes
+    immediately and large PNGs never stall the UI.
+    """
+    saved  = pyqtSignal(object, object)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = _SaveSignals()
+        self._signals.saved.connect(self.saved)
+        self._signals.failed.connect(self.failed)
+
+    def submit(self, img_array, name, timestamp, note, **kwargs):
+        """kwargs are passed through to utils.image_utils.save_image."""
+        self._pool.start(_SaveJob(self._signals, img_array, name, timestamp, note, kwargs))
+
+    def pending(self) -> int:
+        return self._pool.activeThreadCount()
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Block until every queued save is on disk (e.g. before quitting)."""
+        return self._pool.waitForDone(msecs)
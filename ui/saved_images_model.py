@@ -0,0 +1,269 @@
+# ui/saved_images_model.py
+
+import os
+import time
+from collections import OrderedDict
+
+from PyQt6.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool,
+    QFileSystemWatcher, QTimer, pyqtSignal
+)
+from PyQt6.QtGui import QIcon
+
+from ui.image_bridge import array_to_pixmap
+from utils.image_utils import metadata_store, search_entries, sync_archive
+from utils.thumbnail_cache import load_thumbnail
+
+# how many decoded thumbnails are kept as QIcons
+ICON_CACHE_SIZE = 2000
+# network shares often don't deliver change events, so the folder is also
+# re-checked this often (seconds, 0 disables); an unchanged folder costs a stat
+ARCHIVE_POLL = float(os.environ.get("AHT_ARCHIVE_POLL", "30"))
+# a copy of many files arrives as a burst of events; sync once it settles
+WATCH_DEBOUNCE_MS = 500
+
+COLUMNS = ["", "Name", "Note", "Date", "Time"]
+COL_THUMB, COL_NAME, COL_NOTE, COL_DATE, COL_TIME = range(len(COLUMNS))
+
+# custom roles
+PathRole = Qt.ItemDataRole.UserRole
+NoteRole = Qt.ItemDataRole.UserRole + 1
+
+
+class _ThumbSignals(QObject):
+    # path, BGR thumbnail (or None)
+    loaded = pyqtSignal(str, object)
+
+
+class _ThumbJob(QRunnable):
+    def __init__(self, path: str, signals: _ThumbSignals):
+        super().__init__()
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        self.signals.loaded.emit(self.path, load_thumbnail(self.path))
+
+
+class SavedImagesModel(QAbstractTableModel):
+    """
+    Table model over the saved-image entries. Thumbnails are only asked
+    for when the view paints a row; they load on a background pool (via
+    the on-disk thumbnail cache) and the row updates when they arrive.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # entries: list of (name: str, note: str, timestamp: datetime, path: str)
+        self.entries  = []
+        self._rows    = {}              # path -> row
+        self._icons   = OrderedDict()   # path -> QIcon, LRU
+        self._pending = set()
+        self._pool    = QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+        self._signals = _ThumbSignals()
+        self._signals.loaded.connect(self._on_thumb)
+
+    # --- data ---------------------------------------------------------------
+    def set_entries(self, entries):
+        self.beginResetModel()
+        self.entries = list(entries)
+        self._rows = {e[3]: i for i, e in enumerate(self.entries)}
+        self.endResetModel()
+
+    def append_entry(self, entry):
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.entries.append(entry)
+        self._rows[entry[3]] = row
+        self.endInsertRows()
+
+    def entry(self, row: int):
+        return self.entries[row]
+
+    # --- Qt model API ---------------------------------------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name, note, ts, path = self.entries[index.row()]
+        col = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == COL_NAME:
+                return name
+            if col == COL_NOTE:
+                # first line only; the preview shows the full note
+                return note.splitlines()[0] if note else ""
+            if col == COL_DATE:
+                return ts.strftime("%Y-%m-%d")
+            if col == COL_TIME:
+                return ts.strftime("%H:%M:%S")
+        elif role == Qt.ItemDataRole.DecorationRole and col == COL_THUMB:
+            return self._icon(path)
+        elif role == PathRole:
+            return path
+        elif role == NoteRole:
+            return note
+        return None
+
+    # --- thumbnails -------------------------------------------------------------
+    def _icon(self, path):
+        icon = self._icons.get(path)
+        if icon is not None:
+            self._icons.move_to_end(path)
+            return icon
+        if path not in self._pending:
+            self._pending.add(path)
+            self._pool.start(_ThumbJob(path, self._signals))
+        return None
+
+    def _on_thumb(self, path, thumb):
+        self._pending.discard(path)
+        if thumb is None:
+            return
+        self._icons[path] = QIcon(array_to_pixmap(thumb))
+        while len(self._icons) > ICON_CACHE_SIZE:
+            self._icons.popitem(last=False)
+        row = self._rows.get(path)
+        if row is not None:
+            idx = self.index(row, COL_THUMB)
+            self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DecorationRole])
+
+
+class _SearchSignals(QObject):
+    # request id, entries, disease names, seconds taken
+    done = pyqtSignal(int, object, object, float)
+
+
+class SearchJob(QRunnable):
+    """Runs one archive query off the GUI thread."""
+    def __init__(self, request_id: int, query: dict, signals: _SearchSignals):
+        super().__init__()
+        self.request_id = request_id
+        self.query = query
+        self.signals = signals
+
+    def run(self):
+        t0 = time.perf_counter()
+        try:
+            rows = search_entries(**self.query)
+            # fetched here too so the filter combo never queries on the GUI thread
+            diseases = metadata_store.diseases()
+        except Exception as e:
+            print(f"⚠️  Search failed: {e}")
+            rows, diseases = [], []
+        self.signals.done.emit(self.request_id, rows, diseases, time.perf_counter() - t0)
+
+
+class ArchiveSearch(QObject):
+    """
+    Serializes archive queries on one background thread and only reports
+    the result of the newest request; older ones are dropped.
+    """
+    finished = pyqtSignal(object, object, float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = _SearchSignals()
+        self._signals.done.connect(self._on_done)
+        self._latest = 0
+
+    def submit(self, **query):
+        self._latest += 1
+        # queries that haven't started yet are stale now
+        self._pool.clear()
+        self._pool.start(SearchJob(self._latest, query, self._signals))
+
+    def _on_done(self, request_id, rows, diseases, seconds):
+        if request_id == self._latest:
+            self.finished.emit(rows, diseases, seconds)
+
+
+class _SyncSignals(QObject):
+    # rows added, rows removed
+    done = pyqtSignal(int, int)
+
+
+class SyncJob(QRunnable):
+    """Brings the index in line with the folder (see sync_archive) off the GUI thread."""
+    def __init__(self, force: bool, signals: _SyncSignals):
+        super().__init__()
+        self.force = force
+        self.signals = signals
+
+    def run(self):
+        try:
+            added, removed = sync_archive(self.force)
+        except Exception as e:
+            print(f"⚠️  Archive sync failed: {e}")
+            added = removed = 0
+        self.signals.done.emit(added, removed)
+
+
+class ArchiveWatcher(QObject):
+    """
+    Keeps the index in step with the saved-images folder while the app
+    runs. Folder change events (debounced) and a slow poll both trigger a
+    background delta sync; `changed(added, removed)` is emitted when it
+    actually added or dropped rows. Nothing happens until start().
+    """
+    changed = pyqtSignal(int, int)
+
+    def __init__(self, folder: str, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = _SyncSignals()
+        self._signals.done.connect(self._on_done)
+        self._running = False
+        self._again   = False
+        self._watcher = None
+        self._debounce = QTimer(self, singleShot=True, interval=WATCH_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.sync_now)
+        self._poll = QTimer(self, interval=int(ARCHIVE_POLL * 1000))
+        self._poll.timeout.connect(self.sync_now)
+
+    @property
+    def started(self) -> bool:
+        return self._watcher is not None
+
+    def start(self):
+        if self.started:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        self._watcher = QFileSystemWatcher(self)
+        if not self._watcher.addPath(self.folder):
+            print(f"⚠️  Can't watch {self.folder}; relying on polling")
+        self._watcher.directoryChanged.connect(lambda _path: self._debounce.start())
+        if ARCHIVE_POLL > 0:
+            self._poll.start()
+        self.sync_now()
+
+    def sync_now(self, force: bool = False):
+        if self._running:
+            # one sync at a time; changes seen meanwhile get one more pass
+            self._again = True
+            return
+        self._running = True
+        self._pool.start(SyncJob(force, self._signals))
+
+    def _on_done(self, added, removed):
+        self._running = False
+        if self._again:
+            self._again = False
+            self.sync_now()
+        if added or removed:
+            self.changed.emit(added, removed)
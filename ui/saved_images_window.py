@@ -1,54 +1,110 @@
 # ui/saved_images_window.py
 
-import os
 from datetime import datetime
 
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QLineEdit, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QTableView,
     QPushButton, QHeaderView, QAbstractItemView,
-    QDialog, QLabel, QScrollArea
+    QDialog, QLabel, QScrollArea, QComboBox, QDoubleSpinBox, QCheckBox, QDateEdit
 )
-from PyQt6.QtGui import QPixmap, QIcon
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer, QDate
 
-from utils.image_utils import SAVE_DIR
+from models.backends import Detections
+from models.object_detector import draw_detections, load_saved_detections, render_from_original
+from ui.filter_panel import FilterPanel
+from ui.image_bridge import array_to_pixmap
+from ui.saved_images_model import SavedImagesModel, ArchiveSearch, ArchiveWatcher
+from utils.image_utils import SAVE_DIR, original_path_for
+from utils.image_io import read_image, read_reduced, fit_within
+from utils.thumbnail_cache import THUMB_SIZE
+
+# longest side of the preview image, in logical pixels
+PREVIEW_SIDE = 1400
 
 
 class SavedImagesWindow(QWidget):
     def __init__(self, on_back):
         super().__init__()
         self.on_back = on_back
-        # entries: list of (name: str, note: str, timestamp: datetime, path: str)
-        self.entries = []
+        # rows live in the model; only visible rows are ever rendered
+        self.model = SavedImagesModel(self)
+        # queries run against the indexed store on a background thread
+        self.searcher = ArchiveSearch(self)
+        self.searcher.finished.connect(self.on_search_done)
+        # files added to the folder by others are indexed as they appear;
+        # started (and the archive first loaded) when the page is first shown
+        self.watcher = ArchiveWatcher(SAVE_DIR, self)
+        self.watcher.changed.connect(self.on_archive_changed)
         self.setup_ui()
-        self._load_existing_entries()
-        self.refresh_table()
+
+    @property
+    def entries(self):
+        # list of (name: str, note: str, timestamp: datetime, path: str)
+        return self.model.entries
 
     def setup_ui(self):
-        # Search bar
-        self.search = QLineEdit(placeholderText="Search by name…")
-        self.search.textChanged.connect(self.refresh_table)
+        # Search bar: words match names and notes (full text)
+        self.search = QLineEdit(placeholderText="Search names and notes…")
+        # query once typing pauses, not on every keystroke
+        self._search_timer = QTimer(self, singleShot=True, interval=150)
+        self._search_timer.timeout.connect(self.refresh_table)
+        self.search.textChanged.connect(self._search_timer.start)
+
+        # Structured filters: disease, minimum confidence, date range
+        self.disease = QComboBox()
+        self.disease.addItem("Any disease", None)
+        self.disease.currentIndexChanged.connect(self._search_timer.start)
+
+        self.min_conf = QDoubleSpinBox(minimum=0.0, maximum=1.0, singleStep=0.05)
+        self.min_conf.setSpecialValueText("Any confidence")
+        self.min_conf.setPrefix("Conf ≥ ")
+        self.min_conf.valueChanged.connect(self._search_timer.start)
+
+        self.use_dates = QCheckBox("Date range")
+        self.date_from = QDateEdit(calendarPopup=True)
+        self.date_to   = QDateEdit(calendarPopup=True)
+        self.date_from.setDate(QDate.currentDate().addMonths(-1))
+        self.date_to.setDate(QDate.currentDate())
+        for w in (self.date_from, self.date_to):
+            w.setEnabled(False)
+            w.dateChanged.connect(self._search_timer.start)
+            self.use_dates.toggled.connect(w.setEnabled)
+        self.use_dates.toggled.connect(self._search_timer.start)
+
+        filters = QHBoxLayout()
+        filters.addWidget(self.disease)
+        filters.addWidget(self.min_conf)
+        filters.addWidget(self.use_dates)
+        filters.addWidget(self.date_from)
+        filters.addWidget(self.date_to)
+        filters.addStretch(1)
+
+        self.lbl_count = QLabel()
 
         # Table with 5 columns: Thumb | Name | Note | Date | Time
-        self.table = QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(
-            ["", "Name", "Note", "Date", "Time"]
-        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.verticalHeader().setVisible(False)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
-        self.table.setIconSize(QSize(80, 80))
+        self.table.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        # fixed row height: the view never has to measure off-screen rows
+        vhdr = self.table.verticalHeader()
+        vhdr.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vhdr.setDefaultSectionSize(THUMB_SIZE + 4)
 
         hdr = self.table.horizontalHeader()
         hdr.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
-        self.table.setColumnWidth(0, 80)
+        self.table.setColumnWidth(0, THUMB_SIZE)
         hdr.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         hdr.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
-        hdr.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
-        hdr.setSectionResizeMode(4, QHeaderView.ResizeMode.ResizeToContents)
+        hdr.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)
+        hdr.setSectionResizeMode(4, QHeaderView.ResizeMode.Fixed)
+        self.table.setColumnWidth(3, 100)
+        self.table.setColumnWidth(4, 80)
 
         # Double‐click to preview
-        self.table.cellDoubleClicked.connect(self.on_preview)
+        self.table.doubleClicked.connect(self.on_preview)
 
         # Back button
         btn_back = QPushButton("Back")
@@ -57,99 +113,116 @@ class SavedImagesWindow(QWidget):
         # Layout
         layout = QVBoxLayout(self)
         layout.addWidget(self.search)
+        layout.addLayout(filters)
         layout.addWidget(self.table, stretch=1)
+        layout.addWidget(self.lbl_count)
         layout.addWidget(btn_back)
 
-    def _load_existing_entries(self):
-        if not os.path.isdir(SAVE_DIR):
-            return
-
-        # load all notes
-        from utils.image_utils import _load_metadata
-        meta = _load_metadata()
-
-        for fname in sorted(os.listdir(SAVE_DIR)):
-            if not fname.lower().endswith(".png"):
-                continue
-            base = fname[:-4]
-            if "_" not in base:
-                continue
-            name, ts_str = base.split("_", 1)
-            try:
-                ts = datetime.strptime(ts_str, "%Y%m%d_%H%M%S")
-            except ValueError:
-                continue
-            full_path = os.path.join(SAVE_DIR, fname)
-            note = meta.get(fname, "")  # lookup the saved note
-            self.entries.append((name, note, ts, full_path))
-
     def add_entry(self, name: str, note: str, timestamp: datetime, path: str):
-        self.entries.append((name, note, timestamp, path))
+        self.model.append_entry((name, note, timestamp, path))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.watcher.started:
+            self.lbl_count.setText("Loading archive…")
+            self.watcher.start()
         self.refresh_table()
 
     def refresh_table(self):
-        text = self.search.text().lower()
-        self.table.setRowCount(0)
-
-        for name, note, ts, path in self.entries:
-            if text and text not in name.lower():
-                continue
-
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-
-            # --- Thumbnail ---
-            pix = QPixmap(path)
-            thumb = pix.scaled(
-                80, 80,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            item_icon = QTableWidgetItem()
-            item_icon.setIcon(QIcon(thumb))
-            item_icon.setData(Qt.ItemDataRole.UserRole, path)
-            self.table.setItem(row, 0, item_icon)
-
-            # --- Name ---
-            self.table.setItem(row, 1, QTableWidgetItem(name))
-
-            # --- Note (first line only) ---
-            first_line = note.splitlines()[0] if note else ""
-            self.table.setItem(row, 2, QTableWidgetItem(first_line))
-
-            # --- Date & Time ---
-            self.table.setItem(row, 3,
-                               QTableWidgetItem(ts.strftime("%Y-%m-%d")))
-            self.table.setItem(row, 4,
-                               QTableWidgetItem(ts.strftime("%H:%M:%S")))
-
-    def on_preview(self, row, _col):
-        # retrieve stored data
-        item = self.table.item(row, 0)
-        path = item.data(Qt.ItemDataRole.UserRole)
-        name = self.table.item(row, 1).text()
-        # look up full note
-        note = ""
-        for n, full_note, ts, p in self.entries:
-            if p == path:
-                note = full_note
-                break
-
-        pix = QPixmap(path)
-        if pix.isNull():
-            return
-
+        query = {
+            "text": self.search.text(),
+            "disease": self.disease.currentData(),
+            "min_conf": self.min_conf.value() or None,
+        }
+        if self.use_dates.isChecked():
+            start = self.date_from.date().toPyDate()
+            end   = self.date_to.date().toPyDate()
+            query["since"] = datetime.combine(start, datetime.min.time())
+            query["until"] = datetime.combine(end, datetime.max.time())
+        self.searcher.submit(**query)
+
+    def _refresh_diseases(self, diseases):
+        # add classes that appeared since the last refresh
+        known = {self.disease.itemData(i) for i in range(self.disease.count())}
+        for name in diseases:
+            if name not in known:
+                self.disease.addItem(name, name)
+
+    def on_search_done(self, entries, diseases, seconds):
+        self._refresh_diseases(diseases)
+        self.model.set_entries(entries)
+        self.lbl_count.setText(f"{len(entries)} images ({seconds * 1000:.0f} ms)")
+
+    def on_archive_changed(self, added, removed):
+        # the index already holds the delta; re-running the query is cheap
+        if self.isVisible():
+            self.refresh_table()
+
+    def on_preview(self, index):
+        # the row maps straight to its entry, no scan needed
+        name, note, _ts, path = self.model.entry(index.row())
+
+        # decode only as much as the dialog can show; 1:1 loads the full image
         dlg = QDialog(self)
         dlg.setWindowTitle(f"{name} — Preview")
         dlg.resize(1000, 600)
+        dpr = self.devicePixelRatioF()
+
+        # with its original and raw boxes kept, a study can be re-thresholded
+        view, saved_filter = load_saved_detections(path)
+        original = original_path_for(path) if view is not None else None
+        source = read_image(original)[1] if original else None
+        if source is not None:
+            base = fit_within(source, int(PREVIEW_SIDE * dpr))
+            scale = base.shape[1] / source.shape[1]
+            preview = base
+        else:
+            preview = read_reduced(path, int(PREVIEW_SIDE * dpr))
+        if preview is None:
+            return
 
         # Left: scrollable image
         scroll = QScrollArea(dlg)
         lbl_img = QLabel()
-        lbl_img.setPixmap(pix)
+        lbl_img.setPixmap(array_to_pixmap(preview, device_pixel_ratio=dpr))
         lbl_img.setAlignment(Qt.AlignmentFlag.AlignCenter)
         scroll.setWidget(lbl_img)
         scroll.setWidgetResizable(True)
+        image_layout = QVBoxLayout()
+        image_layout.addWidget(scroll, stretch=1)
+
+        filter_panel = None
+        if source is not None:
+            lbl_boxes = QLabel()
+
+            def redraw(flt):
+                # the reduced original is kept; a filter change only redraws boxes
+                boxes = view.select(flt)
+                shown = Detections(boxes.xyxy * scale, boxes.conf, boxes.cls)
+                lbl_img.setPixmap(array_to_pixmap(
+                    draw_detections(base, shown, view.names), device_pixel_ratio=dpr
+                ))
+                lbl_boxes.setText(f"{len(boxes)} of {len(view)} boxes")
+                btn_full.setEnabled(True)
+
+            filter_panel = FilterPanel()
+            filter_panel.set_classes(view.names, view.classes())
+            filter_panel.changed.connect(redraw)
+            image_layout.addWidget(filter_panel)
+            image_layout.addWidget(lbl_boxes)
+
+        def show_full_size():
+            if filter_panel is not None:
+                full = render_from_original(path, filter_panel.current())
+            else:
+                _data, full = read_image(path)
+            if full is not None:
+                lbl_img.setPixmap(array_to_pixmap(full))
+            btn_full.setEnabled(False)
+
+        btn_full = QPushButton("1:1")
+        btn_full.setToolTip("Load the image at full resolution")
+        btn_full.clicked.connect(show_full_size)
 
         # Right: name and full note
         info_layout = QVBoxLayout()
@@ -164,11 +237,15 @@ class SavedImagesWindow(QWidget):
             info_layout.addWidget(lbl_note)
 
         info_layout.addStretch(1)
+        info_layout.addWidget(btn_full)
+
+        if filter_panel is not None:
+            # starts at the thresholds the study was saved with
+            filter_panel.set_filter(saved_filter)
 
         # Combine horizontally
-        from PyQt6.QtWidgets import QHBoxLayout
         layout = QHBoxLayout(dlg)
-        layout.addWidget(scroll, stretch=3)
+        layout.addLayout(image_layout, stretch=3)
         layout.addLayout(info_layout, stretch=1)
 
         dlg.exec()
\ No newline at end of file
@@ -0,0 +1,171 @@
+# ui/series_navigator.py
+
+import os
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from models.object_detector import detect_frame
+from models.tiling import default_tiling
+from ui.detection_worker import inference_pool
+from utils.profiling import profiler
+from utils.series_io import series_slices, read_slice, DEFAULT_WINDOW
+
+# processed slices kept in memory, so scrolling back is instant
+SLICE_CACHE_SIZE = int(os.environ.get("AHT_SLICE_CACHE", "48"))
+# slices ahead of the current one that are detected in the background
+PREFETCH_AHEAD = int(os.environ.get("AHT_PREFETCH", "4"))
+
+# the slice on screen jumps the queue ahead of prefetches
+_PRIORITY_CURRENT  = 2
+_PRIORITY_PREFETCH = 1
+
+
+class _SliceSignals(QObject):
+    # series generation, slice index, undrawn BGR, FilterableDetections
+    done  = pyqtSignal(int, int, object, object)
+    # series generation, slice index, error message
+    error = pyqtSignal(int, int, str)
+
+
+class _SliceJob(QRunnable):
+    def __init__(self, generation, index, ref, window, signals):
+        super().__init__()
+        self.generation = generation
+        self.index   = index
+        self.ref     = ref
+        self.window  = window
+        self.signals = signals
+
+    def run(self):
+        try:
+            bgr = read_slice(self.ref, self.window)
+            if bgr is None:
+                raise ValueError(f"Could not read {self.ref.label}")
+            frame, view = detect_frame(bgr, tiling=default_tiling(), raw=True)
+        except Exception as e:
+            self.signals.error.emit(self.generation, self.index, str(e))
+            return
+        self.signals.done.emit(self.generation, self.index, frame, view)
+
+
+class SeriesNavigator(QObject):
+    """
+    Slice-by-slice access to a series for the viewer. `show(i)` delivers
+    slice i (decoded and detected) through `sliceReady`, from the LRU of
+    processed slices when possible, and queues the next few slices on the
+    inference thread while the current one is being read. The time from
+    `show` to `sliceReady` is recorded as the scroll latency.
+    """
+    sliceReady  = pyqtSignal(int, object, object)
+    sliceFailed = pyqtSignal(int, str)
+
+    def __init__(self, parent=None, window=DEFAULT_WINDOW):
+        super().__init__(parent)
+        self.window   = window
+        self.slices   = []
+        self._cache   = OrderedDict()   # index -> (frame, FilterableDetections), LRU
+        self._jobs    = {}              # index -> queued or running _SliceJob
+        self._current = None
+        self._asked   = None            # perf_counter() of the last show()
+        self._generation = 0            # bumped per series, to drop stale results
+        self._signals = _SliceSignals()
+        self._signals.done.connect(self._on_done)
+        self._signals.error.connect(self._on_error)
+        # (milliseconds, served from cache) per slice shown
+        self.latencies = deque(maxlen=500)
+
+    def open(self, source: str) -> int:
+        """Index the slices of `source` (headers only); returns how many."""
+        self.close()
+        self.slices = series_slices(source)
+        return len(self.slices)
+
+    def close(self):
+        pool = inference_pool()
+        for job in self._jobs.values():
+            pool.tryTake(job)
+        self._jobs.clear()
+        self._cache.clear()
+        self._generation += 1
+        self.slices = []
+        self._current = None
+
+    def ref(self, index: int):
+        return self.slices[index]
+
+    def show(self, index: int):
+        self._current = index
+        self._asked = time.perf_counter()
+        hit = self._cache.get(index)
+        if hit is not None:
+            self._cache.move_to_end(index)
+            self._deliver(index, hit, cached=True)
+        else:
+            self._submit(index, _PRIORITY_CURRENT)
+        self._prefetch(index)
+
+    def _submit(self, index, priority):
+        pool = inference_pool()
+        job = self._jobs.get(index)
+        if job is not None:
+            # already waiting as a prefetch: requeue it at the front
+            if priority == _PRIORITY_CURRENT and pool.tryTake(job):
+                pool.start(job, priority)
+            return
+        job = _SliceJob(self._generation, index, self.slices[index], self.window, self._signals)
+        job.setAutoDelete(False)
+        self._jobs[index] = job
+        pool.start(job, priority)
+
+    def _prefetch(self, index):
+        wanted = set(range(index + 1, min(len(self.slices), index + 1 + PREFETCH_AHEAD)))
+        # scrolling backwards is common too
+        if index > 0:
+            wanted.add(index - 1)
+        pool = inference_pool()
+        for i, job in list(self._jobs.items()):
+            # the reader moved on: drop prefetches that haven't started yet
+            if i != index and i not in wanted and pool.tryTake(job):
+                del self._jobs[i]
+        for i in sorted(wanted):
+            if i not in self._cache:
+                self._submit(i, _PRIORITY_PREFETCH)
+
+    def _on_done(self, generation, index, frame, view):
+        if generation != self._generation:
+            return   # from a series that was closed since
+        self._jobs.pop(index, None)
+        self._cache[index] = (frame, view)
+        while len(self._cache) > SLICE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        if index == self._current:
+            self._deliver(index, (frame, view), cached=False)
+
+    def _on_error(self, generation, index, message):
+        if generation != self._generation:
+            return
+        self._jobs.pop(index, None)
+        if index == self._current:
+            self.sliceFailed.emit(index, message)
+
+    def _deliver(self, index, result, cached):
+        seconds = time.perf_counter() - self._asked
+        self.latencies.append((seconds * 1000, cached))
+        profiler.record("slice_scroll", seconds)
+        profiler.count("slice_cache_hit" if cached else "slice_cache_miss")
+        self.sliceReady.emit(index, *result)
+
+    def latency_summary(self) -> dict:
+        """p50/p95 scroll latency in ms and the share of slices served from cache."""
+        if not self.latencies:
+            return {"count": 0}
+        ms = np.array([m for m, _c in self.latencies])
+        return {
+            "count": len(ms),
+            "p50_ms": round(float(np.percentile(ms, 50)), 1),
+            "p95_ms": round(float(np.percentile(ms, 95)), 1),
+            "cache_hit_rate": round(sum(c for _m, c in self.latencies) / len(ms), 3),
+        }
@@ -0,0 +1,138 @@
+# utils/detection_cache.py
+
+import hashlib
+import json
+import os
+import threading
+
+# Raw detections live here, one small JSON file per (image, model, settings)
+CACHE_DIR = os.environ.get(
+    "AHT_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "cache", "detections"),
+)
+# Oldest-used entries are dropped once the cache grows past this
+DEFAULT_MAX_BYTES = int(os.environ.get("AHT_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+_file_hashes = {}
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def file_hash(path: str) -> str:
+    """
+    SHA-256 of a file's contents, remembered per (path, size, mtime) so
+    the model weights are only hashed once per run.
+    """
+    st = os.stat(path)
+    sig = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if sig not in _file_hashes:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _file_hashes[sig] = h.hexdigest()
+    return _file_hashes[sig]
+
+
+class DetectionCache:
+    """
+    Persistent, content-addressed cache of raw detections. Entries are
+    keyed by image content + model weights + inference settings, and the
+    least recently used ones are evicted once `max_bytes` is exceeded
+    (a hit refreshes the entry's mtime).
+    """
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits      = 0
+        self.misses    = 0
+        self._lock     = threading.Lock()
+        self._size     = None   # total bytes on disk, computed lazily
+
+    @staticmethod
+    def make_key(image_hash: str, weights_hash: str, settings: dict) -> str:
+        raw = f"{image_hash}:{weights_hash}:{json.dumps(settings, sort_keys=True)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        # two-level fan-out keeps directories small
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key: str):
+        """
+        Return (rows, class_names) for `key`, or None on a miss. `rows` is
+        a list of [x1, y1, x2, y2, conf, cls].
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        names = {int(k): v for k, v in entry["names"].items()}
+        return entry["rows"], names
+
+    def put(self, key: str, rows, names: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({"rows": rows, "names": names}, ensure_ascii=False)
+        # write-then-rename so a crash never leaves half an entry behind
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        with self._lock:
+            self._size = self._disk_size() if self._size is None else self._size + len(payload)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for fname in files:
+                if fname.endswith(".json"):
+                    full = os.path.join(root, fname)
+                    try:
+                        st = os.stat(full)
+                    except OSError:
+                        continue
+                    yield full, st.st_size, st.st_mtime
+
+    def _disk_size(self) -> int:
+        return sum(size for _p, size, _m in self._entries())
+
+    def _evict(self):
+        # drop least recently used entries down to 90% of the cap
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _p, size, _m in entries)
+        for path, size, _mtime in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_size()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# shared instance used by the detector
+detection_cache = DetectionCache()
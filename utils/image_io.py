@@ -0,0 +1,101 @@
+# utils/image_io.py
+
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.profiling import profiler
+from utils.series_io import is_series_file, read_first_frame
+
+# Files at least this big are memory-mapped instead of read into memory
+MMAP_MIN_BYTES = int(float(os.environ.get("AHT_MMAP_MIN_MB", "4")) * 1024 * 1024)
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 size (other formats are
+# decoded and then shrunk by OpenCV)
+_REDUCED_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+
+def file_buffer(path: str):
+    """
+    The raw bytes of a file as a uint8 array: memory-mapped for large
+    files (the OS pages it in as the decoder reads, with no extra copy),
+    read normally for small ones. None if the file can't be read.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return None
+        if size >= MMAP_MIN_BYTES:
+            return np.memmap(path, dtype=np.uint8, mode="r")
+        return np.fromfile(path, dtype=np.uint8)
+    except (OSError, ValueError):
+        return None
+
+
+def read_image(image_path: str):
+    """
+    Read a file once and return (raw bytes, decoded BGR frame) at full
+    resolution, for inference. Either is None if the file can't be read /
+    decoded. DICOM and TIFF files give their first slice, windowed to 8
+    bits; their "bytes" are those pixels, so the cache key follows the
+    window that was applied.
+    """
+    with profiler.stage("decode"):
+        if is_series_file(image_path):
+            bgr = read_first_frame(image_path)
+            return (None, None) if bgr is None else (bgr.tobytes(), bgr)
+        data = file_buffer(image_path)
+        if data is None:
+            return None, None
+        return data, cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+def image_size(path: str):
+    """(width, height) from the file header alone, or None."""
+    try:
+        with Image.open(path) as im:
+            return im.size
+    except Exception:
+        return None
+
+
+def fit_within(bgr, max_side: int):
+    """Shrink so the longest side is at most `max_side`; smaller images are returned as is."""
+    h, w = bgr.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1.0:
+        return bgr
+    dims = (max(1, int(w * scale)), max(1, int(h * scale)))
+    return cv2.resize(bgr, dims, interpolation=cv2.INTER_AREA)
+
+
+def read_reduced(path: str, max_side: int):
+    """
+    Decode an image for display only, with its longest side at most
+    `max_side`. JPEGs are decoded at 1/2, 1/4 or 1/8 scale directly, which
+    skips most of the work; None if the file can't be read.
+    """
+    if is_series_file(path):
+        bgr = read_first_frame(path)
+        return None if bgr is None else fit_within(bgr, max_side)
+    flag = cv2.IMREAD_COLOR
+    size = image_size(path)
+    if size is not None:
+        longest = max(size)
+        for factor, reduced in _REDUCED_FLAGS.items():
+            # the largest reduction that still leaves enough pixels
+            if longest // factor >= max_side:
+                flag = reduced
+                break
+    data = file_buffer(path)
+    if data is None:
+        return None
+    with profiler.stage("decode_reduced"):
+        bgr = cv2.imdecode(data, flag)
+        return None if bgr is None else fit_within(bgr, max_side)
@@ -1,13 +1,48 @@
 # utils/image_utils.py
 
-import os, json
+import os, json, tempfile, time
 import cv2
 from datetime import datetime
+from typing import NamedTuple
+
+from utils.metadata_store import MetadataStore, index_path
+from utils.original_store import OriginalStore, KEEP_ORIGINALS
+from utils.profiling import profiler
+from utils.series_io import SERIES_EXTS
 
 # Where images go
-SAVE_DIR = os.path.join(os.path.dirname(__file__), "..", "saved_images")
-# Metadata JSON sits next to images
+SAVE_DIR = os.environ.get(
+    "AHT_SAVE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "saved_images"),
+)
+# Legacy metadata JSON next to the images (only read for migration now)
 META_PATH = os.path.join(SAVE_DIR, "metadata.json")
+# Indexed metadata store (SQLite) on this machine; SAVE_DIR may be a share
+INDEX_DIR = os.environ.get(
+    "AHT_INDEX_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "cache", "index"),
+)
+metadata_store = MetadataStore(SAVE_DIR, index_path(INDEX_DIR, SAVE_DIR))
+# Unannotated inputs, stored once per distinct file (opt-in, see KEEP_ORIGINALS)
+original_store = OriginalStore(os.path.join(SAVE_DIR, "originals"))
+# Inputs we know how to run detection on
+IMAGE_EXTS = (".png", ".jpg", ".jpeg") + SERIES_EXTS
+
+def collect_image_paths(paths) -> list:
+    """
+    Expand a mix of files and directories into a sorted list of image
+    files (directories are walked recursively).
+    """
+    found = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _dirs, files in os.walk(p):
+                for fname in files:
+                    if fname.lower().endswith(IMAGE_EXTS):
+                        found.append(os.path.join(root, fname))
+        elif p.lower().endswith(IMAGE_EXTS):
+            found.append(p)
+    return sorted(found)
 
 def _load_metadata():
     if os.path.isfile(META_PATH):
@@ -15,23 +50,200 @@ def _load_metadata():
             return json.load(f)
     return {}
 
-def _save_metadata(meta: dict):
-    os.makedirs(SAVE_DIR, exist_ok=True)
-    with open(META_PATH, "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
+_migrated = False
+
+def _ensure_migrated():
+    # the first call after upgrading imports metadata.json into the store
+    global _migrated
+    if not _migrated:
+        metadata_store.migrate_from_json(_load_metadata())
+        _migrated = True
+
+def search_entries(**query) -> list:
+    """
+    Saved images matching `query` (see MetadataStore.search) as
+    (name, note, timestamp, path), oldest first.
+    """
+    _ensure_migrated()
+    return metadata_store.search(**query)
 
-def save_image(img_array, name: str, timestamp: datetime, note: str) -> str:
+def sync_archive(force: bool = False) -> tuple:
     """
-    Saves the image and records its note in metadata.json.
+    Pick up images that reached SAVE_DIR without going through this app
+    and forget deleted ones (see MetadataStore.sync_with_disk). Returns
+    (added, removed).
     """
+    _ensure_migrated()
+    return metadata_store.sync_with_disk(force)
+
+def load_entries() -> list:
+    """All saved images as (name, note, timestamp, path), oldest first."""
+    return search_entries()
+
+def summarize_detections(detections, class_names: dict):
+    """
+    Per-class box counts and highest confidences, keyed by class name.
+    """
+    class_counts, class_conf = {}, {}
+    for c, p in zip(detections.cls, detections.conf):
+        label = class_names.get(int(c), str(int(c)))
+        class_counts[label] = class_counts.get(label, 0) + 1
+        class_conf[label] = max(class_conf.get(label, 0.0), float(p))
+    return class_counts, class_conf
+
+# Lossless encoders a study can be saved with: name -> (extension, level -> cv2 params)
+ENCODERS = {
+    # level 0-9: higher is smaller and slower; OpenCV's default is 1
+    "png":  (".png",  lambda level: [cv2.IMWRITE_PNG_COMPRESSION, level]),
+    # quality above 100 switches OpenCV's WebP encoder to lossless
+    "webp": (".webp", lambda level: [cv2.IMWRITE_WEBP_QUALITY, 101]),
+}
+if hasattr(cv2, "IMWRITE_JPEGXL_DISTANCE") and cv2.haveImageWriter("x.jxl"):
+    # distance 0 is mathematically lossless; effort 1-9 trades speed for size
+    ENCODERS["jxl"] = (".jxl", lambda level: [
+        cv2.IMWRITE_JPEGXL_DISTANCE, 0,
+        cv2.IMWRITE_JPEGXL_EFFORT, max(1, min(9, level)),
+    ])
+DEFAULT_ENCODER = os.environ.get("AHT_SAVE_FORMAT", "png")
+DEFAULT_LEVEL   = int(os.environ.get("AHT_SAVE_LEVEL", "3"))
+
+class SaveResult(NamedTuple):
+    path: str
+    encode_seconds: float
+    size_bytes: int
+
+def _safe_name(name: str) -> str:
+    # keep the user's name readable but never let it leave SAVE_DIR
+    cleaned = "".join("-" if c in '/\\:*?"<>|' or ord(c) < 32 else c for c in name)
+    return cleaned.strip(" .") or "image"
+
+_hard_links = True   # cleared once SAVE_DIR turns out not to support them
+
+def _claim_path(tmp: str, name: str, timestamp: datetime, ext: str) -> str:
+    """
+    Publish the finished file `tmp` under a name nobody else has:
+    `<name>_<timestamp><ext>`, then `<name>_<timestamp>-2<ext>`, … A hard
+    link fails if the name exists, so two saves within the same second
+    (or from two machines) can't overwrite each other, and the name only
+    ever appears with the complete image behind it.
+    """
+    global _hard_links
+    base = f"{_safe_name(name)}_{timestamp.strftime('%Y%m%d_%H%M%S')}"
+    if not _hard_links:
+        return _claim_path_excl(tmp, base, ext)
+    n = 1
+    while True:
+        fname = base + (f"-{n}" if n > 1 else "") + ext
+        full_path = os.path.join(SAVE_DIR, fname)
+        try:
+            os.link(tmp, full_path)
+            return full_path
+        except FileExistsError:
+            n += 1
+        except OSError as e:
+            # filesystems without hard links (FAT, some shares): claim the
+            # name with O_EXCL and move the data over it
+            print(f"⚠️  Hard links unavailable in {SAVE_DIR} ({e}), saving without them")
+            _hard_links = False
+            return _claim_path_excl(tmp, base, ext)
+
+def _claim_path_excl(tmp: str, base: str, ext: str) -> str:
+    n = 1
+    while True:
+        full_path = os.path.join(SAVE_DIR, base + (f"-{n}" if n > 1 else "") + ext)
+        try:
+            os.close(os.open(full_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            n += 1
+            continue
+        try:
+            os.replace(tmp, full_path)
+        except BaseException:
+            os.remove(full_path)
+            raise
+        return full_path
+
+def write_image(img_array, name: str, timestamp: datetime,
+                encoder: str = DEFAULT_ENCODER, level: int = DEFAULT_LEVEL) -> SaveResult:
+    """
+    Encode and write one image under a collision-free name. The bytes go
+    to a temporary file first, which is only linked under its final name
+    once complete, so a crash never leaves a half-written image behind.
+    """
+    ext, params = ENCODERS[encoder]
+    t0 = time.perf_counter()
+    ok, buf = cv2.imencode(ext, img_array, params(level))
+    if not ok:
+        raise ValueError(f"Could not encode image as {encoder}")
+    encode_seconds = time.perf_counter() - t0
+    profiler.record(f"encode_{encoder}", encode_seconds)
+
     os.makedirs(SAVE_DIR, exist_ok=True)
-    fname = f"{name}_{timestamp.strftime('%Y%m%d_%H%M%S')}.png"
-    full_path = os.path.join(SAVE_DIR, fname)
-    cv2.imwrite(full_path, img_array)
+    fd, tmp = tempfile.mkstemp(prefix=".saving-", suffix=".tmp", dir=SAVE_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(buf.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        full_path = _claim_path(tmp, name, timestamp, ext)
+    finally:
+        # the linked name keeps the data; without hard links tmp is already gone
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return SaveResult(full_path, encode_seconds, len(buf))
 
-    # record note
-    meta = _load_metadata()
-    meta[fname] = note
-    _save_metadata(meta)
+def save_image(img_array, name: str, timestamp: datetime, note: str,
+               detections=None, class_names: dict = None,
+               model_version: str = None, encoder: str = DEFAULT_ENCODER,
+               level: int = DEFAULT_LEVEL, original_path: str = None,
+               shown=None, view_filter: dict = None) -> SaveResult:
+    """
+    Saves the image and records its note and detections in the metadata
+    store. `detections` should be every raw box, so the overlay can be
+    redrawn and re-thresholded later without running the model again;
+    `shown` (the boxes that passed `view_filter` on screen, default all of
+    them) is what the class summary and disease search go by. Returns the
+    path plus how long encoding took and how big the file is.
 
-    return full_path
\ No newline at end of file
+    With an `original_path` and KEEP_ORIGINALS on, the unannotated source
+    is kept in the original store (once, however often it is saved) so
+    the study can be re-analysed without going back to where it came from.
+    """
+    keep = original_path is not None and KEEP_ORIGINALS
+    original = original_store.put_file(original_path) if keep else None
+    result = write_image(img_array, name, timestamp, encoder, level)
+    fname = os.path.basename(result.path)
+
+    # record note + detections (one row, not a rewrite of the archive)
+    class_counts, class_conf = {}, {}
+    if detections is not None:
+        class_counts, class_conf = summarize_detections(
+            shown if shown is not None else detections, class_names or {})
+    h, w = img_array.shape[:2]
+    metadata_store.add(
+        fname, name, timestamp, note, class_counts, model_version, class_conf,
+        detections=detections, class_names=class_names, image_size=(w, h),
+        original=original, view_filter=view_filter,
+    )
+
+    return result
+
+def original_path_for(image_path: str):
+    """
+    Path of the kept original a saved image was annotated from, or None
+    if its source wasn't kept.
+    """
+    key = metadata_store.original_for(os.path.basename(image_path))
+    if key is None or not original_store.has(key):
+        return None
+    return original_store.path_for(key)
+
+def prune_originals() -> int:
+    """
+    Drop kept originals no saved image refers to any more. The index is
+    synced first so images deleted from SAVE_DIR (here or on another
+    machine) release their originals. Run it while no saves are pending,
+    or a just-stored original may lose its row.
+    """
+    sync_archive(force=True)
+    return original_store.prune(metadata_store.original_refs())
@@ -0,0 +1,551 @@
+# utils/metadata_store.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from urllib.request import pathname2url
+
+import numpy as np
+
+# SQLite index over the saved images, replacing metadata.json
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id            INTEGER PRIMARY KEY,
+    fname         TEXT NOT NULL UNIQUE,
+    name          TEXT NOT NULL,
+    note          TEXT NOT NULL DEFAULT '',
+    timestamp     TEXT NOT NULL,
+    classes       TEXT NOT NULL DEFAULT '',
+    box_count     INTEGER NOT NULL DEFAULT 0,
+    model_version TEXT,
+    original      TEXT,           -- key in the OriginalStore, if the source was kept
+    has_meta      INTEGER NOT NULL DEFAULT 0   -- row was built from the image's sidecar
+);
+CREATE INDEX IF NOT EXISTS idx_images_name      ON images (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_images_timestamp ON images (timestamp);
+
+-- one row per detected class per image, for indexed disease lookups
+CREATE TABLE IF NOT EXISTS image_classes (
+    image_id  INTEGER NOT NULL REFERENCES images (id) ON DELETE CASCADE,
+    class     TEXT NOT NULL,
+    count     INTEGER NOT NULL,
+    max_conf  REAL,
+    PRIMARY KEY (image_id, class)
+);
+CREATE INDEX IF NOT EXISTS idx_image_classes_class ON image_classes (class, max_conf);
+
+-- raw model output per image, column-wise as packed little-endian arrays:
+-- xyxy float32 (N, 4), conf float32 (N,), cls uint16 (N,)
+CREATE TABLE IF NOT EXISTS detections (
+    image_id      INTEGER PRIMARY KEY REFERENCES images (id) ON DELETE CASCADE,
+    model_version TEXT,
+    class_names   TEXT NOT NULL,
+    width         INTEGER,
+    height        INTEGER,
+    n             INTEGER NOT NULL,
+    xyxy          BLOB NOT NULL,
+    conf          BLOB NOT NULL,
+    cls           BLOB NOT NULL,
+    view_filter   TEXT            -- JSON thresholds the study was shown and saved with
+);
+
+-- small key/value bookkeeping, e.g. the folder state the index was last synced with
+CREATE TABLE IF NOT EXISTS store_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# full-text index over names and notes, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(
+    name, note, content='images', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS images_fts_ai AFTER INSERT ON images BEGIN
+    INSERT INTO images_fts (rowid, name, note) VALUES (new.id, new.name, new.note);
+END;
+CREATE TRIGGER IF NOT EXISTS images_fts_ad AFTER DELETE ON images BEGIN
+    INSERT INTO images_fts (images_fts, rowid, name, note) VALUES ('delete', old.id, old.name, old.note);
+END;
+CREATE TRIGGER IF NOT EXISTS images_fts_au AFTER UPDATE ON images BEGIN
+    INSERT INTO images_fts (images_fts, rowid, name, note) VALUES ('delete', old.id, old.name, old.note);
+    INSERT INTO images_fts (rowid, name, note) VALUES (new.id, new.name, new.note);
+END;
+"""
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+# a folder modified this recently may change again within its mtime's
+# resolution (seconds on SMB/FAT), so its signature isn't trusted yet
+MTIME_SETTLE_SECONDS = 2.0
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix
+    (so typing "hep" finds "hepatomegaly").
+    """
+    return " ".join(f'"{w}"*' for w in re.findall(r"\w+", text))
+
+
+SAVED_EXTS = (".png", ".webp", ".jxl")
+# next to every saved image: its note and detections as JSON (<fname>.json),
+# so any machine sharing the folder can index it
+SIDECAR_SUFFIX = ".json"
+
+
+def index_path(index_dir: str, save_dir: str) -> str:
+    """
+    Where the index of `save_dir` lives on this machine: one database per
+    folder under `index_dir`. SQLite's locking (and WAL) isn't safe on a
+    network share, so the index is kept local and rebuilt from the folder.
+    """
+    key = hashlib.sha1(os.path.realpath(save_dir).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(index_dir, f"archive-{key}.db")
+
+
+def make_record(name: str, timestamp: datetime, note: str = "", class_counts: dict = None,
+                model_version: str = None, class_conf: dict = None, detections=None,
+                class_names: dict = None, image_size=None, original: str = None,
+                view_filter: dict = None) -> dict:
+    """One saved image's metadata as plain JSON types (the sidecar's contents)."""
+    record = {
+        "name": name,
+        "timestamp": timestamp.strftime(TS_FORMAT),
+        "note": note or "",
+        "class_counts": class_counts or {},
+        "class_conf": class_conf or {},
+        "model_version": model_version,
+        "original": original,
+        "detections": None,
+    }
+    if detections is not None:
+        record["detections"] = {
+            "class_names": {str(int(k)): v for k, v in (class_names or {}).items()},
+            "image_size": list(image_size) if image_size else None,
+            "view_filter": view_filter,
+            "xyxy": np.round(np.asarray(detections.xyxy, dtype=np.float64).reshape(-1, 4), 2).tolist(),
+            "conf": np.round(np.asarray(detections.conf, dtype=np.float64).reshape(-1), 4).tolist(),
+            "cls":  np.asarray(detections.cls).astype(int).reshape(-1).tolist(),
+        }
+    return record
+
+
+def parse_image_filename(fname: str):
+    """
+    Split a saved file name `<name>_<YYYYmmdd_HHMMSS>[-N].<ext>` into
+    (name, datetime), or None if it doesn't follow that pattern.
+    """
+    base, ext = os.path.splitext(fname)
+    if ext.lower() not in SAVED_EXTS or "_" not in base:
+        return None
+    name, ts_str = base.split("_", 1)
+    # "-2", "-3", … disambiguate saves within the same second
+    ts_str = ts_str.split("-", 1)[0]
+    try:
+        return name, datetime.strptime(ts_str, "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+
+
+class MetadataStore:
+    """
+    Indexed metadata for saved images. Inserts touch one row instead of
+    rewriting the whole archive, and WAL mode keeps readers and the writer
+    from blocking each other. The folder stays the source of truth: every
+    add also writes a sidecar next to the image, and sync_with_disk builds
+    rows from what other machines wrote. `db_path` defaults to
+    metadata.db inside `save_dir` (fine for a local folder only).
+    """
+    def __init__(self, save_dir: str, db_path: str = None):
+        self.save_dir    = save_dir
+        # where older versions kept the index, next to the images
+        self.legacy_path = os.path.join(save_dir, "metadata.db")
+        self.db_path     = db_path or self.legacy_path
+        self._lock       = threading.Lock()
+        self._conn       = None
+        self.has_fts     = False
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.save_dir, exist_ok=True)
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            fresh = not os.path.exists(self.db_path)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            if fresh and self.db_path != self.legacy_path and os.path.isfile(self.legacy_path):
+                self._import_legacy(conn)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(SCHEMA)
+            # databases from before max_conf existed
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(image_classes)")}
+            if "max_conf" not in cols:
+                conn.execute("ALTER TABLE image_classes ADD COLUMN max_conf REAL")
+            # ... and from before originals could be kept
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(images)")}
+            if "original" not in cols:
+                conn.execute("ALTER TABLE images ADD COLUMN original TEXT")
+            # ... and from before sidecars
+            if "has_meta" not in cols:
+                conn.execute("ALTER TABLE images ADD COLUMN has_meta INTEGER NOT NULL DEFAULT 0")
+            # ... and from before the on-screen filter was stored
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(detections)")}
+            if "view_filter" not in cols:
+                conn.execute("ALTER TABLE detections ADD COLUMN view_filter TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_images_original ON images (original)")
+            self.has_fts = self._init_fts(conn)
+            self._conn = conn
+        return self._conn
+
+    def _import_legacy(self, conn):
+        # seed a new local index with the notes an older version kept in the
+        # shared folder; read once, read-only, never written again
+        uri = "file:" + pathname2url(os.path.abspath(self.legacy_path)) + "?mode=ro"
+        try:
+            src = sqlite3.connect(uri, uri=True)
+            try:
+                src.backup(conn)
+            finally:
+                src.close()
+            print(f"Imported the archive index from {self.legacy_path}")
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not import {self.legacy_path}, rebuilding from the files: {e}")
+
+    @staticmethod
+    def _init_fts(conn) -> bool:
+        had_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'images_fts'"
+        ).fetchone() is not None
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            # sqlite built without FTS5: search falls back to LIKE
+            print(f"⚠️  Full-text search unavailable: {e}")
+            return False
+        if not had_fts:
+            # index rows that were stored before the FTS table existed
+            with conn:
+                conn.execute("INSERT INTO images_fts (images_fts) VALUES ('rebuild')")
+        return True
+
+    def add(self, fname: str, name: str, timestamp: datetime, note: str = "",
+            class_counts: dict = None, model_version: str = None,
+            class_conf: dict = None, detections=None, class_names: dict = None,
+            image_size=None, original: str = None, view_filter: dict = None) -> int:
+        """
+        Record one saved image. `class_counts` maps each detected disease
+        class name to its number of boxes, `class_conf` to its highest
+        confidence. `detections` (anything with `xyxy`, `conf` and `cls`
+        arrays) is stored raw, together with the `class_names` id→name map,
+        the (width, height) of the image it belongs to and the `view_filter`
+        settings it was shown with. `original` is the OriginalStore key of
+        the unannotated source, if it was kept. The same record is written
+        to the image's sidecar.
+        """
+        record = make_record(name, timestamp, note, class_counts, model_version, class_conf,
+                             detections, class_names, image_size, original, view_filter)
+        self._write_sidecar(fname, record)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return self._insert_record(conn, fname, record, has_meta=True)
+
+    def _sidecar_path(self, fname: str) -> str:
+        return os.path.join(self.save_dir, fname + SIDECAR_SUFFIX)
+
+    def _write_sidecar(self, fname: str, record: dict):
+        path = self._sidecar_path(fname)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.save_dir, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            # the local index still has it; other machines only see the image
+            print(f"⚠️  Could not write {path}: {e}")
+
+    def _read_sidecar(self, fname: str):
+        try:
+            with open(self._sidecar_path(fname), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable sidecar for {fname}: {e}")
+            return None
+
+    def _insert_record(self, conn, fname: str, record: dict, has_meta: bool) -> int:
+        counts = record.get("class_counts") or {}
+        conf   = record.get("class_conf") or {}
+        # explicit delete so FTS triggers and cascades fire on overwrite
+        conn.execute("DELETE FROM images WHERE fname = ?", (fname,))
+        cur = conn.execute(
+            "INSERT INTO images"
+            " (fname, name, note, timestamp, classes, box_count, model_version, original, has_meta)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (fname, record["name"], record.get("note") or "", record["timestamp"],
+             ",".join(sorted(counts)), sum(counts.values()), record.get("model_version"),
+             record.get("original"), int(has_meta)),
+        )
+        image_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO image_classes (image_id, class, count, max_conf) VALUES (?, ?, ?, ?)",
+            [(image_id, c, n, conf.get(c)) for c, n in counts.items()],
+        )
+        dets = record.get("detections")
+        if dets is not None:
+            self._insert_detections(
+                conn, image_id, SimpleNamespace(xyxy=dets["xyxy"], conf=dets["conf"], cls=dets["cls"]),
+                {int(k): v for k, v in dets["class_names"].items()},
+                record.get("model_version"), dets.get("image_size"), dets.get("view_filter"),
+            )
+        return image_id
+
+    @staticmethod
+    def _insert_detections(conn, image_id, dets, class_names, model_version, image_size,
+                           view_filter=None):
+        xyxy = np.asarray(dets.xyxy, dtype="<f4").reshape(-1, 4)
+        conf = np.asarray(dets.conf, dtype="<f4").reshape(-1)
+        cls  = np.asarray(dets.cls).astype("<u2").reshape(-1)
+        width, height = image_size or (None, None)
+        conn.execute(
+            "INSERT OR REPLACE INTO detections"
+            " (image_id, model_version, class_names, width, height, n, xyxy, conf, cls, view_filter)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (image_id, model_version,
+             json.dumps({int(k): v for k, v in class_names.items()}, ensure_ascii=False),
+             width, height, len(conf), xyxy.tobytes(), conf.tobytes(), cls.tobytes(),
+             json.dumps(view_filter) if view_filter else None),
+        )
+
+    @staticmethod
+    def _unpack_detections(row) -> dict:
+        model_version, names, width, height, n, xyxy, conf, cls, view_filter = row
+        return {
+            "model_version": model_version,
+            "view_filter": json.loads(view_filter) if view_filter else None,
+            "class_names": {int(k): v for k, v in json.loads(names).items()},
+            "image_size": (width, height),
+            "xyxy": np.frombuffer(xyxy, dtype="<f4").reshape(n, 4),
+            "conf": np.frombuffer(conf, dtype="<f4"),
+            "cls":  np.frombuffer(cls, dtype="<u2").astype(np.int64),
+        }
+
+    def detections_for(self, fname: str):
+        """
+        The raw detections saved with `fname` as a dict of NumPy arrays
+        (xyxy, conf, cls) plus class_names, image_size, model_version and
+        the view_filter it was saved with; None if it was saved without them.
+        """
+        rows = self._query(
+            "SELECT d.model_version, d.class_names, d.width, d.height, d.n, d.xyxy, d.conf, d.cls,"
+            " d.view_filter"
+            " FROM detections d JOIN images i ON i.id = d.image_id WHERE i.fname = ?",
+            (fname,),
+        )
+        return self._unpack_detections(rows[0]) if rows else None
+
+    def detection_columns(self) -> dict:
+        """
+        Every stored box in the archive as flat columns, for analytics
+        without touching pixels or the model: `image_id`, `cls`, `conf`
+        (NumPy arrays of equal length) and `class_names` per model version.
+        """
+        rows = self._query("SELECT image_id, model_version, class_names, n, conf, cls FROM detections")
+        ids, confs, clss, names = [], [], [], {}
+        for image_id, version, class_names, n, conf, cls in rows:
+            ids.append(np.full(n, image_id, dtype=np.int64))
+            confs.append(np.frombuffer(conf, dtype="<f4"))
+            clss.append(np.frombuffer(cls, dtype="<u2"))
+            names.setdefault(version, {int(k): v for k, v in json.loads(class_names).items()})
+        if not rows:
+            return {"image_id": np.empty(0, np.int64), "cls": np.empty(0, np.int64),
+                    "conf": np.empty(0, np.float32), "class_names": {}}
+        return {
+            "image_id": np.concatenate(ids),
+            "cls": np.concatenate(clss).astype(np.int64),
+            "conf": np.concatenate(confs),
+            "class_names": names,
+        }
+
+    def _query(self, sql: str, params=()):
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _to_entry(self, row):
+        fname, name, note, ts = row
+        # fromisoformat is far cheaper than strptime over 100k rows
+        return (name, note, datetime.fromisoformat(ts), os.path.join(self.save_dir, fname))
+
+    def entries(self) -> list:
+        """All images as (name, note, timestamp, path), oldest first."""
+        rows = self._query("SELECT fname, name, note, timestamp FROM images ORDER BY timestamp, id")
+        return [self._to_entry(r) for r in rows]
+
+    def search(self, text: str = None, name: str = None, disease: str = None,
+               min_conf: float = None, since: datetime = None, until: datetime = None) -> list:
+        """
+        Indexed lookup. `text` is matched word-by-word (prefixes) against
+        names and notes; `name` is a name prefix; `disease`/`min_conf`
+        filter on detected classes; `since`/`until` bound the timestamp.
+        """
+        with self._lock:
+            self._connect()  # has_fts is only known once connected
+        where, params = [], []
+        if text and fts_query(text):
+            if self.has_fts:
+                where.append("id IN (SELECT rowid FROM images_fts WHERE images_fts MATCH ?)")
+                params.append(fts_query(text))
+            else:
+                where.append("(name LIKE ? OR note LIKE ?)")
+                params += [f"%{text}%", f"%{text}%"]
+        if name:
+            # a range instead of LIKE so the NOCASE index is used
+            where.append("name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE")
+            params += [name, name + "\U0010ffff"]
+        if disease or min_conf is not None:
+            sub = "SELECT image_id FROM image_classes WHERE 1"
+            if disease:
+                sub += " AND class = ?"
+                params.append(disease)
+            if min_conf is not None:
+                sub += " AND max_conf >= ?"
+                params.append(min_conf)
+            where.append(f"id IN ({sub})")
+        if since:
+            where.append("timestamp >= ?")
+            params.append(since.strftime(TS_FORMAT))
+        if until:
+            where.append("timestamp <= ?")
+            params.append(until.strftime(TS_FORMAT))
+        sql = "SELECT fname, name, note, timestamp FROM images"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp, id"
+        return [self._to_entry(r) for r in self._query(sql, params)]
+
+    def diseases(self) -> list:
+        """Every class name that appears in the archive."""
+        return [r[0] for r in self._query("SELECT DISTINCT class FROM image_classes ORDER BY class")]
+
+    def original_for(self, fname: str):
+        """OriginalStore key of the source `fname` was annotated from, or None."""
+        rows = self._query("SELECT original FROM images WHERE fname = ?", (fname,))
+        return rows[0][0] if rows else None
+
+    def original_refs(self) -> dict:
+        """Reference count of every kept original: key -> saved images using it."""
+        rows = self._query(
+            "SELECT original, COUNT(*) FROM images WHERE original IS NOT NULL GROUP BY original"
+        )
+        return dict(rows)
+
+    def note_for(self, fname: str) -> str:
+        rows = self._query("SELECT note FROM images WHERE fname = ?", (fname,))
+        return rows[0][0] if rows else ""
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM images")[0][0]
+
+    def migrate_from_json(self, meta: dict) -> int:
+        """
+        One-time import of the old metadata.json notes plus every saved PNG
+        on disk. Does nothing once the table has rows. Returns rows added.
+        """
+        if self.count() or not os.path.isdir(self.save_dir):
+            return 0
+        rows = []
+        for fname in sorted(os.listdir(self.save_dir)):
+            parsed = parse_image_filename(fname)
+            if parsed is None:
+                continue
+            name, ts = parsed
+            rows.append((fname, name, meta.get(fname, ""), ts.strftime(TS_FORMAT)))
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO images (fname, name, note, timestamp) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        return len(rows)
+
+    def _get_state(self, key: str):
+        rows = self._query("SELECT value FROM store_state WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def sync_with_disk(self, force: bool = False) -> tuple:
+        """
+        Bring the index in line with the files in `save_dir`: add rows for
+        images saved elsewhere (another machine on a shared folder, a copy),
+        from their sidecar when there is one, fill in rows whose sidecar
+        arrived after the image, and drop rows whose file is gone. Only the
+        difference is read and written. The folder's mtime is persisted with
+        the index, so when nothing changed since the last sync (e.g. on a
+        restart) this costs one stat. Returns (added or updated, removed).
+        """
+        try:
+            st = os.stat(self.save_dir)
+        except OSError:
+            return 0, 0   # share offline: keep what we have
+        signature = str(st.st_mtime_ns)
+        if not force and self._get_state("dir_mtime") == signature:
+            return 0, 0
+
+        try:
+            listing = os.listdir(self.save_dir)
+        except OSError:
+            return 0, 0
+        on_disk = {f for f in listing if f.lower().endswith(SAVED_EXTS)}
+        sidecars = {f[:-len(SIDECAR_SUFFIX)] for f in listing if f.endswith(SIDECAR_SUFFIX)}
+        rows = self._query("SELECT fname, has_meta FROM images")
+        known = {f for f, _m in rows}
+        # the sidecar is written just after the image, so a sync in between
+        # indexes the bare file name first
+        late = {f for f, has_meta in rows if not has_meta} & sidecars & on_disk
+
+        records = []
+        for fname in sorted((on_disk - known) | late):
+            record = self._read_sidecar(fname) if fname in sidecars else None
+            if record is not None:
+                records.append((fname, record, True))
+                continue
+            parsed = parse_image_filename(fname) if fname not in known else None
+            if parsed is not None:
+                records.append((fname, make_record(*parsed), False))
+        # the listing may predate a save that has been indexed since, so a
+        # file only counts as deleted if it is still missing now
+        gone = [(f,) for f in known - on_disk
+                if not os.path.exists(os.path.join(self.save_dir, f))]
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for fname, record, has_meta in records:
+                    # a bare name never replaces a row (the app's own save may
+                    # have added it meanwhile)
+                    if not has_meta and conn.execute(
+                            "SELECT 1 FROM images WHERE fname = ?", (fname,)).fetchone():
+                        continue
+                    self._insert_record(conn, fname, record, has_meta)
+                conn.executemany("DELETE FROM images WHERE fname = ?", gone)
+                settled = time.time() - st.st_mtime > MTIME_SETTLE_SECONDS
+                conn.execute(
+                    "INSERT OR REPLACE INTO store_state (key, value) VALUES ('dir_mtime', ?)",
+                    (signature if settled else "",),
+                )
+        return len(records), len(gone)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,100 @@
+# utils/original_store.py
+
+import hashlib
+import os
+import stat
+import threading
+
+from utils.detection_cache import file_hash
+
+# Opt-in: keep the source pixels of each saved study, not just the overlay
+KEEP_ORIGINALS = os.environ.get("AHT_KEEP_ORIGINALS", "0") not in ("", "0", "false", "no")
+
+
+class OriginalStore:
+    """
+    Content-addressed store for the original input files of saved studies.
+    Each distinct file is kept once as `<sha256[:2]>/<sha256><ext>`, no
+    matter how many annotated images are saved from it; the metadata
+    store records which key every saved image refers to, and those rows
+    are the reference counts used by `prune`. Blobs are written once and
+    made read-only.
+    """
+    def __init__(self, root: str):
+        self.root  = root
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def has(self, key: str) -> bool:
+        return os.path.isfile(self.path_for(key))
+
+    def put_file(self, src_path: str) -> str:
+        """
+        Add `src_path` to the store and return its key. The source is
+        hashed first, so a file that is already stored costs one read and
+        no write; only new content is copied in. It is copied rather than
+        hard-linked, since a link would share (and chmod) the caller's file.
+        """
+        ext = os.path.splitext(src_path)[1].lower()
+        key = file_hash(src_path) + ext
+        if self.has(key):
+            return key
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, f".incoming.{os.getpid()}.{threading.get_ident()}")
+        h = hashlib.sha256()
+        try:
+            with open(src_path, "rb") as src, open(tmp, "wb") as dst:
+                for chunk in iter(lambda: src.read(1 << 20), b""):
+                    h.update(chunk)
+                    dst.write(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+            # key by what was copied, in case the source changed meanwhile
+            return self._commit(tmp, h.hexdigest() + ext)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _commit(self, tmp: str, key: str) -> str:
+        dest = self.path_for(key)
+        with self._lock:
+            if os.path.isfile(dest):
+                # same content saved before: keep the existing blob
+                return key
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp, dest)
+        return key
+
+    def keys(self) -> set:
+        found = set()
+        if not os.path.isdir(self.root):
+            return found
+        for sub in os.listdir(self.root):
+            d = os.path.join(self.root, sub)
+            if len(sub) == 2 and os.path.isdir(d):
+                found.update(os.listdir(d))
+        return found
+
+    def prune(self, referenced) -> int:
+        """
+        Delete every blob whose key isn't in `referenced` (i.e. whose
+        reference count dropped to zero). Returns the number removed.
+        """
+        removed = 0
+        for key in self.keys() - set(referenced):
+            path = self.path_for(key)
+            try:
+                os.chmod(path, stat.S_IWUSR | stat.S_IRUSR)
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                print(f"⚠️  Could not remove original {key}: {e}")
+        return removed
+
+    def stats(self) -> dict:
+        keys = self.keys()
+        size = sum(os.path.getsize(self.path_for(k)) for k in keys)
+        return {"originals": len(keys), "bytes": size}
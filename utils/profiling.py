@@ -0,0 +1,122 @@
+# utils/profiling.py
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# How many recent samples per stage the percentiles are computed over
+WINDOW = int(os.environ.get("AHT_METRICS_WINDOW", "1000"))
+# If set, metrics are written here on exit (.prom → Prometheus text, else JSON)
+METRICS_FILE = os.environ.get("AHT_METRICS_FILE", "")
+
+
+class Profiler:
+    """
+    Per-stage wall-clock timers and plain counters for the hot paths.
+    Each stage keeps a rolling window of its latest `window` samples (for
+    p50/p95/p99) plus lifetime count and total. Safe to use from any
+    thread; recording a sample is one lock and one deque append.
+    """
+    def __init__(self, window: int = WINDOW):
+        self.window    = window
+        self._lock     = threading.Lock()
+        self._samples  = {}   # stage -> deque of seconds
+        self._totals   = {}   # stage -> [count, total seconds]
+        self._counters = {}   # name -> int
+        self.started   = time.time()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """
+        {"stages": {name: {count, total_s, mean_ms, p50_ms, p95_ms, p99_ms}},
+         "counters": {name: n}} — percentiles over the rolling window.
+        """
+        with self._lock:
+            samples  = {k: np.fromiter(v, dtype=np.float64) for k, v in self._samples.items()}
+            totals   = {k: tuple(v) for k, v in self._totals.items()}
+            counters = dict(self._counters)
+        stages = {}
+        for name in sorted(samples):
+            ms = samples[name] * 1000
+            p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+            count, total = totals[name]
+            stages[name] = {
+                "count": count,
+                "total_s": round(total, 4),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+            }
+        return {"started": self.started, "stages": stages, "counters": counters}
+
+    def prometheus_text(self, prefix: str = "aht") -> str:
+        """The snapshot in the Prometheus text exposition format (a summary per stage)."""
+        snap = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Wall-clock time per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, s in snap["stages"].items():
+            for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="{q}"}} {s[key] / 1000:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {s["total_s"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        if snap["counters"]:
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for name, n in sorted(snap["counters"].items()):
+                lines.append(f'{prefix}_events_total{{event="{name}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> str:
+        """
+        Write the metrics to `path` (Prometheus text for .prom/.txt, JSON
+        otherwise), atomically so a scraper never sees half a file.
+        """
+        if path.endswith((".prom", ".txt")):
+            text = self.prometheus_text()
+        else:
+            text = json.dumps(self.snapshot(), indent=2)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+        return path
+
+
+profiler = Profiler()
@@ -0,0 +1,305 @@
+# utils/series_io.py
+
+import os
+from collections.abc import Sequence
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from utils.profiling import profiler
+
+# (width, level) in Hounsfield units for CT; MR has no fixed scale and is
+# windowed from the series' own WindowWidth/WindowCenter or percentiles
+WINDOW_PRESETS = {
+    "abdomen":     (400, 40),
+    "liver":       (150, 30),
+    "soft_tissue": (350, 50),
+    "bone":        (1800, 400),
+    "lung":        (1500, -600),
+}
+DEFAULT_WINDOW = os.environ.get("AHT_WINDOW", "abdomen")
+
+DICOM_EXTS  = (".dcm", ".dicom")
+TIFF_EXTS   = (".tif", ".tiff")
+SERIES_EXTS = DICOM_EXTS + TIFF_EXTS
+
+
+class Frame(NamedTuple):
+    """One decoded slice: where it came from and its 8-bit BGR pixels."""
+    source: str     # file the slice was read from
+    index: int      # frame number inside that file (0 for single-frame files)
+    label: str      # display name, e.g. "ct_0042.dcm" or "scan.tif #3"
+    bgr: np.ndarray
+
+
+def _pydicom():
+    try:
+        import pydicom
+    except ImportError:
+        raise RuntimeError("Reading DICOM needs pydicom (pip install pydicom)")
+    return pydicom
+
+
+def is_dicom(path: str) -> bool:
+    """DICOM by extension, or by the "DICM" magic for extension-less slices."""
+    if path.lower().endswith(DICOM_EXTS):
+        return True
+    if os.path.splitext(path)[1]:
+        return False
+    try:
+        with open(path, "rb") as f:
+            f.seek(128)
+            return f.read(4) == b"DICM"
+    except OSError:
+        return False
+
+
+def is_series_file(path: str) -> bool:
+    return path.lower().endswith(TIFF_EXTS) or is_dicom(path)
+
+
+def _first(value):
+    # multi-valued DICOM elements: the first value is the default one
+    return value[0] if isinstance(value, Sequence) and not isinstance(value, str) else value
+
+
+def resolve_window(window, ds=None):
+    """
+    (width, level) for a preset name, an explicit (width, level) pair, or
+    None: the file's own WindowWidth/WindowCenter if it has them, else
+    None (stretch each slice to its 1st-99th percentile).
+    """
+    if isinstance(window, str):
+        return WINDOW_PRESETS[window]
+    if window is not None:
+        return tuple(window)
+    if ds is not None and "WindowWidth" in ds and "WindowCenter" in ds:
+        return float(_first(ds.WindowWidth)), float(_first(ds.WindowCenter))
+    return None
+
+
+def apply_window(pixels, window=None) -> np.ndarray:
+    """
+    Map raw intensities (HU for CT) to 8 bits through a width/level
+    window; outside the window clips to black/white. Without a window the
+    slice is stretched between its 1st and 99th percentile.
+    """
+    pixels = np.asarray(pixels, dtype=np.float32)
+    if window is None:
+        lo, hi = np.percentile(pixels, (1, 99))
+    else:
+        width, level = window
+        lo, hi = level - width / 2, level + width / 2
+    scale = 255.0 / max(hi - lo, 1e-6)
+    out = (pixels - lo) * scale
+    np.clip(out, 0, 255, out=out)
+    return out.astype(np.uint8)
+
+
+def _to_bgr(img8) -> np.ndarray:
+    if img8.ndim == 2:
+        return cv2.cvtColor(img8, cv2.COLOR_GRAY2BGR)
+    if img8.shape[2] == 4:
+        return cv2.cvtColor(img8, cv2.COLOR_BGRA2BGR)
+    return img8
+
+
+def _dicom_pixels(path: str, n: int):
+    pydicom = _pydicom()
+    iter_pixels = getattr(getattr(pydicom, "pixels", None), "iter_pixels", None)
+    if iter_pixels is not None:
+        # pydicom >= 3 decodes multi-frame files one frame at a time
+        yield from iter_pixels(path)
+        return
+    arr = pydicom.dcmread(path).pixel_array
+    yield from (arr if n > 1 else (arr,))
+
+
+def _dicom_display(path: str, window):
+    """Header-only pass: (frame count, function mapping stored pixels to BGR)."""
+    ds = _pydicom().dcmread(path, stop_before_pixels=True)
+    n = int(getattr(ds, "NumberOfFrames", 1) or 1)
+    slope     = float(getattr(ds, "RescaleSlope", 1) or 1)
+    intercept = float(getattr(ds, "RescaleIntercept", 0) or 0)
+    win = resolve_window(window, ds)
+    invert = getattr(ds, "PhotometricInterpretation", "") == "MONOCHROME1"
+    color = getattr(ds, "SamplesPerPixel", 1) == 3
+
+    def to_bgr(arr):
+        if color:
+            # already display-ready RGB
+            return cv2.cvtColor(arr.astype(np.uint8), cv2.COLOR_RGB2BGR)
+        # stored values -> modality units (HU for CT) before windowing
+        gray = apply_window(arr * slope + intercept, win)
+        return _to_bgr(255 - gray if invert else gray)
+    return n, to_bgr
+
+
+def _dicom_frames(path: str, window):
+    """Windowed BGR frames of one (possibly multi-frame) DICOM file, lazily."""
+    n, to_bgr = _dicom_display(path, window)
+    for arr in _dicom_pixels(path, n):
+        yield to_bgr(arr)
+
+
+def _dicom_frame(path: str, index: int, window):
+    """One frame of a DICOM file, without decoding the others where possible."""
+    n, to_bgr = _dicom_display(path, window)
+    pixel_array = getattr(getattr(_pydicom(), "pixels", None), "pixel_array", None)
+    if n > 1 and pixel_array is not None:
+        return to_bgr(pixel_array(path, index=index))
+    arr = _pydicom().dcmread(path).pixel_array
+    return to_bgr(arr[index] if n > 1 else arr)
+
+
+def _dicom_sort_key(ds, path):
+    # slice position along the patient axis, then instance number, then name
+    pos = getattr(ds, "ImagePositionPatient", None)
+    z = float(pos[2]) if pos is not None and len(pos) == 3 else 0.0
+    return (z, int(getattr(ds, "InstanceNumber", 0) or 0), path)
+
+
+def dicom_series(folder: str) -> dict:
+    """
+    Group the DICOM files under `folder` by SeriesInstanceUID. Only
+    headers are read. Returns {series_uid: [paths in slice order]}.
+    """
+    pydicom = _pydicom()
+    series = {}
+    for root, _dirs, files in os.walk(folder):
+        for fname in files:
+            path = os.path.join(root, fname)
+            if not is_dicom(path):
+                continue
+            try:
+                ds = pydicom.dcmread(path, stop_before_pixels=True)
+            except Exception as e:
+                print(f"⚠️  Skipping unreadable DICOM {path}: {e}")
+                continue
+            uid = str(getattr(ds, "SeriesInstanceUID", folder))
+            series.setdefault(uid, []).append((_dicom_sort_key(ds, path), path))
+    return {uid: [p for _k, p in sorted(items)] for uid, items in series.items()}
+
+
+def frame_count(path: str) -> int:
+    """Number of slices in a file without decoding any of them."""
+    if path.lower().endswith(TIFF_EXTS):
+        return max(1, cv2.imcount(path))
+    if is_dicom(path):
+        ds = _pydicom().dcmread(path, stop_before_pixels=True)
+        return int(getattr(ds, "NumberOfFrames", 1) or 1)
+    return 1
+
+
+def is_multi_frame(path: str) -> bool:
+    """A DICOM/TIFF file with more than one slice (False if it can't be read as one)."""
+    if not is_series_file(path):
+        return False
+    try:
+        return frame_count(path) > 1
+    except Exception as e:
+        # let the single-image path report the problem
+        print(f"⚠️  Could not read {path} as a series: {e}")
+        return False
+
+
+def iter_file_frames(path: str, window=DEFAULT_WINDOW):
+    """
+    Yield every slice of one file as a Frame, decoding one at a time:
+    multi-frame DICOM, multi-page TIFF, or a plain image (one frame).
+    """
+    base = os.path.basename(path)
+    if is_dicom(path):
+        frames = _dicom_frames(path, window)
+    elif path.lower().endswith(TIFF_EXTS):
+        frames = _tiff_frames(path, window)
+    else:
+        bgr = cv2.imread(path)
+        frames = () if bgr is None else (bgr,)
+    multi = frame_count(path) > 1
+    for i, bgr in enumerate(frames):
+        yield Frame(path, i, f"{base} #{i + 1}" if multi else base, bgr)
+
+
+def _tiff_page(path: str, index: int, window):
+    # one page per call, so a long stack is never decoded all at once
+    ok, pages = cv2.imreadmulti(path, index, 1, flags=cv2.IMREAD_ANYDEPTH | cv2.IMREAD_ANYCOLOR)
+    if not ok or not pages:
+        return None
+    page = pages[0]
+    if page.dtype == np.uint8:
+        return _to_bgr(page)
+    # presets are in HU, which a 16-bit TIFF needn't be: only an explicit
+    # (width, level) is applied, otherwise each page is stretched
+    win = None if window is None or isinstance(window, str) else tuple(window)
+    return _to_bgr(apply_window(page, win))
+
+
+def _tiff_frames(path: str, window):
+    for i in range(max(1, cv2.imcount(path))):
+        bgr = _tiff_page(path, i, window)
+        if bgr is not None:
+            yield bgr
+
+
+def iter_series(source: str, window=DEFAULT_WINDOW):
+    """
+    Lazily yield the Frames of a study: a DICOM folder (the largest series
+    in it, slices in anatomical order), a multi-frame DICOM or TIFF, or a
+    single image. Only one slice is decoded at a time.
+    """
+    if os.path.isdir(source):
+        series = dicom_series(source)
+        if not series:
+            return
+        paths = max(series.values(), key=len)
+        for path in paths:
+            yield from iter_file_frames(path, window)
+    else:
+        yield from iter_file_frames(source, window)
+
+
+class SliceRef(NamedTuple):
+    """Where one slice of a series lives, without its pixels."""
+    source: str
+    index: int
+    label: str
+
+
+def series_slices(source: str) -> list:
+    """
+    Every slice of a study (same inputs as iter_series) as SliceRefs, in
+    order. Only headers / page counts are read.
+    """
+    if os.path.isdir(source):
+        series = dicom_series(source)
+        paths = max(series.values(), key=len) if series else []
+    else:
+        paths = [source]
+    refs = []
+    for path in paths:
+        n, base = frame_count(path), os.path.basename(path)
+        refs.extend(SliceRef(path, i, f"{base} #{i + 1}" if n > 1 else base) for i in range(n))
+    return refs
+
+
+def read_slice(ref: SliceRef, window=DEFAULT_WINDOW):
+    """Decode just the slice `ref` points at, as 8-bit BGR (None if unreadable)."""
+    with profiler.stage("decode_slice"):
+        if is_dicom(ref.source):
+            return _dicom_frame(ref.source, ref.index, window)
+        if ref.source.lower().endswith(TIFF_EXTS):
+            return _tiff_page(ref.source, ref.index, window)
+        return cv2.imread(ref.source)
+
+
+def read_first_frame(path: str, window=DEFAULT_WINDOW):
+    """The first slice of a DICOM/TIFF file as BGR, or None."""
+    try:
+        return next(iter_file_frames(path, window)).bgr
+    except StopIteration:
+        return None
+    except Exception as e:
+        print(f"⚠️  Could not decode {path}: {e}")
+        return None
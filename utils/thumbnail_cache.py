@@ -0,0 +1,56 @@
+# utils/thumbnail_cache.py
+
+import hashlib
+import os
+import threading
+
+import cv2
+
+from utils.image_io import fit_within, read_reduced
+
+# Small JPEGs of saved images, so the archive table never decodes full PNGs twice
+THUMB_DIR = os.environ.get(
+    "AHT_THUMB_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "cache", "thumbnails"),
+)
+THUMB_SIZE = 80
+
+
+def _thumb_path(path: str, st, size: int) -> str:
+    # path + mtime + file size: an overwritten image gets a fresh thumbnail
+    sig = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{size}"
+    key = hashlib.sha1(sig.encode("utf-8")).hexdigest()
+    return os.path.join(THUMB_DIR, key[:2], key + ".jpg")
+
+
+def make_thumbnail(bgr, size: int = THUMB_SIZE):
+    return fit_within(bgr, size)
+
+
+def load_thumbnail(path: str, size: int = THUMB_SIZE):
+    """
+    Return a BGR thumbnail (longest side `size`) for the image at `path`,
+    from the on-disk cache when possible. Returns None if the image
+    can't be read. Safe to call from worker threads.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _thumb_path(path, st, size)
+    thumb = cv2.imread(cached) if os.path.isfile(cached) else None
+    if thumb is not None:
+        return thumb
+
+    # reduced-resolution decode: a thumbnail never needs the full image
+    thumb = read_reduced(path, size)
+    if thumb is None:
+        return None
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp.jpg"
+        cv2.imwrite(tmp, thumb, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        os.replace(tmp, cached)
+    except OSError as e:
+        print(f"⚠️  Could not cache thumbnail for {path}: {e}")
+    return thumb